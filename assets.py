@@ -0,0 +1,154 @@
+###############################################################################
+# ASSETS.PY: Module qui lit et écrit le paquet de textures: un fichier unique #
+#            contenant les pixels déjà décodés (RGBA, 8 bits par composante)  #
+#            de toutes les images du jeu et un index permettant de les        #
+#            retrouver. Le paquet est projeté en mémoire (mmap): les images   #
+#            sont utilisées directement depuis le fichier, sans décodage PNG  #
+#            ni copie. Ce module n'utilise pas la SDL (voir pack.py pour la   #
+#            création du paquet)                                              #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import ctypes, mmap, os, struct
+# Locales
+from constants import *
+
+###############################################################################
+
+# GLOBALES
+# Identifiant et version du format des paquets
+MAGIC = b"RBPK"
+VERSION = 1
+# Formats (module struct) de l'en-tête du paquet (identifiant, version, nombre
+# d'images) et d'une entrée de l'index (taille du nom, puis largeur, hauteur,
+# position des pixels dans le fichier, taille et date de modification en
+# nanosecondes du fichier PNG d'origine)
+HEADER = struct.Struct("<4sII")
+NAME = struct.Struct("<H")
+ENTRY = struct.Struct("<IIQQq")
+# Alignement en octets des pixels de chaque image dans le fichier
+ALIGNMENT = 64
+
+# Fichier ouvert, projection en mémoire et tableau ctypes donnant accès à
+# l'adresse de la projection (None si aucun paquet n'est ouvert)
+PackFile = None
+Mapping = None
+Buffer = None
+# Index du paquet ouvert: nom de l'image -> tuple (largeur, hauteur, position,
+# taille et date de modification du fichier d'origine)
+Index = {}
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > WritePack(path, images):
+# Ecrit un paquet de textures
+# Paramètres:
+#   path: chemin d'accès du paquet à créer
+#   images: tableau de tuples (nom de l'image, largeur, hauteur, pixels RGBA
+#           (bytes de largeur*hauteur*4 octets), taille et date de
+#           modification en nanosecondes du fichier PNG d'origine)
+def WritePack(path, images):
+	encodedNames = [image[0].encode() for image in images]
+
+	# Calcul de la position des pixels de chaque image après l'en-tête et
+	# l'index
+	position = HEADER.size + sum(NAME.size + len(name) + ENTRY.size
+		for name in encodedNames)
+	positions = []
+	for name, width, height, pixels, size, mtime in images:
+		if len(pixels) != width * height * 4:
+			raise ValueError("Taille des pixels de {0} invalide".format(name))
+		position += -position % ALIGNMENT
+		positions.append(position)
+		position += len(pixels)
+
+	with open(path, "wb") as file:
+		file.write(HEADER.pack(MAGIC, VERSION, len(images)))
+		for name, image, position in zip(encodedNames, images, positions):
+			file.write(NAME.pack(len(name)) + name)
+			file.write(ENTRY.pack(image[1], image[2], position, image[4],
+				image[5]))
+		for image, position in zip(images, positions):
+			file.write(b"\0" * (position - file.tell()))
+			file.write(image[3])
+
+
+# > OpenPack(path):
+# Ouvre un paquet de textures et le projette en mémoire. La projection est en
+# copie sur écriture (ACCESS_COPY): le fichier n'est jamais modifié et ses
+# pages ne sont lues sur le disque qu'au moment où elles sont utilisées
+# Paramètre:
+#   path: chemin d'accès du paquet
+# Retourne True si le paquet a été ouvert, False s'il n'existe pas ou est
+# invalide (les images sont alors chargées depuis leur fichier PNG)
+def OpenPack(path=ASSET_PACK):
+	global PackFile, Mapping, Buffer, Index
+	ClosePack()
+
+	try:
+		PackFile = open(path, "rb")
+		Mapping = mmap.mmap(PackFile.fileno(), 0, access=mmap.ACCESS_COPY)
+		magic, version, count = HEADER.unpack_from(Mapping, 0)
+		if magic != MAGIC or version != VERSION:
+			raise ValueError("format de paquet inconnu")
+
+		position = HEADER.size
+		for n in range(count):
+			length, = NAME.unpack_from(Mapping, position)
+			position += NAME.size
+			name = bytes(Mapping[position:position + length]).decode()
+			position += length
+			Index[name] = ENTRY.unpack_from(Mapping, position)
+			position += ENTRY.size
+
+		Buffer = (ctypes.c_ubyte * len(Mapping)).from_buffer(Mapping)
+	except (OSError, ValueError, struct.error) as error:
+		if not isinstance(error, FileNotFoundError):
+			print("Paquet de textures ignoré ({0})".format(error))
+		ClosePack()
+		return False
+
+	return True
+
+
+# > ClosePack():
+# Ferme le paquet de textures ouvert. Les surfaces créées à partir de ses
+# pixels ne doivent plus être utilisées
+def ClosePack():
+	global PackFile, Mapping, Buffer, Index
+	# Le tableau ctypes doit être libéré avant la projection qu'il utilise
+	Buffer = None
+	if Mapping is not None:
+		Mapping.close()
+	if PackFile is not None:
+		PackFile.close()
+	PackFile, Mapping, Index = None, None, {}
+
+
+# > Lookup(name):
+# Cherche une image dans le paquet de textures ouvert
+# Paramètre:
+#   name: chemin d'accès de l'image depuis le dossier "textures"
+# Retourne un tuple (adresse mémoire des pixels, largeur, hauteur) ou None si
+# aucun paquet n'est ouvert, si l'image n'est pas dans le paquet ou si son
+# fichier PNG a été modifié depuis la création du paquet
+def Lookup(name):
+	entry = Index.get(name)
+	if entry is None or Buffer is None:
+		return None
+	width, height, position, size, mtime = entry
+
+	# Si le fichier d'origine est présent, vérifie qu'il n'a pas changé
+	try:
+		stat = os.stat("textures/" + name)
+		if stat.st_size != size or stat.st_mtime_ns != mtime:
+			return None
+	except FileNotFoundError:
+		pass
+
+	return ctypes.addressof(Buffer) + position, width, height
+
+###############################################################################
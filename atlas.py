@@ -0,0 +1,57 @@
+###############################################################################
+# ATLAS.PY: Module qui calcule le placement de plusieurs images dans un petit #
+#           nombre de grandes images (atlas de textures). Il n'utilise pas la #
+#           SDL: display s'en sert pour regrouper les textures du jeu         #
+###############################################################################
+
+# IMPORTATIONS
+# Locales
+from constants import *
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > Pack(sizes, pageWidth, pageHeight, padding):
+# Range des rectangles dans des pages de taille fixe par étagères: les
+# rectangles sont triés par hauteur décroissante puis placés de gauche à
+# droite sur une ligne (étagère) dont la hauteur est celle du premier
+# rectangle. Une nouvelle étagère est commencée quand la ligne est pleine et
+# une nouvelle page quand la page est pleine
+# Paramètres:
+#   sizes: tableau des tailles (largeur, hauteur) des rectangles à placer
+#   pageWidth, pageHeight: taille des pages en pixels
+#   padding: espace laissé libre autour de chaque rectangle en pixels (évite
+#            que les pixels d'une image voisine ne soient affichés lorsque la
+#            texture est agrandie ou tournée)
+# Retourne un tuple (placements, nombre de pages) où placements contient pour
+# chaque rectangle, dans l'ordre de sizes, un tuple (page, x, y) indexé par
+# AT_PAGE, AT_X et AT_Y
+def Pack(sizes, pageWidth, pageHeight, padding=ATLAS_PADDING):
+	placements = [None] * len(sizes)
+	order = sorted(range(len(sizes)),
+		key=lambda i: (sizes[i][1], sizes[i][0]), reverse=True)
+
+	# Page, position de l'étagère actuelle et hauteur de cette étagère
+	page, x, y, shelf = 0, 0, 0, 0
+	for i in order:
+		w, h = sizes[i][0] + 2 * padding, sizes[i][1] + 2 * padding
+		if w > pageWidth or h > pageHeight:
+			raise ValueError("Image de {0}x{1} pixels trop grande pour une "
+				"page de {2}x{3} pixels".format(sizes[i][0], sizes[i][1],
+				pageWidth, pageHeight))
+
+		# Etagère pleine: commence une nouvelle étagère en dessous
+		if x + w > pageWidth:
+			x, y, shelf = 0, y + shelf, 0
+		# Page pleine: commence une nouvelle page
+		if y + h > pageHeight:
+			page, x, y, shelf = page + 1, 0, 0, 0
+
+		placements[i] = (page, x + padding, y + padding)
+		x += w
+		shelf = max(shelf, h)
+
+	return placements, page + 1 if sizes else 0
+
+###############################################################################
@@ -0,0 +1,553 @@
+###############################################################################
+# BATCH.PY: Module qui simule un grand nombre de parties en parallèle avec    #
+#           NumPy. Chaque partie suit exactement les règles du module engine  #
+#           mais l'état de toutes les parties est rangé dans des tableaux de  #
+#           forme (..., N) pour que chaque mise à jour les traite toutes en   #
+#           une seule fois                                                    #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import math
+# NumPy
+import numpy as np
+# Locales
+from constants import *
+import engine
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > ComputeMovements(x, y, vx, vy, dt):
+# Version vectorisée de physics.ComputeMovements()
+def ComputeMovements(x, y, vx, vy, dt):
+	return np.clip(x + vx * dt, -1.0, 1.0), \
+		np.clip(y + vy * WIN_RATIO * dt, -1.0, 1.0)
+
+
+# > ComputeDistance(x1, y1, x2, y2):
+# Version vectorisée de physics.ComputeDistance()
+def ComputeDistance(x1, y1, x2, y2):
+	return np.sqrt((x1-x2)**2 + WIN_RATIO*(y1-y2)**2)
+
+
+# > SeededRandom(seeds, counters):
+# Version vectorisée de engine.SeededRandom() (les opérations sur des tableaux
+# d'entiers non signés de 64 bits s'effectuent déjà modulo 2**64)
+def SeededRandom(seeds, counters):
+	z = counters + np.uint64(1)
+	z *= np.uint64(0x9E3779B97F4A7C15)
+	z += seeds
+	z ^= z >> np.uint64(30)
+	z *= np.uint64(0xBF58476D1CE4E5B9)
+	z ^= z >> np.uint64(27)
+	z *= np.uint64(0x94D049BB133111EB)
+	z ^= z >> np.uint64(31)
+	z >>= np.uint64(11)
+	values = z.astype(np.float64)
+	values *= 2.0**-53
+	return values
+
+
+# > Select(out, values, mask):
+# Equivalent de np.copyto(out, values, where=mask) pour des tableaux de réels,
+# calculé avec des opérations binaires sur la représentation des réels. Les
+# opérations masquées de NumPy traitent les éléments un par un et deviennent
+# plusieurs fois plus lentes quand le masque est irrégulier (joueurs qui se
+# déplacent, balles libres...)
+# Paramètres:
+#   out: tableau de réels modifié sur place
+#   values: réel ou tableau de réels copié là où mask est vrai
+#   mask: tableau de booléens de la forme de out
+def Select(out, values, mask):
+	bits = out.view(np.int64)
+	values = np.asarray(values, dtype=np.float64).view(np.int64)
+	changes = np.bitwise_xor(bits, values)
+	# Masque binaire: tous les bits à 1 là où mask est vrai, à 0 ailleurs
+	selected = mask.astype(np.int64)
+	np.negative(selected, out=selected)
+	changes &= selected
+	bits ^= changes
+
+
+# > ChaseBot(batch, player):
+# Version vectorisée de bots.ChaseBot()
+# Paramètres:
+#   batch: BatchMatch des parties
+#   player: joueur contrôlé (PLAYER1 ou PLAYER2)
+# Retourne l'angle et la norme du vecteur vitesse et l'état de la touche
+# action du joueur dans chaque partie (tableaux (N,))
+def ChaseBot(batch, player):
+	opponent = [PLAYER2, PLAYER1][player]
+	X, Y, State = batch.X, batch.Y, batch.State
+	x, y = X[player], Y[player]
+	holds = State[player] >= PS_HOLD
+	o_holds = State[opponent] >= PS_HOLD
+
+	# Cible du joueur: la balle, l'adversaire qui la tient ou le but adverse
+	# si le joueur la tient
+	t_x, t_y = X[BALL].copy(), Y[BALL].copy()
+	Select(t_x, X[opponent], o_holds)
+	Select(t_y, Y[opponent], o_holds)
+	Select(t_x, [0.95, -0.95][player], holds)
+	Select(t_y, 0.0, holds)
+
+	# Distance à la cible, calculée dans le même ordre que
+	# physics.ComputeDistance() pour obtenir exactement les mêmes valeurs
+	dx, dy = t_x - x, t_y - y
+	distance = dx * dx
+	square = dy * dy
+	square *= WIN_RATIO
+	distance += square
+	np.sqrt(distance, out=distance)
+
+	# Attaque de l'adversaire qui tient la balle s'il est assez proche
+	action = distance < 0.4
+	action &= o_holds
+	action &= ~holds
+
+	# Déplacement vers la cible, sauf si elle est atteinte
+	moving = distance >= 0.01
+	dy /= WIN_RATIO
+	norm = moving.astype(np.float64)
+	angle = np.arctan2(dy, dx)
+	angle *= norm
+	return angle, norm, action
+
+
+# > RunMatches(seeds, dt):
+# Simule des parties complètes entre deux ChaseBot, une par graine
+# Paramètres:
+#   seeds: graines des générateurs aléatoires des parties
+#   dt: durée simulée par chaque mise à jour en secondes
+# Retourne le BatchMatch des parties terminées
+def RunMatches(seeds, dt=TICK_TIME):
+	batch = BatchMatch(seeds)
+	angles = np.empty((2, batch.Count))
+	norms = np.empty((2, batch.Count))
+	actions = np.empty((2, batch.Count), dtype=bool)
+	while not batch.Over.all():
+		for player in [PLAYER1, PLAYER2]:
+			angles[player], norms[player], actions[player] = \
+				ChaseBot(batch, player)
+		batch.Step(angles, norms, actions, dt)
+	return batch
+
+###############################################################################
+
+# CLASSES
+
+# Classe BatchMatch: état de N parties simulées simultanément avec la
+# composition par défaut (engine.DefaultLineup) et des phases de durée nulle
+# (la remise en jeu a lieu à la mise à jour qui suit un but). Chaque attribut
+# correspond à celui de même nom dans engine.MatchState avec une dimension
+# supplémentaire en dernier pour l'indice de la partie. Comme dans
+# entities.ComponentStore, chaque composant des entités est un tableau
+# indexé par l'identifiant de l'entité (PLAYER1, PLAYER2 ou BALL) puis par la
+# partie: X[BALL] est un tableau contigu des abscisses des N balles
+class BatchMatch:
+	# Positions et orientations des entités au début d'une partie
+	StartX = np.array([-2/3, 2/3, 0.0])[:,None]
+	StartY = np.zeros(3)[:,None]
+	StartAngle = np.array([0.0, math.pi, math.pi/2])[:,None]
+	# Limites horizontales des buts adverses de chaque joueur
+	Goals = np.array(engine.Goals)
+	# Coefficients de vitesse d'un joueur qui se déplace normalement, en état
+	# Attaque ou en tenant la balle
+	SpeedFactors = np.array([0.3, 0.5, 0.25])
+
+	# Initialise N nouvelles parties
+	# Paramètre:
+	#   seeds: graines des générateurs aléatoires de chaque partie (la partie
+	#          d'indice k se déroule comme engine.MatchState(seeds[k]))
+	def __init__(self, seeds):
+		self.Seeds = np.array([seed & RNG_MASK for seed in seeds],
+			dtype=np.uint64)
+		self.Count = len(self.Seeds)
+		self.Draws = np.zeros(self.Count, dtype=np.uint64)
+
+		self.Score = np.zeros((2, self.Count), dtype=np.int64)
+		self.GameTime = np.full(self.Count, float(3 * 60))
+		self.Over = np.zeros(self.Count, dtype=bool)
+		# Joueur ayant marqué un but dont la remise en jeu n'a pas encore eu
+		# lieu (-1 si aucun)
+		self.Scorer = np.full(self.Count, -1, dtype=np.int64)
+		# Nombre de balles récupérées par chaque joueur en attaquant
+		self.Tackles = np.zeros((2, self.Count), dtype=np.int64)
+
+		self.X = np.empty((3, self.Count))
+		self.Y = np.empty((3, self.Count))
+		self.Angle = np.empty((3, self.Count))
+		self.State = np.empty((3, self.Count), dtype=np.int8)
+		self.DashCooldown = np.empty((2, self.Count))
+		self.SpitCooldown = np.empty((2, self.Count))
+		self.BallCooldown = np.empty(self.Count)
+		self.BallTarget = np.empty((2, self.Count))
+		self.ResetPositions(np.arange(self.Count))
+
+		# Composants des joueurs modifiés par la passe commune de Step() et
+		# copies de leurs valeurs au début de la mise à jour, qui permettent
+		# de rejouer exactement les parties où les joueurs interagissent
+		self.PlayersComponents = [self.X[:2], self.Y[:2], self.Angle[:2],
+			self.State[:2], self.DashCooldown, self.SpitCooldown]
+		self.SavedComponents = [np.empty_like(component)
+			for component in self.PlayersComponents]
+		# Tableaux de travail de la passe commune, alloués une seule fois
+		self.Buffer = np.empty((2, self.Count))
+		self.Speeds = np.empty((2, self.Count))
+		self.Modes = np.empty((2, 2, self.Count), dtype=np.int8)
+
+	# Version vectorisée de engine.ResetPositions() appliquée aux parties
+	# d'indices k
+	def ResetPositions(self, k):
+		self.X[:,k] = self.StartX
+		self.Y[:,k] = self.StartY
+		self.Angle[:,k] = self.StartAngle
+		self.State[:,k] = PS_STOP
+		self.DashCooldown[:,k] = 0.0
+		self.SpitCooldown[:,k] = 0.0
+		self.BallCooldown[k] = 0.0
+		self.BallTarget[:,k] = 0.0
+
+	# Version vectorisée de engine.RandomDraw() pour les parties d'indices k
+	def RandomDraw(self, k):
+		values = SeededRandom(self.Seeds[k], self.Draws[k])
+		self.Draws[k] += np.uint64(1)
+		return values
+
+	# Extrait l'état de la partie d'indice k sous la forme d'un
+	# engine.MatchState
+	def GetMatch(self, k):
+		state = engine.MatchState(int(self.Seeds[k]))
+		state.Draws = int(self.Draws[k])
+		state.Score = self.Score[:,k].tolist()
+		state.GameTime = float(self.GameTime[k])
+		state.Over = bool(self.Over[k])
+		state.Scorer = None if self.Scorer[k] < 0 else int(self.Scorer[k])
+		engine.SetPhase(state, MP_PLAY if state.Scorer is None else MP_GOAL)
+		state.Tackles = self.Tackles[:,k].tolist()
+		Entities = state.Entities
+		Entities.X[:] = self.X[:,k].tolist()
+		Entities.Y[:] = self.Y[:,k].tolist()
+		Entities.Angle[:] = self.Angle[:,k].tolist()
+		Entities.State[:] = self.State[:,k].tolist()
+		Entities.DashCooldown[:2] = self.DashCooldown[:,k].tolist()
+		Entities.SpitCooldown[:2] = self.SpitCooldown[:,k].tolist()
+		state.BallCooldown = float(self.BallCooldown[k])
+		state.BallTarget = self.BallTarget[:,k].tolist()
+		return state
+
+	# Version vectorisée de engine.Step(): fait avancer toutes les parties
+	# d'une durée donnée
+	# Paramètres:
+	#   angles, norms: angles et normes des vecteurs vitesse des joueurs
+	#                  (tableaux (2,N) indexés par le joueur)
+	#   actions: état de la touche action des joueurs (tableau (2,N))
+	#   dt: durée simulée en secondes
+	# Retourne un tableau (2,N) indiquant les joueurs ayant déclenché une
+	# attaque (équivalent des évènements EV_DASH)
+	def Step(self, angles, norms, actions, dt):
+		# Remise en jeu des parties où un but a été marqué lors de la mise à
+		# jour précédente (seul le joueur qui vient de marquer peut avoir 3
+		# points)
+		k = np.flatnonzero(self.Scorer >= 0)
+		if len(k):
+			self.ResetPositions(k)
+			self.Over[k] |= (self.Score[:,k] == 3).any(axis=0)
+			self.Scorer[k] = -1
+
+		# Parties mises à jour par cet appel et durée simulée dans chaque
+		# partie (nulle pour les parties terminées, ce qui évite de masquer
+		# les décomptes)
+		active = ~self.Over
+		dts = active * dt
+
+		# Décomptes non associés à un joueur et fin des parties par manque de
+		# temps (la mise à jour de ces parties se termine malgré tout)
+		self.BallCooldown -= dts
+		self.GameTime -= dts
+		self.Over |= active & (self.GameTime <= 0.0)
+
+		# Ordre aléatoire des joueurs dans chaque partie: joueur 1 puis joueur
+		# 2, ou l'inverse si swap est vrai
+		swap = SeededRandom(self.Seeds, self.Draws) < 0.5
+		self.Draws += active
+
+		# Les deux joueurs de toutes les parties sont mis à jour en une seule
+		# passe comme s'ils étaient indépendants. Ce n'est exact que s'ils
+		# n'interagissent pas (attaque réussie, balle récupérée ou but): les
+		# parties concernées sont repérées puis rejouées joueur par joueur
+		# dans l'ordre tiré
+		for component, saved in zip(self.PlayersComponents,
+			self.SavedComponents):
+			np.copyto(saved, component)
+		dashes, dashing, moving = self.CommonStep(angles, norms, actions,
+			active, dts, dt)
+
+		k = np.flatnonzero(self.FindInteractions(dashing, moving))
+		if len(k):
+			for component, saved in zip(self.PlayersComponents,
+				self.SavedComponents):
+				component[:,k] = saved[:,k]
+			dashes[:,k] = False
+			first = swap[k].astype(np.int64)
+			scored = self.PlayerStep(k, first, angles, norms, actions,
+				dashes, dt)
+			active[k[scored]] = False
+			k, first = k[~scored], first[~scored]
+			scored = self.PlayerStep(k, 1 - first, angles, norms, actions,
+				dashes, dt)
+			active[k[scored]] = False
+
+		self.BallStep(active, dt)
+		return dashes
+
+	# Passe commune de Step(): met à jour les deux joueurs de chaque partie
+	# active indépendamment l'un de l'autre, sur place et sans extraire de
+	# sous-ensemble des tableaux (corps de la boucle des joueurs de
+	# engine.Step() sans les interactions)
+	# Paramètres:
+	#   angles, norms, actions, dt: voir Step()
+	#   active: masque des parties mises à jour
+	#   dts: durée simulée dans chaque partie (dt ou 0.0)
+	# Retourne les masques (2,N) des joueurs ayant déclenché une attaque, des
+	# joueurs en état Attaque et des joueurs qui se sont déplacés
+	def CommonStep(self, angles, norms, actions, active, dts, dt):
+		X, Y, Angle, State = self.X[:2], self.Y[:2], self.Angle[:2], \
+			self.State[:2]
+		Dash, Spit = self.DashCooldown, self.SpitCooldown
+		buffer, speeds = self.Buffer, self.Speeds
+		modes, flags = self.Modes
+
+		# Décomptes des joueurs
+		Dash -= dts
+		Spit -= dts
+
+		# Déclenchement des attaques
+		dashes = State == PS_WALK
+		dashes &= actions
+		dashes &= Dash <= 0.0
+		dashes &= active
+		np.copyto(Dash, CDOWN_DASH, where=dashes)
+
+		# Joueurs qui se déplacent, à vitesse normale ou en état Attaque
+		holding = State >= PS_HOLD
+		spitting = Spit > 0.0
+		moving = norms != 0.0
+		moving &= ~spitting
+		moving &= active
+		dashing = Dash > CDOWN_DASH - 0.5
+		dashing &= moving
+		dashing &= ~holding
+
+		# Nouvel état des joueurs: Marche ou Attaque s'ils se déplacent,
+		# Perte de la balle pendant les 0.5 premières secondes où ils ont été
+		# attaqués, Immobile (0) sinon. Les masques étant disjoints, hormis
+		# dashing qui est inclus dans moving, les modes sont additionnés
+		spitting &= Spit >= CDOWN_SPIT - 0.5
+		np.multiply(moving.view(np.int8), PS_WALK, out=modes)
+		np.multiply(dashing.view(np.int8), PS_DASH - PS_WALK, out=flags)
+		modes += flags
+		np.multiply(spitting.view(np.int8), PS_SPIT, out=flags)
+		modes += flags
+		np.bitwise_and(State, PS_HOLD, out=State, where=active)
+		np.bitwise_or(State, modes, out=State, where=active)
+
+		# Vitesse des joueurs, nulle pour ceux qui ne se déplacent pas afin
+		# que leur position reste inchangée
+		np.multiply(holding.view(np.int8), 2, out=flags)
+		flags += dashing
+		np.take(self.SpeedFactors, flags, out=speeds, mode="clip")
+		speeds *= norms
+		speeds *= moving
+
+		# Déplacement (mêmes opérations que physics.ComputeMovements())
+		np.cos(angles, out=buffer)
+		buffer *= speeds
+		buffer *= dt
+		X += buffer
+		np.sin(angles, out=buffer)
+		buffer *= speeds
+		buffer *= WIN_RATIO
+		buffer *= dt
+		Y += buffer
+		for position in X, Y:
+			np.minimum(position, 1.0, out=position)
+			np.maximum(position, -1.0, out=position)
+		Select(Angle, angles, moving)
+		return dashes, dashing, moving
+
+	# Repère les parties où la passe commune n'a pas reproduit exactement
+	# engine.Step() parce que les joueurs y ont interagi. Le test est large:
+	# une partie repérée à tort est simplement rejouée joueur par joueur
+	# Paramètres:
+	#   dashing, moving: masques retournés par CommonStep()
+	# Retourne le masque des parties concernées
+	def FindInteractions(self, dashing, moving):
+		X, Y, State = self.X, self.Y, self.State
+		saved_x, saved_y = self.SavedComponents[:2]
+		free = State[BALL] < PS_HOLD
+		free &= self.BallCooldown <= 0.0
+		interactions = np.zeros(self.Count, dtype=bool)
+
+		for p, o in [(PLAYER1, PLAYER2), (PLAYER2, PLAYER1)]:
+			x, y = X[p], Y[p]
+
+			# But du joueur qui tient la balle dans l'en-but adverse
+			goal = self.Goals[p]
+			found = x >= goal[0]
+			found &= x <= goal[1]
+			found &= moving[p]
+			found &= State[p] >= PS_HOLD
+			interactions |= found
+
+			# Récupération de la balle libre par le joueur (l'écart horizontal
+			# est comparé avec une marge avant de calculer la distance sur les
+			# seuls joueurs proches)
+			found = np.abs(x - X[BALL]) < 0.21
+			found &= moving[p]
+			found &= free
+			k = np.flatnonzero(found)
+			found = ComputeDistance(x[k],y[k], X[BALL,k],Y[BALL,k]) < 0.2
+			interactions[k[found]] = True
+
+			# Attaque du joueur en état Attaque proche de l'adversaire qui
+			# tient la balle (selon l'ordre des joueurs, l'adversaire a déjà
+			# été déplacé ou non: les deux positions sont testées)
+			k = np.flatnonzero(dashing[p] & (State[o] >= PS_HOLD))
+			found = (ComputeDistance(x[k],y[k], X[o,k],Y[o,k]) <= 0.2) \
+				| (ComputeDistance(x[k],y[k],
+					saved_x[o,k],saved_y[o,k]) <= 0.2)
+			interactions[k[found]] = True
+		return interactions
+
+	# Met à jour un joueur dans chaque partie d'indice k en tenant compte
+	# des interactions avec l'adversaire et la balle (corps complet de la
+	# boucle des joueurs de engine.Step())
+	# Paramètres:
+	#   k: indices des parties à mettre à jour
+	#   p: joueur à mettre à jour dans chacune de ces parties
+	#   angles, norms, actions, dt: voir Step()
+	#   dashes: tableau des attaques déclenchées, complété par cette fonction
+	# Retourne le masque des parties (parmi k) où le joueur a marqué un but
+	def PlayerStep(self, k, p, angles, norms, actions, dashes, dt):
+		X, Y, Angle, State = self.X, self.Y, self.Angle, self.State
+		Dash, Spit = self.DashCooldown, self.SpitCooldown
+		o = 1 - p
+
+		# Décomptes du joueur et déclenchement des attaques
+		dash = Dash[p,k] - dt
+		spit = Spit[p,k] - dt
+		state = State[p,k]
+		trigger = actions[p,k] & (state == PS_WALK) & (dash <= 0.0)
+		dash[trigger] = CDOWN_DASH
+		dashes[p[trigger],k[trigger]] = True
+		Dash[p,k], Spit[p,k] = dash, spit
+
+		# Nouvel état et vitesse du joueur (voir CommonStep())
+		holding = state >= PS_HOLD
+		spitting = spit > 0.0
+		moving = ~spitting & (norms[p,k] != 0.0)
+		dashing = moving & (dash > CDOWN_DASH - 0.5) & ~holding
+		mode = moving.astype(np.int8)
+		mode[dashing] = PS_DASH
+		mode[spitting & (spit >= CDOWN_SPIT - 0.5)] = PS_SPIT
+		State[p,k] = (state & PS_HOLD) | mode
+		speed = np.full(len(k), 0.3)
+		speed[dashing] = 0.5
+		speed[holding] = 0.25
+		speed *= norms[p,k] * moving
+
+		# Déplacement
+		angle = angles[p,k]
+		x, y = ComputeMovements(X[p,k], Y[p,k],
+			speed * np.cos(angle), speed * np.sin(angle), dt)
+		X[p,k], Y[p,k] = x, y
+		Angle[p,k] = np.where(moving, angle, Angle[p,k])
+
+		# Attaque réussie sur l'adversaire qui tient la balle
+		tackle = dashing & (State[o,k] >= PS_HOLD) \
+			& (ComputeDistance(x,y, X[o,k],Y[o,k]) <= 0.2)
+		if tackle.any():
+			kt, ot = k[tackle], o[tackle]
+			o_angle = Angle[ot,kt]
+			State[ot,kt] = PS_SPIT
+			Spit[ot,kt] = CDOWN_SPIT
+			X[BALL,kt] = X[ot,kt] + 0.25*np.cos(o_angle)
+			Y[BALL,kt] = Y[ot,kt] + 0.25*WIN_RATIO*np.sin(o_angle)
+			Angle[BALL,kt] = o_angle
+			State[BALL,kt] &= 3
+			self.BallCooldown[kt] = CDOWN_BALL
+			self.Tackles[p[tackle],kt] += 1
+
+		# Récupération de la balle si elle n'est pas tenue, sinon but si le
+		# joueur la tient dans le but adverse
+		free = State[BALL,k] < PS_HOLD
+		pickup = moving & free & (self.BallCooldown[k] <= 0.0) \
+			& (ComputeDistance(x,y, X[BALL,k],Y[BALL,k]) < 0.2)
+		State[p[pickup],k[pickup]] = PS_HOLD | PS_WALK
+		State[BALL,k[pickup]] |= PS_HOLD
+
+		goal = self.Goals[p]
+		scored = moving & ~free & (State[p,k] >= PS_HOLD) \
+			& (goal[:,0] <= x) & (x <= goal[:,1])
+		self.Score[p[scored],k[scored]] += 1
+		self.Scorer[k[scored]] = p[scored]
+		return scored
+
+	# Déplace la balle vers sa cible dans chaque partie sélectionnée par m où
+	# elle n'est pas tenue (fin de engine.Step())
+	def BallStep(self, m, dt):
+		x, y, angle = self.X[BALL], self.Y[BALL], self.Angle[BALL]
+		t_x, t_y = self.BallTarget
+		buffer, distance = self.Buffer
+		free = self.State[BALL] < PS_HOLD
+		free &= m
+
+		# Distance de chaque balle à sa cible (mêmes opérations que
+		# physics.ComputeDistance())
+		np.subtract(x, t_x, out=distance)
+		np.multiply(distance, distance, out=distance)
+		np.subtract(y, t_y, out=buffer)
+		np.multiply(buffer, buffer, out=buffer)
+		buffer *= WIN_RATIO
+		distance += buffer
+		np.sqrt(distance, out=distance)
+
+		# Nouvelles cibles aléatoires tant que la balle est proche de la sienne
+		k = np.flatnonzero(free & (distance <= 0.1))
+		while len(k):
+			t_x[k] = 0.4*self.RandomDraw(k) - 0.2
+			t_y[k] = 2.0*self.RandomDraw(k) - 1.0
+			distance[k] = ComputeDistance(x[k],y[k], t_x[k],t_y[k])
+			k = k[distance[k] <= 0.1]
+
+		# Déplacement des balles libres vers leur cible. Les balles tenues
+		# sont calculées aussi puis ignorées: leur distance est augmentée de 1
+		# pour ne jamais être nulle
+		distance += ~free
+		direction = np.subtract(t_x, x)
+		direction /= distance
+		np.arccos(direction, out=direction)
+		# L'angle est négatif si la cible est en dessous de la balle
+		np.subtract(t_y, y, out=buffer)
+		np.copysign(direction, buffer, out=direction)
+		Select(angle, direction, free)
+		np.cos(direction, out=buffer)
+		buffer *= 0.2
+		buffer *= dt
+		buffer *= free
+		x += buffer
+		np.sin(direction, out=buffer)
+		buffer *= 0.2
+		buffer *= WIN_RATIO
+		buffer *= dt
+		buffer *= free
+		y += buffer
+		for position in x, y:
+			np.minimum(position, 1.0, out=position)
+			np.maximum(position, -1.0, out=position)
+		self.State[BALL] |= free * np.int8(PS_WALK)
+
+###############################################################################
@@ -0,0 +1,157 @@
+###############################################################################
+# BENCHRENDER.PY: Programme qui mesure la vitesse de dessin de chaque         #
+#                 écran du jeu sans écran ni carte graphique: la SDL utilise  #
+#                 un pilote vidéo sans affichage (dummy ou offscreen) et le   #
+#                 pilote de rendu logiciel, sans synchronisation verticale.   #
+#                 Le résultat (images par seconde, copies par image, durées   #
+#                 médiane et 99ème centile d'une image) est écrit en JSON     #
+#                                                                             #
+# Utilisation: python benchrender.py [-n IMAGES] [-d PILOTE] [-s GRAINE]      #
+#                                    [-o FICHIER]                             #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import argparse, json, os, platform, sys, time
+
+# Pour les systèmes utilisant Windows, configuration du chemin d'accès vers les
+# fichiers DLL de la bibliothèque SDL2 (voir main.py)
+if platform.system() == "Windows":
+	os.environ["PYSDL2_DLL_PATH"] = \
+		os.getcwd() + "/sdl2-dll-" + platform.architecture()[0]
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > Percentile(samples, fraction):
+# Retourne la valeur d'une liste triée en dessous de laquelle se trouve une
+# fraction donnée des valeurs
+# Paramètres:
+#   samples: liste triée de valeurs
+#   fraction: fraction entre 0 et 1 (0.5: médiane)
+def Percentile(samples, fraction):
+	return samples[min(int(len(samples) * fraction), len(samples) - 1)]
+
+
+# > BenchScreen(screen, frames, step):
+# Dessine plusieurs fois une interface et mesure la durée de chaque image.
+# Chaque image est réellement dessinée et affichée, même si elle est
+# identique à la précédente
+# Paramètres:
+#   screen: instance d'une classe héritée de ui.Ui
+#   frames: nombre d'images à dessiner
+#   step: fonction sans paramètre appelée avant chaque image (None: aucune)
+# Retourne un dictionnaire contenant les mesures
+def BenchScreen(screen, frames, step=None):
+	durations, copies, rects = [], [], []
+	start = time.perf_counter()
+	for frame in range(frames):
+		if step:
+			step()
+		display.LastDrawList = None
+		frameStart = time.perf_counter()
+		with gui.RenderLock:
+			screen.Draw()
+		durations.append(time.perf_counter() - frameStart)
+		copies.append(perf.Counters[CT_COPIES])
+		rects.append(perf.Counters[CT_RECTS])
+		perf.EndFrame(durations[-1])
+	elapsed = time.perf_counter() - start
+
+	durations.sort()
+	return {"frames": frames,
+		"fps": frames / sum(durations),
+		"draw_calls": sum(copies) / frames,
+		"draw_calls_max": max(copies),
+		"rect_allocs": sum(rects) / frames,
+		"p50_ms": Percentile(durations, 0.5) * 1000,
+		"p99_ms": Percentile(durations, 0.99) * 1000,
+		"elapsed_s": elapsed}
+
+
+# > StepMatch():
+# Fait avancer la partie de game.Match d'une image (à 60 images par seconde)
+# avec les joueurs contrôlés par bots.ChaseBot, puis publie son instantané.
+# Une nouvelle partie commence quand la précédente est terminée
+def StepMatch():
+	for tick in range(round(TICK_RATE / 60)):
+		if game.Match.Over:
+			game.Match = engine.MatchState(game.Match.Seed + 1, timed=True)
+			game.Publish(True)
+		inputs = [bots.ChaseBot(game.Match, PLAYER1),
+			bots.ChaseBot(game.Match, PLAYER2)]
+		events = engine.Step(game.Match, inputs, TICK_TIME)
+		game.Publish(any(event == EV_RESET for event, player in events))
+
+###############################################################################
+
+# PROGRAMME PRINCIPAL
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description="Mesure la vitesse de dessin des écrans de Raptor Ball")
+	parser.add_argument("-n", "--frames", type=int, default=300,
+		help="nombre d'images dessinées par écran")
+	parser.add_argument("-d", "--driver", default="dummy",
+		help="pilote vidéo de la SDL (dummy ou offscreen)")
+	parser.add_argument("-s", "--seed", type=int, default=0,
+		help="graine de la partie affichée")
+	parser.add_argument("-o", "--output",
+		help="fichier où écrire le résultat (sinon sortie standard)")
+	args = parser.parse_args()
+
+	# Pilotes de la SDL choisis avant son chargement
+	os.environ["SDL_VIDEODRIVER"] = args.driver
+	os.environ["RAPTOR_RENDERER"] = "software"
+
+	# Chargement et initialisation de la SDL2 et des extensions sdlimage et
+	# sdlttf (voir main.py)
+	from sdl2 import *
+	from sdl2.sdlimage import *
+	from sdl2.sdlttf import *
+	if SDL_Init(SDL_INIT_VIDEO) != 0:
+		sys.exit("Initialisation de la SDL impossible: " +
+			SDL_GetError().decode())
+	IMG_Init(IMG_INIT_PNG)
+	TTF_Init()
+
+	from constants import *
+	import bots, display, engine, game, gui, perf, ui
+
+	gui.OpenWindow()
+	gui.Init()
+	Info = SDL_RendererInfo()
+	SDL_GetRendererInfo(display.Renderer, Info)
+
+	game.Match = engine.MatchState(args.seed, timed=True)
+	game.Publish(True)
+
+	results = {"video_driver": SDL_GetCurrentVideoDriver().decode(),
+		"renderer": Info.name.decode(), "screens": {}}
+	# Ecrans mesurés: nom, classe de l'interface (instanciée juste avant la
+	# mesure car les menus de texte génèrent leurs textes à leur création),
+	# fonction appelée avant chaque image et état du jeu
+	screens = [
+		("title", ui.UiTitleScreen, None, GS_NPLAYING),
+		("rules", ui.UiRulesScreen, None, GS_NPLAYING),
+		("about", ui.UiAboutScreen, None, GS_NPLAYING),
+		("game", ui.UiGame, StepMatch, GS_PLAYING),
+		("paused", ui.UiGame, None, GS_PAUSED),
+		("game_over", ui.UiGameOverScreen, None, GS_NPLAYING)]
+	for name, screen, step, state in screens:
+		game.GameState = state
+		results["screens"][name] = BenchScreen(screen(), args.frames, step)
+		print("{0}: {1:.0f} img/s".format(name,
+			results["screens"][name]["fps"]), file=sys.stderr)
+
+	gui.CloseWindow()
+	TTF_Quit()
+	IMG_Quit()
+	SDL_Quit()
+
+	output = open(args.output, "w") if args.output else sys.stdout
+	json.dump(results, output, indent=1)
+	output.write("\n")
+
+###############################################################################
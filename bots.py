@@ -0,0 +1,58 @@
+###############################################################################
+# BOTS.PY: Module qui définit des joueurs contrôlés par l'ordinateur pour les #
+#          parties simulées sans affichage avec le module engine             #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import math
+# Locales
+from constants import *
+import physics
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > ChaseBot(state, player):
+# Joueur simple qui poursuit la balle, attaque l'adversaire qui la tient et
+# l'amène dans le but adverse lorsqu'il la tient
+# Paramètres:
+#   state: engine.MatchState de la partie
+#   player: identifiant du joueur contrôlé (PLAYER1 ou PLAYER2 par défaut)
+# Retourne les contrôles du joueur au format [vecteur vitesse, état de la
+# touche action]
+def ChaseBot(state, player):
+	Entities = state.Entities
+	X, Y, State = Entities.X, Entities.Y, Entities.State
+	x, y = X[player], Y[player]
+	action = False
+
+	# Adversaire tenant la balle (None si aucun)
+	holder = None
+	for opponent in state.Opponents[player]:
+		if State[opponent] & PS_HOLD:
+			holder = opponent
+
+	# Si le joueur tient la balle, il se dirige vers le but adverse
+	if State[player] & PS_HOLD:
+		t_x, t_y = [0.95, -0.95][Entities.Team[player]], 0.0
+	# Si un adversaire tient la balle, il le poursuit et l'attaque lorsqu'il
+	# est assez proche
+	elif holder is not None:
+		t_x, t_y = X[holder], Y[holder]
+		action = physics.ComputeDistance(x,y, t_x,t_y) < 0.4
+	# Sinon il se dirige vers la balle
+	else:
+		t_x, t_y = X[state.Ball], Y[state.Ball]
+
+	# Immobile si la cible est atteinte
+	if physics.ComputeDistance(x,y, t_x,t_y) < 0.01:
+		return [(0.0, 0.0), action]
+
+	# Angle du déplacement vers la cible (en corrigeant les déformations dues
+	# au format de la fenêtre, voir physics.ComputeMovements())
+	angle = math.atan2((t_y-y) / WIN_RATIO, t_x-x)
+	return [(angle, 1.0), action]
+
+###############################################################################
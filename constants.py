@@ -10,7 +10,12 @@ PLAYER2 = 1 # Joueur 2 (raptor rouge)
 BALL    = 2 # Balle (poulet)
 
 
-# Globale controls.PlayersControls[][]:
+# Types d'entités de entities.ComponentStore.Kind[]:
+KIND_PLAYER = 0 # Joueur
+KIND_BALL   = 1 # Balle
+
+
+# Globale game.PlayersInputs[][]:
 # 1er indice du tableau: joueur concerné
 # Constantes générales PLAYER1 ou PLAYER2
 # 2eme indice du tableau: vecteur vélocité ou état touche d'action
@@ -18,7 +23,17 @@ PC_VELOCT = 0 # Tableau représentant le vecteur vitesse recherché par le joueu
 PC_ACTION = 1 # Etat de la touche Action
 
 
-# Globale game.Positions[][]:
+# Commandes de la file controls.Commands (tuples):
+IC_DATE   = 0 # Date de l'évènement d'origine (domaine de time.perf_counter())
+IC_PLAYER = 1 # Joueur concerné (PLAYER1 ou PLAYER2)
+IC_TYPE   = 2 # Type de la commande (IN_...)
+IC_VALUE  = 3 # Valeur de la commande (dépend du type)
+# Types des commandes:
+IN_VELOCITY = 0 # Nouveau vecteur vitesse recherché par le joueur (tuple)
+IN_ACTION   = 1 # Touche Action enfoncée (True) ou relâchée (False)
+
+
+# Champs Positions[][] de game.Snapshot (voir ComponentStore.Position()):
 # 1er indice du tableau: joueurs concerné
 # Constantes générales PLAYER1, PLAYER2, et BALL
 # 2ème indice du tableau: coordonnées et orientation
@@ -37,25 +52,73 @@ TD_INIT = 0 # Paramètre initialement passé à Load...Textures() et permettant
 			# à ces textures d'être rechargées (le format du contenu de ce
 			# tableau est identique à celui décrit dans les commentaires
 			# introduisant chaque fonction Load...Textures())
-TD_DATA = 1 # Données supplémentaires (TD_ANIMATED et TD_LABEL)
 # 3eme indice du tableau: identifiant numérique de la texture concernée
 # 4eme indice du tableau (pour TD_ANIMATED > TD_INIT):
 TD_ANIM_FOLDERNAME  = 0 # Nom du sous-dossier contenant chaque image de
                         # l'animation
 TD_ANIM_FRAMECOUNT  = 1 # Nombre d'images dans l'animation
 TD_ANIM_FRAMELENGTH = 2 # Durée d'affichage de chaque image en secondes
-# 4eme indice du tableau (pour TD_ANIMATED > TD_DATA):
-TD_ANIM_LASTFRAME = 0 # Valeur décimale indiquant quelle a été la dernière
-					  # image de l'animation a être affichée
-TD_ANIM_LASTTIME  = 1 # Date du dernier affichage de l'animation
 # 4eme indice du tableau (pour TD_LABEL > TD_INIT):
 TD_LABEL_TEXT  = 0 # Texte affiché
 TD_LABEL_FONT  = 1 # Police d'écriture du texte
 TD_LABEL_SIZE  = 2 # Taille de la police en points
 TD_LABEL_COLOR = 3 # Couleur du texte
-# 4eme indice du tableau (pour TD_LABEL > TD_DATA):
-TD_LABEL_WIDTH  = 0 # Largeur de la texture de texte en pixels
-TD_LABEL_HEIGHT = 1 # Hauteur de la texture de texte en pixels
+
+
+# Placements retournés par atlas.Pack() (position d'une image dans un atlas):
+AT_PAGE = 0 # Indice de la page de l'atlas
+AT_X    = 1 # Coordonnées du coin supérieur gauche de l'image dans la page
+AT_Y    = 2
+
+# Entrées du cache des textures de texte de display (display.LabelCache):
+LC_TEXTURE = 0 # SDL_Texture contenant le texte
+LC_SURFACE = 1 # SDL_Surface à partir de laquelle la texture a été créée
+
+# Atlas de glyphes de display (display.GlyphAtlases):
+GA_TEXTURE = 0 # SDL_Texture regroupant l'image de chaque glyphe
+GA_SURFACE = 1 # SDL_Surface à partir de laquelle la texture a été créée
+GA_GLYPHS  = 2 # Dictionnaire caractère -> tuple indexé par GG_...
+GA_KERNING = 3 # Dictionnaire (caractère, caractère suivant) -> approche en
+               # pixels (seules les paires dont l'approche n'est pas nulle)
+GA_HEIGHT  = 4 # Hauteur d'une ligne de texte en pixels
+# Glyphes d'un atlas de glyphes:
+GG_RECT    = 0 # SDL_Rect de la zone de la texture occupée par le glyphe
+GG_OFFSET  = 1 # Décalage horizontal de l'image par rapport à la position du
+               # glyphe en pixels
+GG_ADVANCE = 2 # Avancée horizontale jusqu'au glyphe suivant en pixels
+GG_WIDTH   = 3 # Largeur et hauteur de l'image du glyphe en pixels (copie
+GG_HEIGHT  = 4 # des champs de GG_RECT, plus rapide à lire)
+
+# Commandes de dessin de display (display.DrawList):
+DC_LAYER   = 0 # Couche de la commande (LY_...)
+DC_KEY     = 1 # Identité de la texture (clé de tri des commandes)
+DC_TEXTURE = 2 # SDL_Texture à copier
+DC_SOURCE  = 3 # SDL_Rect de la zone de la texture à copier (None: toute la
+               # texture)
+DC_DEST    = 4 # Tuple (x, y, largeur, hauteur) de la zone de l'écran où la
+               # texture est copiée
+DC_ANGLE   = 5 # Angle de rotation en degrés (sens indirect)
+
+# Couches de dessin (une couche est dessinée au-dessus des précédentes):
+LY_BACKGROUND = 0 # Fond de l'écran (terrain, écran titre)
+LY_BALL       = 1 # Balle
+LY_PLAYERS    = 2 # Joueurs
+LY_PANEL      = 3 # Fonds des menus et de l'affichage du score
+LY_BUTTON     = 4 # Fonds des boutons (au-dessus des fonds des menus)
+LY_TEXT       = 5 # Textes des menus, des boutons et du score
+LY_OVERLAY    = 6 # Fond de l'affichage des performances
+LY_OVERLAYTXT = 7 # Texte de l'affichage des performances
+
+# Ecrans et menus dessinés une seule fois dans une texture (voir
+# display.DrawCached()):
+SCR_TITLE    = 0 # Ecran titre
+SCR_TEXT     = 1 # Menus A propos et Règles
+SCR_GAMEOVER = 2 # Menu partie terminée
+SCR_PAUSE    = 3 # Menu pause
+# Textures des écrans (display.Screens):
+SC_TEXTURE    = 0 # SDL_Texture cible de rendu contenant l'écran
+SC_KEY        = 1 # Clé décrivant le contenu dessiné dans la texture
+SC_GENERATION = 2 # Valeur de display.Generation lors du dessin
 
 
 # Indices pour accéder à des variables correspondant à des vecteurs:
@@ -63,16 +126,16 @@ VEC_ANGLE = 0 # Angle en radians dans le sens direct du vecteur avec l'axe xx'
 VEC_NORM = 1  # Norme du vecteur
 
 
-# Indices pour accéder aux booléens dans le tableau Keys dans display.Run() et
-# display.TranslateKbInput():
+# Indices pour accéder aux booléens dans le tableau Keys dans
+# controls.HandleEvent() et physics.TranslateKbInput():
 KEY_UP    = 0 # Touche Haut
 KEY_LEFT  = 1 # Touche Gauche
 KEY_DOWN  = 2 # Touche Bas
 KEY_RIGHT = 3 # Touche Droite
 
 
-# Valeurs prises par keystate dans display.Run() décrivant l'état d'une touche
-# de clavier:
+# Valeurs prises par keystate dans controls.HandleEvent() décrivant l'état
+# d'une touche de clavier:
 KS_RELEASED = False  # Une touche a été relachée
 KS_PRESSED  = True   # Une touche a été enfoncée
 
@@ -83,8 +146,43 @@ GS_PLAYING  = 1 # Une partie est en cours
 GS_PAUSED   = 2 # Une partie est en cours mais en pause
 
 
-# Valeurs prises par chaque élément dans game.PlayerState décrivant l'état d'un
-# joueur ou de la balle
+# Types d'évènements retournés par engine.Step() (sous la forme de tuples
+# (EV_..., joueur concerné ou None)):
+EV_DASH   = 0 # Un joueur a déclenché une attaque
+EV_TACKLE = 1 # Un joueur a fait perdre la balle à son adversaire
+EV_GOAL   = 2 # Un joueur a marqué un but
+EV_END    = 3 # La partie est terminée
+EV_RESET  = 4 # Les joueurs et la balle ont été replacés (remise en jeu)
+
+
+# Phases d'une partie (engine.MatchState.Phase):
+MP_KICKOFF = 0 # Compte à rebours avant le coup d'envoi
+MP_PLAY    = 1 # Jeu en cours
+MP_GOAL    = 2 # Un but vient d'être marqué (positions figées)
+MP_RESET   = 3 # Joueurs replacés, compte à rebours avant la reprise du jeu
+
+
+# Séries de mesures du module perf (perf.Buffers[]):
+PF_TICK    = 0  # Durée d'une mise à jour de la partie en secondes
+PF_TICKGAP = 1  # Intervalle entre le début de deux mises à jour en secondes
+PF_DRAW    = 2  # Durée des appels de dessin d'une image en secondes
+PF_PRESENT = 3  # Durée de SDL_RenderPresent() pour une image en secondes
+PF_FRAME   = 4  # Intervalle entre la fin de deux images en secondes
+PF_EVENTS  = 5  # Durée du traitement des évènements par controls en secondes
+PF_QUEUE   = 6  # Nombre d'évènements retirés de la file de la SDL par réveil
+PF_COPIES  = 7  # Nombre d'appels à SDL_RenderCopy(Ex)() par image
+PF_LABELS  = 8  # Nombre de textures de texte créées ou recréées par image
+PF_LATE    = 9  # Retard en secondes des images ratées (voir pacer)
+PF_RECTS   = 10 # Nombre de SDL_Rect créés pendant le dessin d'une image
+
+# Compteurs par image du module perf (perf.Counters[]):
+CT_COPIES = 0 # Appels à SDL_RenderCopy() et SDL_RenderCopyEx()
+CT_LABELS = 1 # Textures de texte créées ou recréées
+CT_RECTS  = 2 # SDL_Rect créés pour les zones de destination des copies
+
+
+# Valeurs prises par chaque élément de ComponentStore.State décrivant l'état
+# d'un joueur ou de la balle
 PS_STOP = 0 # Immobile
 PS_WALK = 1 # Marche
 PS_DASH = 2 # Attaque (uniquement pour les joueurs)
@@ -122,11 +220,14 @@ LBL_RESUME   =  5 # Texte du bouton 'Reprendre' du menu pause
 LBL_NEWGAME  =  6 # Texte du bouton 'Rejouer' du menu partie terminée
 LBL_PAUSE    =  7 # Titre du menu pause
 LBL_GAMEOVER =  8 # Titre du menu partie terminée
-LBL_SCOREP1  =  9 # Score du joueur 1
-LBL_SCOREP2  = 10 # Score du joueur 2
-LBL_TIMER    = 11 # Temps restant de la partie
-LBL_GOVERMSG = 12 # Message affiché lorsque la partie est terminée
-LBL_TEXTSCR  = 13 # N°13 à 25: lignes des textes des menus A propos et Règles
+LBL_GOVERMSG =  9 # Message affiché lorsque la partie est terminée
+LBL_TEXTSCR  = 10 # N°10 à 21: lignes des textes des menus A propos et Règles
+LBL_PHASE    = 22 # Compte à rebours ou message des phases de la partie
+#  -- Atlas de glyphes (textes modifiés à chaque image) --
+GL_SCOREP1 = 0 # Score du joueur 1
+GL_SCOREP2 = 1 # Score du joueur 2
+GL_TIMER   = 2 # Temps restant de la partie
+GL_PERF    = 3 # Lignes de l'affichage des performances
 
 
 # Résolution de la fenêtre du jeu:
@@ -135,10 +236,39 @@ WIN_HEIGHT = 720  # Hauteur (valeur conseillée: 720)
 WIN_RATIO  = WIN_WIDTH / WIN_HEIGHT # Rapport Largeur/Hauteur de la fenêtre
 
 
-# Durée d'attente en secondes pour les fonctions time.sleep():
-# Si trop élevée : le jeu est peu réactif et saccadé
-# Si trop court : utilisation excessive du processeur
-WAIT_TIME = 0.01
+# Durée maximale en millisecondes pendant laquelle le thread des contrôles
+# attend un évènement avant de vérifier si le jeu est toujours en cours
+# d'exécution (un évènement le réveille immédiatement)
+CONTROLS_TIMEOUT = 100
+# Nombre maximal d'évènements retirés de la file d'attente de la SDL par appel
+# à SDL_PeepEvents() dans le thread des contrôles
+EVENT_BATCH = 64
+
+# Durée maximale en secondes pendant laquelle le thread de l'interface attend
+# que le contexte de rendu soit de nouveau prêt avant de vérifier si le jeu est
+# toujours en cours d'exécution
+RENDERER_TIMEOUT = 0.1
+
+# Choix du pilote de rendu (voir display.CreateRenderer()): variable
+# d'environnement imposant un pilote (comme l'indication SDL_RENDER_DRIVER de
+# la SDL), nombre d'images et de copies par image de l'essai de vitesse de
+# chaque pilote et taille en pixels de la texture copiée
+RENDERER_ENV = "RAPTOR_RENDERER"
+PROBE_FRAMES = 4
+PROBE_COPIES = 400
+PROBE_SIZE = 64
+
+# Fréquence de la simulation du jeu en mises à jour par seconde (120 ou 240
+# conseillé) et durée fixe d'une mise à jour en secondes
+TICK_RATE = 120
+TICK_TIME = 1.0 / TICK_RATE
+# Nombre maximum de mises à jour effectuées d'affilée pour rattraper un retard
+# (au-delà, le retard est abandonné pour éviter que la simulation ne s'emballe)
+MAX_SUBSTEPS = 8
+
+# Masque des entiers sur 64 bits utilisés par le générateur aléatoire des
+# parties (engine.SeededRandom())
+RNG_MASK = 0xFFFFFFFFFFFFFFFF
 
 # Décomptes du jeu en secondes
 CDOWN_DASH = 2.0 # Décompte limitant l'attaque d'un joueur
@@ -146,4 +276,48 @@ CDOWN_SPIT = 1.0 # Décompte immbobilisant un joueur attaqué
 CDOWN_BALL = 1.0 # Décompte empêchant la balle d'être attrapée juste après
                  #avoir été relâchée
 
+# Taille maximale en pixels des pages des atlas de textures (réduite si le
+# contexte de rendu ne supporte pas des textures aussi grandes) et espace en
+# pixels laissé libre autour de chaque texture dans une page
+ATLAS_SIZE = 2048
+ATLAS_PADDING = 1
+
+# Paquet de textures pré-décodées créé par pack.py (voir assets)
+ASSET_PACK = "textures/textures.pack"
+
+# Taille maximale en octets des pixels des textures de texte gardées en cache
+# par display (les textures les moins récemment utilisées sont libérées
+# au-delà)
+LABEL_CACHE_SIZE = 8 * 1024 * 1024
+
+# Nombre maximal de zones de destination des copies gardées en cache par
+# display sous forme de SDL_Rect (le cache est vidé au-delà)
+RECT_CACHE_SIZE = 1024
+
+# Nombre de mesures conservées par série du module perf, intervalle en
+# secondes entre deux mises à jour de l'affichage des performances et fichier
+# où les mesures sont sauvegardées à la fermeture du jeu
+PERF_SAMPLES = 512
+PERF_REFRESH = 0.25
+PERF_FILE = "perf.json"
+
+# Dossier où game enregistre les contrôles de chaque partie (voir replay, None:
+# pas d'enregistrement)
+REPLAY_FOLDER = "replays"
+
+# Cadence des images dessinées par ui lorsque SDL_RenderPresent() n'attend pas
+# la synchronisation verticale (voir pacer):
+FRAME_RATE      = 60    # Nombre d'images par seconde visé (0: pas de limite)
+PACER_SPIN      = 0.002 # Durée en secondes de l'attente active avant la fin
+                        # d'une image
+PACER_BLOCKING  = 0.25  # Part de la durée d'une image au-delà de laquelle
+                        # SDL_RenderPresent() est considérée bloquante
+PACER_SMOOTHING = 0.1   # Poids de chaque nouvelle durée dans la moyenne
+                        # glissante de la durée de SDL_RenderPresent()
+PACER_TOLERANCE = 0.5   # Retard en images au-delà duquel une image est ratée
+
+# Durées des phases d'une partie en secondes, indexées par MP_... (utilisées
+# uniquement par les parties affichées, voir engine.MatchState)
+PHASE_TIMES = (3.0, 0.0, 1.0, 1.0)
+
 ###############################################################################
@@ -5,20 +5,51 @@
 
 # IMPORTS
 # Python
+from collections import deque
 from threading import Thread
-import math, time
+import time
 # PySDL2
 from sdl2 import *
 # Locales
 from constants import *
-import game, ui
+import game, physics, ui, perf
 
 ###############################################################################
 
-# GLOBALE
-# Tableau constitué de deux tableaux contenant des variables correspondant aux
-# contrôles des joueurs (vecteur vitesse + état de la touche action)
-PlayersControls = [[(0.0, 0.0), False], [(0.0, 0.0), False]]
+# GLOBALES
+# File des commandes des joueurs (tuples indexés par IC_...) transmises au
+# thread de game dans l'ordre des évènements. Seul le thread de ce module
+# ajoute des commandes (append()) et seul celui de game en retire (popleft()):
+# ces deux opérations de collections.deque sont atomiques, aucun verrou n'est
+# nécessaire. Aucune commande n'est perdue, même quand une touche est enfoncée
+# puis relâchée entre deux mises à jour de la partie
+Commands = deque()
+# Dernier vecteur vitesse transmis pour chaque joueur (une touche qui ne change
+# pas la direction d'un joueur ne produit pas de commande)
+Velocities = [(0.0, 0.0), (0.0, 0.0)]
+# Etat des 4 touches directionnelles de chaque joueur (indexées par KEY_...),
+# tenu à jour évènement par évènement: un lot d'évènements peut contenir
+# l'appui et le relâchement d'une même touche, que l'état du clavier après le
+# lot (SDL_GetKeyboardState()) ne montrerait pas
+PlayersKeys = [[False, False, False, False], [False, False, False, False]]
+# Joueur et touche directionnelle (KEY_...) associés à chaque scancode
+# JOUEUR 1: WASD (ZQSD sur un clavier AZERTY)
+# JOUEUR 2: Touches fléchées
+DirectionKeys = {
+	SDL_SCANCODE_W: (PLAYER1, KEY_UP), SDL_SCANCODE_A: (PLAYER1, KEY_LEFT),
+	SDL_SCANCODE_S: (PLAYER1, KEY_DOWN), SDL_SCANCODE_D: (PLAYER1, KEY_RIGHT),
+	SDL_SCANCODE_UP: (PLAYER2, KEY_UP), SDL_SCANCODE_LEFT: (PLAYER2, KEY_LEFT),
+	SDL_SCANCODE_DOWN: (PLAYER2, KEY_DOWN),
+	SDL_SCANCODE_RIGHT: (PLAYER2, KEY_RIGHT)}
+# Types d'évènements de la SDL que le jeu n'utilise pas (mouvements de la
+# souris, saisie de texte, écrans tactiles, etc), ignorés dès leur source
+IgnoredEvents = [SDL_TEXTEDITING, SDL_TEXTINPUT, SDL_MOUSEMOTION,
+	SDL_MOUSEBUTTONDOWN, SDL_MOUSEWHEEL, SDL_FINGERDOWN, SDL_FINGERUP,
+	SDL_FINGERMOTION, SDL_DOLLARGESTURE, SDL_DOLLARRECORD, SDL_MULTIGESTURE,
+	SDL_CLIPBOARDUPDATE, SDL_DROPFILE]
+# Différence en secondes entre time.perf_counter() et l'horloge de la SDL
+# (SDL_GetTicks()) qui date les évènements (None: pas encore mesurée)
+TicksOffset = None
 
 ###############################################################################
 
@@ -43,122 +74,147 @@ def Run():
 	# Initialisation du sous-système vidéo de la SDL via le module UI
 	ui.InitSDLVideoSubSystem()
 
-	# SDL_Event représentant un évenement
-	Event = SDL_Event()
+	# Les types d'évènements inutilisés ne sont plus ajoutés à la file
+	# d'attente par la SDL
+	for type in IgnoredEvents:
+		SDL_EventState(type, SDL_IGNORE)
+
+	# Tableau de SDL_Event alloué une seule fois et rempli par lots
+	Events = (SDL_Event * EVENT_BATCH)()
 
 	while game.Running:
-		# Tant qu'il y'a un évènement dans la file d'attente, on le traite
-		while SDL_PollEvent(Event) != 0:
-			# L'évènenement est un évènement de type clavier (changement de
-			# l'état d'une touche du clavier)
-			if (Event.type == SDL_KEYDOWN or Event.type == SDL_KEYUP) \
-			and Event.key.repeat == 0:
-
-				# Variable indiquant l'état de la touche qui vient de changer
-				# d'état
-				# (KS_RELEASED=False : relâchée, True=KS_PRESSED : enfoncée)
-				keystate = bool(Event.key.state)
-
-				# Touche Echap: entrée ou sortie du mode pause du jeu
-				if Event.key.keysym.sym == SDLK_ESCAPE \
-				and keystate == KS_RELEASED:
-					# Selon l'état actuel du jeu on met en pause ou reprend le
-					# jeu
-					if game.GameState == GS_PLAYING:
-						game.GameState = GS_PAUSED
-					elif game.GameState == GS_PAUSED:
-						game.GameState = GS_PLAYING
-
-				# Touche F11: activation/désactivation du mode plein-écran
-				if Event.key.keysym.sym == SDLK_F11 \
-				and keystate == KS_RELEASED:
-					ui.ToggleFullscreen()
-
-				# Quelquesoit la touche qui a changé d'état, on récupère l'état
-				# de tout le clavier
-				kbstate = SDL_GetKeyboardState(None)
-
-				# Tableau qui contiendra l'état des 4 touches directionnelles
-				# d'un joueur)
-				Keys = [False, False, False, False]
-
-				# JOUEUR 1: WASD (ZQSD sur un clavier AZERTY) + Espace
-				# Récupération de l'état de chaque touche directionnelle
-				Keys[KEY_UP] = bool(kbstate[SDL_SCANCODE_W])
-				Keys[KEY_LEFT] = bool(kbstate[SDL_SCANCODE_A])
-				Keys[KEY_DOWN] = bool(kbstate[SDL_SCANCODE_S])
-				Keys[KEY_RIGHT] = bool(kbstate[SDL_SCANCODE_D])
-				# Traduction de l'état des touches directionnelles en vecteur
-				# vitesse sauvegardé dans PlayersControls
-				PlayersControls[PLAYER1][PC_VELOCT] = TranslateKbInput(Keys)
-				# Sauvegarde de l'état de la touche action (Espace) dans
-				# PlayersControls
-				if Event.key.keysym.sym == SDLK_SPACE:
-					PlayersControls[PLAYER1][PC_ACTION] = keystate
-
-				# JOUEUR 2 : Touches fléchées + 0 (Pavé numérique)
-				# Idem que pour le joueur 1 mais avec des touches différentes
-				Keys[KEY_UP] = bool(kbstate[SDL_SCANCODE_UP])
-				Keys[KEY_LEFT] = bool(kbstate[SDL_SCANCODE_LEFT])
-				Keys[KEY_DOWN] = bool(kbstate[SDL_SCANCODE_DOWN])
-				Keys[KEY_RIGHT] = bool(kbstate[SDL_SCANCODE_RIGHT])
-				PlayersControls[PLAYER2][PC_VELOCT] = TranslateKbInput(Keys)
-				if Event.key.keysym.sym == SDLK_KP_0:
-					PlayersControls[PLAYER2][PC_ACTION] = keystate
-
-			# L'évènement est un clic gauche de souris
-			if Event.type == SDL_MOUSEBUTTONUP \
-			and Event.button.button == SDL_BUTTON_LEFT:
-				# Transfert des informations sur la position de la souris lors
-				# du clic à l'interface utilisateur actuellement affichée
-				ui.CurrentUi.OnClick(Event.button.x, Event.button.y)
-
-			# Gestion des évènements liés à la fenêtre du jeu
-			if Event.type == SDL_WINDOWEVENT:
-				# Bouton de fermeture de fenêtre: arrêt du jeu
-				if Event.window.event == SDL_WINDOWEVENT_CLOSE:
-					game.Running = False
-
-		# On laisse les ressources processeur utilisée par ce thread à d'autres
-		# threads du programme puisque la file d'attente est vide
-		time.sleep(WAIT_TIME)
-
-# > TranslateKbInput(keys):
-# Traduit un tableau de 4 booléens correspondants aux touches de déplacement
-# d'un joueur en un vecteur vitesse
+		# Attend qu'un évènement soit disponible (sans le retirer de la file):
+		# le thread est réveillé dès qu'un évènement arrive, et au plus tard
+		# après CONTROLS_TIMEOUT millisecondes pour vérifier si le jeu est
+		# toujours en cours
+		if SDL_WaitEventTimeout(None, CONTROLS_TIMEOUT) == 0:
+			continue
+		SyncClock()
+
+		# Retire les évènements de la file par lots de EVENT_BATCH en un seul
+		# appel à SDL_PeepEvents() par lot et les traite, en mesurant leur
+		# nombre et la durée de leur traitement
+		start = time.perf_counter()
+		depth, count = 0, EVENT_BATCH
+		while count == EVENT_BATCH:
+			count = SDL_PeepEvents(Events, EVENT_BATCH, SDL_GETEVENT,
+				SDL_FIRSTEVENT, SDL_LASTEVENT)
+			for i in range(count):
+				HandleEvent(Events[i])
+			depth += max(count, 0)
+
+		if depth > 0:
+			perf.Record(PF_QUEUE, depth)
+			perf.Record(PF_EVENTS, time.perf_counter() - start)
+
+# > HandleEvent(Event):
+# Traite un évènement de la SDL (clavier, souris, fenêtre, contexte de rendu)
+# Paramètre:
+#   Event: SDL_Event à traiter
+def HandleEvent(Event):
+	# L'évènenement est un évènement de type clavier (changement de
+	# l'état d'une touche du clavier)
+	if (Event.type == SDL_KEYDOWN or Event.type == SDL_KEYUP) \
+	and Event.key.repeat == 0:
+
+		# Variable indiquant l'état de la touche qui vient de changer
+		# d'état
+		# (KS_RELEASED=False : relâchée, True=KS_PRESSED : enfoncée)
+		keystate = bool(Event.key.state)
+
+		# Touche Echap: entrée ou sortie du mode pause du jeu
+		if Event.key.keysym.sym == SDLK_ESCAPE \
+		and keystate == KS_RELEASED:
+			# Selon l'état actuel du jeu on met en pause ou reprend le
+			# jeu
+			if game.GameState == GS_PLAYING:
+				game.SetGameState(GS_PAUSED)
+			elif game.GameState == GS_PAUSED:
+				game.SetGameState(GS_PLAYING)
+
+		# Touche F11: activation/désactivation du mode plein-écran
+		if Event.key.keysym.sym == SDLK_F11 \
+		and keystate == KS_RELEASED:
+			ui.ToggleFullscreen()
+
+		# Touche F3: activation/désactivation de l'affichage des
+		# performances
+		if Event.key.keysym.sym == SDLK_F3 \
+		and keystate == KS_RELEASED:
+			ui.TogglePerfOverlay()
+
+		date = EventDate(Event.key.timestamp)
+
+		# Touche directionnelle: mise à jour de l'état de la touche pour le
+		# joueur correspondant et traduction de l'état de ses 4 touches
+		# directionnelles en vecteur vitesse transmis au thread de game
+		direction = DirectionKeys.get(Event.key.keysym.scancode)
+		if direction is not None:
+			player, key = direction
+			PlayersKeys[player][key] = keystate
+			SendVelocity(player, physics.TranslateKbInput(PlayersKeys[player]),
+				date)
+
+		# Transmission de l'état de la touche action
+		# JOUEUR 1: Espace, JOUEUR 2: 0 (Pavé numérique)
+		if Event.key.keysym.sym == SDLK_SPACE:
+			Commands.append((date, PLAYER1, IN_ACTION, keystate))
+		if Event.key.keysym.sym == SDLK_KP_0:
+			Commands.append((date, PLAYER2, IN_ACTION, keystate))
+
+	# L'évènement est un clic gauche de souris
+	if Event.type == SDL_MOUSEBUTTONUP \
+	and Event.button.button == SDL_BUTTON_LEFT:
+		# Transfert des informations sur la position de la souris lors
+		# du clic à l'interface utilisateur actuellement affichée
+		ui.CurrentUi.OnClick(Event.button.x, Event.button.y)
+
+	# Gestion des évènements liés à la fenêtre du jeu
+	if Event.type == SDL_WINDOWEVENT:
+		# Bouton de fermeture de fenêtre: arrêt du jeu
+		if Event.window.event == SDL_WINDOWEVENT_CLOSE:
+			game.Stop()
+		# Le contenu de la fenêtre a été perdu et doit être redessiné
+		if Event.window.event == SDL_WINDOWEVENT_EXPOSED:
+			ui.Invalidate()
+
+	# Le contenu des textures cibles de rendu a été perdu: l'image
+	# doit être redessinée
+	if Event.type == SDL_RENDER_TARGETS_RESET:
+		ui.Invalidate()
+	# Le pilote d'affichage a perdu toutes les textures (changement de
+	# mode d'affichage sous Direct3D par exemple): elles sont recréées
+	# à partir des images gardées en mémoire
+	if Event.type == SDL_RENDER_DEVICE_RESET:
+		ui.RestoreTextures()
+
+# > SyncClock():
+# Mesure la différence entre time.perf_counter() et SDL_GetTicks(). La date
+# SDL_GetTicks() est arrondie à la milliseconde inférieure: la plus petite
+# différence mesurée est la plus proche de la réalité
+def SyncClock():
+	global TicksOffset
+	offset = time.perf_counter() - SDL_GetTicks() / 1000.0
+	if TicksOffset is None or offset < TicksOffset:
+		TicksOffset = offset
+
+# > EventDate(timestamp):
+# Convertit la date d'un évènement de la SDL dans le domaine de
+# time.perf_counter() (utilisé par le thread de game)
 # Paramètre:
-#   keys: tableau de 4 booléens correspondant à l'état des touches
-#         directionnelles d'un joueur dans l'ordre Haut, Bas, Gauche, Droite
-def TranslateKbInput(keys):
-	# Si aucune touche n'est pressée ou que les directions pressées s'annulent,
-	# retourne un vecteur vitesse nul
-	if keys[KEY_UP] == keys[KEY_DOWN] and keys[KEY_LEFT] == keys[KEY_RIGHT]:
-		return (0.0, 0.0)
-
-	# Traduit l'état de chaque touche appuyées ou non en coordonnées d'un point
-	# (x,y) dans un repère
-	x, y = 0, 0
-	if keys[KEY_UP]:
-		y += 1
-	if keys[KEY_DOWN]:
-		y -= 1
-	if keys[KEY_LEFT]:
-		x -= 1
-	if keys[KEY_RIGHT]:
-		x += 1
-
-	# Calcul l'angle formé entre l'axe horizontal et la demi-droite dont
-	# l'extrémité est l'origine# (0;0) du repère et qui passe par le point
-	# (x,y)
-	h = math.sqrt(x**2 + y**2)
-	angle = math.acos(x/h)
-
-	# Corrige la valeur calculée de l'angle s'il se trouve sous l'axe
-	# horizontal en le rendant négatif
-	if y < 0:
-		angle = -angle
-
-	# Retourne un vecteur vitesse avec l'angle calculé et une norme fixée à 1
-	return (angle, 1.0)
+#   timestamp: date de l'évènement en millisecondes (champ timestamp)
+def EventDate(timestamp):
+	return TicksOffset + timestamp / 1000.0
+
+# > SendVelocity(player, velocity, date):
+# Transmet le vecteur vitesse d'un joueur au thread de game s'il a changé
+# Paramètres:
+#   player: joueur concerné (PLAYER1 ou PLAYER2)
+#   velocity: vecteur vitesse (voir physics.TranslateKbInput())
+#   date: date de l'évènement d'origine (voir EventDate())
+def SendVelocity(player, velocity, date):
+	if velocity != Velocities[player]:
+		Velocities[player] = velocity
+		Commands.append((date, player, IN_VELOCITY, velocity))
 
 ###############################################################################
@@ -9,13 +9,17 @@
 
 # IMPORTS
 # Python
-import math, time
+from collections import OrderedDict
+from threading import Event, RLock
+from operator import itemgetter
+import ctypes, math, os, time
 # PySDL2
 from sdl2 import *
 from sdl2.sdlimage import *
 from sdl2.sdlttf import *
 # Locales
 from constants import *
+import assets, atlas, perf
 
 ###############################################################################
 
@@ -26,19 +30,89 @@ Window = None
 Icon = None
 # SDL_Renderer qui correspond au contexte de rendu 2D de la fenêtre
 Renderer = None
-# Booléen indiquant si le contexte de rendu est prêt à être utilisé
-RendererReady = False
-
-# Tableau de SDL_Texture correspondant aux textures figées
-FixedTextures = []
-# Tableau de tableaux contenant les SDL_Texture des images de chaque animation
-AnimatedTextures = []
-# Tableau de SDL_Texture correspondant aux textures de texte
+# Evènement (threading.Event) indiquant si le contexte de rendu est prêt à être
+# utilisé
+RendererReady = Event()
+# Verrou détenu par le thread qui utilise le contexte de rendu: pendant le
+# dessin d'une image (voir gui.RenderLock) et pendant les opérations qui
+# modifient la fenêtre ou les textures depuis un autre thread
+RendererLock = RLock()
+# Numéro incrémenté chaque fois que le contenu de la fenêtre est perdu et doit
+# être entièrement redessiné (changement de contexte de rendu, etc)
+Generation = 0
+
+# Masques des composantes rouge, verte, bleue et alpha d'un pixel de 32 bits
+# dont les octets sont dans l'ordre R, G, B, A en mémoire (format des pages de
+# l'atlas et des images du paquet de textures)
+if SDL_BYTEORDER == SDL_LIL_ENDIAN:
+	RGBAMasks = (0x000000FF, 0x0000FF00, 0x00FF0000, 0xFF000000)
+else:
+	RGBAMasks = (0xFF000000, 0x00FF0000, 0x0000FF00, 0x000000FF)
+
+# Tableau de SDL_Texture correspondant aux pages de l'atlas qui regroupe les
+# textures figées et les images des animations, et SDL_Surface de ces pages
+# gardées en mémoire pour pouvoir recréer les textures sans recharger les
+# images (voir RestoreTextures())
+AtlasTextures = []
+AtlasSurfaces = []
+# Tableau contenant pour chaque texture figée un tuple (page de l'atlas,
+# SDL_Rect de la zone de la page occupée par la texture)
+FixedRegions = []
+# Tableau de tableaux contenant la même information pour chaque image de
+# chaque animation
+AnimatedRegions = []
+# SDL_Surface des textures figées et des images des animations chargées mais
+# pas encore regroupées dans l'atlas par PackTextures()
+FixedSurfaces = []
+AnimatedSurfaces = []
+# Tableau de SDL_Texture correspondant aux textures de texte et clé dans
+# LabelCache du texte affiché par chacune
 LabelTextures = []
+LabelKeys = []
+# Tableau contenant pour chaque texture de texte un tuple (demi-largeur,
+# demi-hauteur, largeur, hauteur) calculé une fois par SetLabel()
+LabelExtents = []
+# Cache des textures de texte (ordonné du moins au plus récemment utilisé):
+# clé (texte, police, taille, couleur) -> tableau [SDL_Texture, SDL_Surface
+# gardée en mémoire pour RestoreTextures()] indexé par LC_...
+LabelCache = OrderedDict()
+# Taille en octets des pixels des images du cache
+LabelCacheBytes = 0
+# Polices d'écriture ouvertes (TTF_Font) indexées par (fichier, taille)
+Fonts = {}
+# Tableau des atlas de glyphes (indexé par GL_...): tableaux indexés par GA_...
+# contenant la texture et l'image regroupant les glyphes d'une police, d'une
+# taille et d'une couleur, la position et les mesures de chaque glyphe et
+# l'approche entre deux glyphes (crénage)
+GlyphAtlases = []
+# Liste des commandes de dessin de l'image en cours (tuples indexés par DC_...)
+# ajoutées par les fonctions Draw...() et exécutées en une fois par
+# DrawWindow(), liste des commandes de la dernière image affichée et valeur de
+# Generation lors de son affichage
+DrawList = []
+LastDrawList = None
+LastGeneration = None
+# Couche (LY_...) des commandes de dessin ajoutées à DrawList (voir SetLayer())
+Layer = LY_BACKGROUND
+# Zones de destination des copies gardées sous forme de SDL_Rect: tuple (x, y,
+# largeur, hauteur) -> SDL_Rect. Une zone n'y est ajoutée que lorsqu'elle est
+# utilisée une deuxième fois (éléments fixes: terrain, menus, textes): les
+# zones des éléments en mouvement utilisent ScratchRect, dont les champs sont
+# réécrits à chaque copie (la SDL ne garde pas le rectangle après l'appel)
+DestRects = {}
+SeenRects = set()
+ScratchRect = SDL_Rect()
+# Fonction donnant la clé de tri des commandes d'une texture: identité de
+# l'objet SDL_Texture (les objets ctypes ne sont pas hachables et les
+# paramètres nommés id des fonctions Draw...() masquent la fonction id())
+TextureKey = id
+# Textures cibles de rendu des écrans dessinés une seule fois (voir
+# DrawCached()): identifiant SCR_... -> tableau indexé par SC_...
+Screens = {}
 # Tableau à dimension variable contenant de nombreuse informations sur toutes
 # les textures utilisées par le jeu (textures fixes, animées, de texte) et
 # notamment les informations permettant de les charger de nouveau si nécessaire
-TexturesData = [[[]], [[], []], [[] , []]]
+TexturesData = [[[]], [[]], [[]]]
 
 ###############################################################################
 
@@ -47,7 +121,10 @@ TexturesData = [[[]], [[], []], [[] , []]]
 # > OpenWindow():
 # Ouvre la fenêtre du jeu et crée son contexte de rendu 2D
 def OpenWindow():
-	global Window, Icon, Renderer, RendererReady
+	global Window, Icon, Renderer
+
+	# Ouvre le paquet de textures pré-décodées s'il existe (voir LoadImage())
+	assets.OpenPack()
 
 	# Crée la fenêtre du jeu
 	Window = SDL_CreateWindow("Raptor Ball".encode(),
@@ -58,69 +135,321 @@ def OpenWindow():
 	Icon = LoadImage("icon.png")
 	SDL_SetWindowIcon(Window, Icon)
 
-	# Utilise le premier pilote d'affichage supportant la synchronisation de la
-	# fréquence de raffraichissement de l'écran disponible pour créer le
-	# contexte de rendu 2D
-	Renderer = SDL_CreateRenderer(Window, -1, SDL_RENDERER_PRESENTVSYNC)
+	# Crée le contexte de rendu 2D avec le pilote de rendu le plus rapide
+	Renderer = CreateRenderer()
+	# Le contenu est dessiné dans un repère de WIN_WIDTH*WIN_HEIGHT pixels
+	# agrandi par la SDL pour remplir la fenêtre (mode plein-écran)
+	SDL_RenderSetLogicalSize(Renderer, WIN_WIDTH, WIN_HEIGHT)
 
-	# Indique que le contexte de rendu est prêt à être utilisé
-	RendererReady = True
+	# Indique que le contexte de rendu est prêt à être utilisé (réveille les
+	# threads qui attendent l'ouverture de la fenêtre)
+	RendererReady.set()
+
+
+
+# > CreateRenderer():
+# Crée le contexte de rendu 2D de la fenêtre avec la synchronisation de la
+# fréquence de raffraichissement de l'écran. Le pilote de rendu est celui
+# imposé par la variable d'environnement RENDERER_ENV ou par l'indication
+# SDL_RENDER_DRIVER de la SDL s'il existe, sinon le plus rapide d'après
+# ProbeRenderers(). Affiche le pilote choisi et la taille maximale des textures
+# Retourne le SDL_Renderer créé
+def CreateRenderer():
+	names = []
+	for index in range(SDL_GetNumRenderDrivers()):
+		Info = SDL_RendererInfo()
+		SDL_GetRenderDriverInfo(index, Info)
+		names.append(Info.name.decode())
+
+	override = os.environ.get(RENDERER_ENV) or \
+		(SDL_GetHint(SDL_HINT_RENDER_DRIVER) or b"").decode()
+	if override in names:
+		index, reason = names.index(override), "imposé"
+	else:
+		if override:
+			print("Pilote de rendu {0} inconnu (pilotes: {1})".format(
+				override, ", ".join(names)))
+		index, reason = ProbeRenderers(names), "le plus rapide"
+
+	Renderer = SDL_CreateRenderer(Window, index, SDL_RENDERER_PRESENTVSYNC)
+	if not Renderer and index != -1:
+		print("Pilote de rendu {0} indisponible ({1})".format(names[index],
+			SDL_GetError().decode()))
+		Renderer = SDL_CreateRenderer(Window, -1, SDL_RENDERER_PRESENTVSYNC)
+		reason = "par défaut"
+
+	Info = SDL_RendererInfo()
+	SDL_GetRendererInfo(Renderer, Info)
+	print("Pilote de rendu: {0} ({1}), textures de {2}x{3} pixels au "
+		"maximum".format(Info.name.decode(), reason, Info.max_texture_width,
+		Info.max_texture_height))
+	return Renderer
+
+
+
+# > ProbeRenderers(names):
+# Mesure la vitesse de chaque pilote de rendu pouvant afficher le jeu (textures
+# au moins aussi grandes que la fenêtre) avec BenchmarkRenderer()
+# Paramètre:
+#   names: tableau des noms des pilotes de rendu
+# Retourne l'indice du pilote le plus rapide (-1 si aucun n'a pu être mesuré:
+# la SDL choisit alors elle-même)
+def ProbeRenderers(names):
+	best, bestRate = -1, 0.0
+	for index, name in enumerate(names):
+		Info = SDL_RendererInfo()
+		SDL_GetRenderDriverInfo(index, Info)
+		if 0 < Info.max_texture_width < WIN_WIDTH \
+		or 0 < Info.max_texture_height < WIN_HEIGHT:
+			continue
+		rate = BenchmarkRenderer(index)
+		print("Pilote de rendu {0}: {1:.0f} copies/ms".format(name, rate))
+		if rate > bestRate:
+			best, bestRate = index, rate
+	return best
+
+
+
+# > BenchmarkRenderer(index):
+# Mesure la vitesse d'un pilote de rendu: un contexte de rendu temporaire est
+# créé et PROBE_FRAMES images de PROBE_COPIES copies tournées d'une texture
+# sont dessinées. L'essai se termine par la lecture d'un pixel pour attendre
+# que la carte graphique ait réellement exécuté les copies, sans rien afficher
+# dans la fenêtre
+# Paramètre:
+#   index: indice du pilote de rendu
+# Retourne le nombre de copies par milliseconde (0 si le contexte de rendu n'a
+# pas pu être créé)
+def BenchmarkRenderer(index):
+	Probe = SDL_CreateRenderer(Window, index, 0)
+	if not Probe:
+		return 0.0
+
+	Surface = SDL_CreateRGBSurface(0, PROBE_SIZE, PROBE_SIZE, 32, *RGBAMasks)
+	SDL_FillRect(Surface, None, 0xFFFFFFFF)
+	Texture = SDL_CreateTextureFromSurface(Probe, Surface)
+	SDL_FreeSurface(Surface)
+	Rect = SDL_Rect(0, 0, PROBE_SIZE, PROBE_SIZE)
+	pixel = ctypes.c_uint32()
+
+	start = time.perf_counter()
+	for frame in range(PROBE_FRAMES):
+		SDL_RenderClear(Probe)
+		for i in range(PROBE_COPIES):
+			Rect.x = i * 37 % (WIN_WIDTH - PROBE_SIZE)
+			Rect.y = i * 23 % (WIN_HEIGHT - PROBE_SIZE)
+			SDL_RenderCopyEx(Probe, Texture, None, Rect, float(i % 360),
+				None, SDL_FLIP_NONE)
+		SDL_RenderReadPixels(Probe, SDL_Rect(0, 0, 1, 1),
+			SDL_PIXELFORMAT_ARGB8888, ctypes.byref(pixel), 4)
+	elapsed = time.perf_counter() - start
+
+	SDL_DestroyTexture(Texture)
+	SDL_DestroyRenderer(Probe)
+	return PROBE_FRAMES * PROBE_COPIES / (elapsed * 1000)
 
 
 
 # > CloseWindow():
 # Libère la mémoire utilisée par le module en fermant la fenêtre du jeu
 def CloseWindow():
-	global Window, Icon, Renderer, RendererReady
-	global FixedTextures, AnimatedTextures, LabelTextures, TexturesData
+	global Window, Icon, Renderer
+	global AtlasTextures, AtlasSurfaces, FixedRegions, AnimatedRegions
+	global GlyphAtlases, TexturesData
 
 	# Indique aux fonctions du modules de ne plus utiliser Renderer car il va
-	# être effacé
-	RendererReady = False
-	time.sleep(WAIT_TIME)
-
-	# Libère toutes les textures dans les différents tableaux les contenant
-	for FixedTexture in FixedTextures:
-		SDL_DestroyTexture(FixedTexture)
-	for AnimatedTexture in AnimatedTextures:
-		for FrameTexture in AnimatedTexture:
-			SDL_DestroyTexture(FrameTexture)
-	for LabelTexture in LabelTextures:
-		SDL_DestroyTexture(LabelTexture)
+	# être effacé, et attend la fin du dessin de l'image en cours
+	RendererReady.clear()
+	with RendererLock:
+		# Libère toutes les textures et les images dans les différents
+		# tableaux les contenant
+		for Texture in AtlasTextures:
+			SDL_DestroyTexture(Texture)
+		for Surface in AtlasSurfaces:
+			SDL_FreeSurface(Surface)
+		for Glyphs in GlyphAtlases:
+			SDL_DestroyTexture(Glyphs[GA_TEXTURE])
+			SDL_FreeSurface(Glyphs[GA_SURFACE])
+		ClearScreens()
+		ClearLabels()
 
-	# Libère le contexte de rendu, la fenêtre et son icone
-	SDL_DestroyRenderer(Renderer)
-	SDL_DestroyWindow(Window)
-	SDL_FreeSurface(Icon)
+		# Libère le contexte de rendu, la fenêtre et son icone
+		SDL_DestroyRenderer(Renderer)
+		SDL_DestroyWindow(Window)
+		SDL_FreeSurface(Icon)
+		assets.ClosePack()
 
-	# Réinitialise les globales à leur valeur d'origine
-	Window, Icon, Renderer = None, None, None
-	FixedTextures, AnimatedTextures, LabelTextures = [], [], []
-	TexturesData = [[[]], [[], []], [[], []]]
+		# Réinitialise les globales à leur valeur d'origine
+		Window, Icon, Renderer = None, None, None
+		AtlasTextures, AtlasSurfaces = [], []
+		FixedRegions, AnimatedRegions, GlyphAtlases = [], [], []
+	TexturesData = [[[]], [[]], [[]]]
 
 
 
 # > DrawWindow():
-# Rafraîchit le contenu de la fenêtre (les opérations de dessin dans la fenêtre
-# ne sont pas affichés directement, elles sont d'abord stockées en mémoire)
-# Cette opération est synchronisée par la SDL avec la fréquence de
+# Dessine l'image en cours en exécutant la liste des commandes de dessin puis
+# rafraîchit le contenu de la fenêtre (les opérations de dessin dans la
+# fenêtre ne sont pas affichés directement, elles sont d'abord stockées en
+# mémoire). Cette opération est synchronisée par la SDL avec la fréquence de
 # raffraîchissement de l'écran pour éviter des problèmes d'affichage
+# Si la liste des commandes est identique à celle de la dernière image
+# affichée, l'image n'est ni dessinée ni affichée de nouveau
 def DrawWindow():
+	global DrawList, LastDrawList, LastGeneration, Layer
+
 	# Vérifie que le contexte de rendu est prêt à être utilisé avant d'indiquer
-	# à la SDL de mettre à jour l'écran, sinon attend un peu pour permettre aux
-	# contexte de rendu de finir de se préparer dans un autre thread
-	if RendererReady:
-		SDL_RenderPresent(Renderer)
+	# à la SDL de mettre à jour l'écran, sinon attend que le contexte de rendu
+	# finisse de se préparer dans un autre thread (l'attente est limitée pour
+	# que le thread appelant puisse se terminer si la fenêtre est fermée)
+	if RendererReady.is_set():
+		if DrawList != LastDrawList or Generation != LastGeneration:
+			RenderDrawList(DrawList)
+			start = time.perf_counter()
+			SDL_RenderPresent(Renderer)
+			perf.Present(time.perf_counter() - start)
+			LastDrawList, LastGeneration = DrawList, Generation
 	else:
-		time.sleep(WAIT_TIME)
+		RendererReady.wait(RENDERER_TIMEOUT)
+
+	DrawList, Layer = [], LY_BACKGROUND
+
+
+
+# > RenderDrawList(commands):
+# Exécute une liste de commandes de dessin en une seule passe. Les commandes
+# sont triées par couche puis par texture (le tri conserve l'ordre des
+# commandes d'une même couche utilisant la même texture) et la copie sans
+# rotation SDL_RenderCopy() est utilisée lorsque l'angle est nul. Aucun
+# SDL_Rect n'est créé pour une zone de destination déjà rencontrée (voir
+# DestRects): le nombre de créations est compté dans CT_RECTS
+# Paramètre:
+#   commands: liste de commandes de dessin (tuples indexés par DC_...)
+def RenderDrawList(commands):
+	for layer, key, Texture, Source, dest, angle in sorted(commands,
+		key=itemgetter(DC_LAYER, DC_KEY)):
+		Dest = DestRects.get(dest)
+		if Dest is None:
+			Dest = GetDestRect(dest)
+		if angle == 0.0:
+			SDL_RenderCopy(Renderer, Texture, Source, Dest)
+		else:
+			SDL_RenderCopyEx(Renderer, Texture, Source, Dest, angle, None,
+				SDL_FLIP_NONE)
+		perf.Count(CT_COPIES)
+
+
+
+# > GetDestRect(dest):
+# Retourne le SDL_Rect d'une zone de destination absente de DestRects. A sa
+# deuxième utilisation, la zone est ajoutée au cache; sinon ScratchRect est
+# réécrit avec ses coordonnées. DestRects et SeenRects sont vidés chacun
+# lorsqu'ils atteignent RECT_CACHE_SIZE zones (les zones des éléments en
+# mouvement remplissent surtout SeenRects)
+# Paramètre:
+#   dest: tuple (x, y, largeur, hauteur) de la zone
+def GetDestRect(dest):
+	if len(SeenRects) >= RECT_CACHE_SIZE:
+		SeenRects.clear()
+	if len(DestRects) >= RECT_CACHE_SIZE:
+		DestRects.clear()
+
+	if dest in SeenRects:
+		Dest = DestRects[dest] = SDL_Rect(*dest)
+		perf.Count(CT_RECTS)
+		return Dest
+	SeenRects.add(dest)
+	ScratchRect.x, ScratchRect.y, ScratchRect.w, ScratchRect.h = dest
+	return ScratchRect
+
+
+
+# > DrawCached(id, key, layer, compose):
+# Dessine un écran ou un menu qui change rarement. Lorsque son contenu change
+# (clé différente de celle du dernier dessin ou contenu de la fenêtre perdu),
+# les commandes de dessin ajoutées par compose() sont exécutées une fois dans
+# une texture cible de rendu de la taille de la fenêtre (transparente là où
+# rien n'est dessiné). Chaque image ne contient ensuite qu'une copie de cette
+# texture. Si le contexte de rendu ne supporte pas les cibles de rendu, les
+# commandes sont simplement ajoutées à l'image
+# Paramètres:
+#   id: identifiant numérique de l'écran (SCR_...)
+#   key: valeur décrivant le contenu de l'écran (comparée avec ==)
+#   layer: couche (LY_...) où la texture de l'écran est copiée
+#   compose: fonction sans paramètre qui appelle les fonctions Draw...() de
+#            l'écran
+def DrawCached(id, key, layer, compose):
+	global DrawList, LastDrawList, Layer
+
+	# Vérifie que le contexte de rendu est prêt à être utilisé
+	if not RendererReady.is_set():
+		return
+	frameLayer = Layer
+	if not SDL_RenderTargetSupported(Renderer):
+		compose()
+		Layer = frameLayer
+		return
+
+	Screen = Screens.get(id)
+	if Screen is None or Screen[SC_KEY] != key \
+	or Screen[SC_GENERATION] != Generation:
+		if Screen is None:
+			Target = SDL_CreateTexture(Renderer, SDL_PIXELFORMAT_ARGB8888,
+				SDL_TEXTUREACCESS_TARGET, WIN_WIDTH, WIN_HEIGHT)
+			SDL_SetTextureBlendMode(Target, SDL_BLENDMODE_BLEND)
+			Screen = Screens[id] = [Target, None, None]
+
+		# Récupère les commandes de l'écran séparément de celles de l'image
+		# puis les exécute dans la texture effacée
+		frame, DrawList = DrawList, []
+		Layer = LY_BACKGROUND
+		compose()
+		SDL_SetRenderTarget(Renderer, Screen[SC_TEXTURE])
+		SDL_SetRenderDrawColor(Renderer, 0, 0, 0, 0)
+		SDL_RenderClear(Renderer)
+		RenderDrawList(DrawList)
+		SDL_SetRenderTarget(Renderer, None)
+		DrawList, Layer = frame, frameLayer
+		Screen[SC_KEY], Screen[SC_GENERATION] = key, Generation
+
+		# La texture a changé sans que la commande qui la copie ne change:
+		# l'image doit être affichée de nouveau
+		LastDrawList = None
+
+	Texture = Screen[SC_TEXTURE]
+	DrawList.append((layer, TextureKey(Texture), Texture, None,
+		(0, 0, WIN_WIDTH, WIN_HEIGHT), 0.0))
+
+
+
+# > ClearScreens():
+# Libère les textures des écrans dessinés par DrawCached()
+def ClearScreens():
+	for Screen in Screens.values():
+		SDL_DestroyTexture(Screen[SC_TEXTURE])
+	Screens.clear()
+
+
+
+# > SetLayer(layer):
+# Change la couche des commandes de dessin ajoutées ensuite. Une couche est
+# dessinée au-dessus des couches de numéro inférieur, l'ordre des commandes
+# d'une même couche utilisant des textures différentes n'est pas garanti
+# (voir RenderDrawList()). La couche revient à LY_BACKGROUND après chaque
+# image
+# Paramètre:
+#   layer: couche des commandes suivantes (LY_...)
+def SetLayer(layer):
+	global Layer
+	Layer = layer
 
 
 
 # > DrawFixedTexture(id, x, y, w, h, angle):
 # Dessine une texture fixe sur l'écran à une position, taille et avec un angle
-# donné. Cette fonction n'a pas un effet direct sur ce qui se trouve à l'écran,
-# il faut valider les changements une fois ceux-ci terminés avec la fonction
-# DrawWindow()
+# donné. Cette fonction n'a pas un effet direct sur ce qui se trouve à l'écran:
+# elle ajoute une commande à la liste des commandes de dessin de l'image qui
+# est exécutée par la fonction DrawWindow()
 # Paramètres:
 #   id: identifiant numérique de la texture fixe
 #   x, y: coordonnées où on dessine la texture sur l'écran
@@ -128,52 +457,42 @@ def DrawWindow():
 #   angle: angle de la rotation à appliquer sur la texture en radians
 def DrawFixedTexture(id, x, y, w, h, angle):
 	# Vérifie que le contexte de rendu est prêt à être utilisé
-	if RendererReady:
-		# Définit le rectangle où sera affiché la texture (position et taille)
-		Rect = SDL_Rect(x, y, w, h)
-
-		# Dessine la texture correspondante à l'id dans le rectangle avec
-		# l'angle spécifié (avec traduction rad/direct vers °/indirect)
-		SDL_RenderCopyEx(Renderer, FixedTextures[id], None, Rect,
-			-math.degrees(angle), None, SDL_FLIP_NONE)
+	if RendererReady.is_set():
+		# Dessine la zone de l'atlas correspondante à l'id dans le rectangle
+		# avec l'angle spécifié (avec traduction rad/direct vers °/indirect)
+		page, Source = FixedRegions[id]
+		Texture = AtlasTextures[page]
+		DrawList.append((Layer, TextureKey(Texture), Texture, Source,
+			(x, y, w, h), -math.degrees(angle) if angle else 0.0))
 
 
 
-# > DrawAnimatedTexture(id, x, y, w, h, angle):
+# > DrawAnimatedTexture(id, x, y, w, h, angle, elapsed):
 # Dessine une texture animée sur l'écran de la même manière que
 # DrawFixedTexture() mais en sélectionnant l'image de l'animation à afficher
-# grâce aux informations dans TexturesData
+# à partir du temps écoulé depuis le début de l'animation. Le module ne garde
+# aucun état sur les animations: chaque entité qui en affiche une fournit son
+# propre temps écoulé, calculé à partir de la date de l'image en cours
 # Paramètres:
 #   id: identifiant numérique de l'animation
 #   x, y: coordonnées où on dessine la texture sur l'écran
 #   w, h: taille horizontale et verticale désirée pour la texture
 #   angle: angle de la rotation à appliquer sur la texture en radians
-def DrawAnimatedTexture(id, x, y, w, h, angle):
+#   elapsed: temps écoulé en secondes depuis le début de l'animation
+def DrawAnimatedTexture(id, x, y, w, h, angle, elapsed):
 	# Vérifie que le contexte de rendu est prêt à être utilisé
-	if RendererReady:
-		# Définit le rectangle où sera affiché la texture (position et taille)
-		Rect = SDL_Rect(x, y, w, h)
+	if RendererReady.is_set():
+		# Calcule quelle image de l'animation il faut afficher avec la
+		# formule: image = (temps écoulé / durée d'une image) % nombre d'images
+		info = TexturesData[TD_ANIMATED][TD_INIT][id]
+		frame = int(elapsed / info[TD_ANIM_FRAMELENGTH]) \
+			% info[TD_ANIM_FRAMECOUNT]
 
-		# Calcule le temps qui s'est écoulé depuis le dernier affichage de
-		# cette animation
-		dt = time.time() - \
-			 TexturesData[TD_ANIMATED][TD_DATA][id][TD_ANIM_LASTTIME]
-
-		# Calcule quelle image de l'animation il faut afficher maintenant
-		# avec la formule:
-		# image actuelle = (image précédente + durée écoulée/durée d'une image)
-		#                   % nombre d'images dans l'animation
-		frame = (TexturesData[TD_ANIMATED][TD_DATA][id][TD_ANIM_LASTFRAME] +
-			dt / TexturesData[TD_ANIMATED][TD_INIT][id][TD_ANIM_FRAMELENGTH]) \
-			   % TexturesData[TD_ANIMATED][TD_INIT][id][TD_ANIM_FRAMECOUNT]
-
-		# Affiche l'image de l'animation (en arrondissant le numéro d'image qui
-		# est décimal à l'entier inférieur)
-		SDL_RenderCopyEx(Renderer, AnimatedTextures[id][math.floor(frame)],
-			None, Rect, -math.degrees(angle), None, SDL_FLIP_NONE)
-
-		# Sauvegarde les informations de cette affichage dans TexturesData
-		TexturesData[TD_ANIMATED][TD_DATA][id] = [frame, time.time()]
+		# Affiche l'image de l'animation
+		page, Source = AnimatedRegions[id][frame]
+		Texture = AtlasTextures[page]
+		DrawList.append((Layer, TextureKey(Texture), Texture, Source,
+			(x, y, w, h), -math.degrees(angle) if angle else 0.0))
 
 
 
@@ -188,106 +507,152 @@ def DrawAnimatedTexture(id, x, y, w, h, angle):
 #   angle: angle de la rotation à appliquer sur la texture en radians
 def DrawLabelTexture(id, x, y, angle):
 	# Vérifie que le contexte de rendu est prêt à être utilisé
-	if RendererReady:
-		# Définit le rectangle où sera affiché la texture sur l'écran. On
-		# récupère la taille de la texture depuis les données sauvegardées dans
-		# TexturesData
-		Rect = SDL_Rect(
-			int(x - (TexturesData[TD_LABEL][TD_DATA][id][TD_LABEL_WIDTH]/2)),
-			int(y - (TexturesData[TD_LABEL][TD_DATA][id][TD_LABEL_HEIGHT]/2)),
-			TexturesData[TD_LABEL][TD_DATA][id][TD_LABEL_WIDTH],
-			TexturesData[TD_LABEL][TD_DATA][id][TD_LABEL_HEIGHT])
-
-		# Affiche la texture correspondante sur l'écran
-		SDL_RenderCopyEx(Renderer, LabelTextures[id], None, Rect,
-			-math.degrees(angle), None, SDL_FLIP_NONE)
+	if RendererReady.is_set():
+		# Ajoute la commande de dessin de la texture centrée sur la position.
+		# On récupère la taille de la texture calculée par SetLabel()
+		halfW, halfH, w, h = LabelExtents[id]
+		Texture = LabelTextures[id]
+		DrawList.append((Layer, TextureKey(Texture), Texture, None,
+			(int(x - halfW), int(y - halfH), w, h),
+			-math.degrees(angle) if angle else 0.0))
+
+
+
+# > DrawText(id, text, x, y):
+# Affiche un texte glyphe par glyphe à partir d'un atlas de glyphes (voir
+# LoadGlyphAtlases()). Aucune image n'est générée: le texte peut changer à
+# chaque image sans autre coût que les appels de dessin. Comme pour
+# DrawLabelTexture(), le texte est centré sur la position donnée
+# Paramètres:
+#   id: identifiant numérique de l'atlas de glyphes (GL_...)
+#   text: texte à afficher (les caractères absents de l'atlas sont ignorés)
+#   x, y: coordonnées sur lesquelles le texte est centré
+def DrawText(id, text, x, y):
+	# Vérifie que le contexte de rendu est prêt à être utilisé
+	if RendererReady.is_set():
+		Texture, Glyphs, kerning, height = GlyphAtlases[id][GA_TEXTURE], \
+			GlyphAtlases[id][GA_GLYPHS], GlyphAtlases[id][GA_KERNING], \
+			GlyphAtlases[id][GA_HEIGHT]
+
+		key = TextureKey(Texture)
+		# Position du glyphe suivant (point de départ du texte centré sur x)
+		penX = int(x - MeasureText(id, text) / 2)
+		top = int(y - height / 2)
+		previous = None
+		for char in text:
+			if char not in Glyphs:
+				continue
+			Source, offset, advance, w, h = Glyphs[char]
+			penX += kerning.get((previous, char), 0)
+			DrawList.append((Layer, key, Texture, Source,
+				(penX + offset, top, w, h), 0.0))
+			penX += advance
+			previous = char
+
+
+
+# > MeasureText(id, text):
+# Retourne la largeur en pixels d'un texte affiché par DrawText() (somme de
+# l'avancée de chaque glyphe et de l'approche entre deux glyphes)
+# Paramètres:
+#   id: identifiant numérique de l'atlas de glyphes (GL_...)
+#   text: texte à mesurer
+def MeasureText(id, text):
+	Glyphs, kerning = GlyphAtlases[id][GA_GLYPHS], GlyphAtlases[id][GA_KERNING]
+	width, previous = 0, None
+	for char in text:
+		if char in Glyphs:
+			width += Glyphs[char][GG_ADVANCE] + \
+				kerning.get((previous, char), 0)
+			previous = char
+	return width
 
 
 
 # > ToggleFullscreen():
-# Active ou désactive le mode plein-écran du jeu
+# Active ou désactive le mode plein-écran du jeu. Le contexte de rendu et les
+# textures sont conservés: le contenu est simplement agrandi à la taille de
+# l'écran (voir SDL_RenderSetLogicalSize() dans OpenWindow()). Si le pilote
+# d'affichage perd ses textures lors du changement, la SDL envoie l'évènement
+# SDL_RENDER_DEVICE_RESET et controls appelle RestoreTextures()
 def ToggleFullscreen():
-	global Renderer, RendererReady
-
-	# Indique aux fonctions de ce module de ne plus utiliser Renderer car il ne
-	# sera bientôt plus valide
-	RendererReady = False
-	time.sleep(WAIT_TIME)
-
-	# Libère l'ancien contexte de rendu
-	SDL_DestroyRenderer(Renderer)
-
-	# Applique le mode plein-écran sur la fenêtre du jeu
-	flags = SDL_GetWindowFlags(Window) ^ SDL_WINDOW_FULLSCREEN_DESKTOP
-	SDL_SetWindowFullscreen(Window, flags)
-
-	# Remplace l'ancien contexte de rendu par un nouveau adapté au mode
-	# d'affichage actuel et recharge toutes les textures du jeu
-	Renderer = SDL_CreateRenderer(Window, -1, SDL_RENDERER_PRESENTVSYNC)
-	SDL_RenderSetLogicalSize(Renderer, WIN_WIDTH, WIN_HEIGHT)
-	print("Rechargement des textures...")
-	ReloadTextures()
-	print("Terminé!")
-	RendererReady = True
+	global Generation
+
+	# Attend la fin du dessin de l'image en cours
+	with RendererLock:
+		# Applique le mode plein-écran sur la fenêtre du jeu
+		flags = SDL_GetWindowFlags(Window) ^ SDL_WINDOW_FULLSCREEN_DESKTOP
+		if SDL_SetWindowFullscreen(Window,
+			flags & SDL_WINDOW_FULLSCREEN_DESKTOP) != 0:
+			print("Changement de mode d'affichage impossible:",
+				SDL_GetError().decode())
+		Generation += 1
+
+
+
+# > RestoreTextures():
+# Recrée toutes les textures du jeu à partir des images gardées en mémoire
+# (pages de l'atlas et textures de texte), sans relire ni décoder les fichiers
+# des images ni recréer les textes. Utilisée lorsque le pilote d'affichage a
+# perdu le contenu des textures (SDL_RENDER_DEVICE_RESET)
+def RestoreTextures():
+	global AtlasTextures, LabelTextures, Generation
+
+	with RendererLock:
+		for Texture in AtlasTextures:
+			SDL_DestroyTexture(Texture)
+		AtlasTextures = [SDL_CreateTextureFromSurface(Renderer, Surface)
+			for Surface in AtlasSurfaces]
+		for entry in LabelCache.values():
+			SDL_DestroyTexture(entry[LC_TEXTURE])
+			entry[LC_TEXTURE] = SDL_CreateTextureFromSurface(Renderer,
+				entry[LC_SURFACE])
+		LabelTextures = [LabelCache[key][LC_TEXTURE] for key in LabelKeys]
+		for Glyphs in GlyphAtlases:
+			SDL_DestroyTexture(Glyphs[GA_TEXTURE])
+			Glyphs[GA_TEXTURE] = SDL_CreateTextureFromSurface(Renderer,
+				Glyphs[GA_SURFACE])
+		# Le contenu des écrans est perdu: ils sont redessinés à leur prochain
+		# affichage
+		ClearScreens()
+		Generation += 1
 
 
 
 # > LoadImage(path):
-# Charge le fichier d'une image et retourne la SDL_Surface qui la contient
+# Charge une image et retourne la SDL_Surface qui la contient. Si le paquet de
+# textures contient une version à jour de l'image, la surface utilise
+# directement ses pixels déjà décodés dans la projection en mémoire du paquet
+# (la surface ne doit donc pas être modifiée). Sinon le fichier PNG de l'image
+# est chargé et décodé
 # Paramètre:
 #  path: chemin d'accès vers la texture depuis le sous-dossier "textures" dans
 #        le dossier du jeu
 def LoadImage(path):
+	image = assets.Lookup(path)
+	if image is not None:
+		address, width, height = image
+		return SDL_CreateRGBSurfaceFrom(address, width, height, 32,
+			width * 4, *RGBAMasks)
+
 	# Obtient les droits de lecture du fichier de l'image et la charge
 	rwops = SDL_RWFromFile(("textures/" + path).encode(), "r".encode())
 	return IMG_Load_RW(rwops, True)
 
 
 
-# > ReloadTextures():
-# Recharge tous les fichiers de textures fixes et animées et recrée les
-# textures de texte à partir des données sauvegardées dans les parties TD_INIT
-# de TexturesData
-def ReloadTextures():
-	global FixedTextures
-
-	# Libère la mémoire utilisée par les textures associées à un contexte de
-	# rendu précédent
-	for FixedTexture in FixedTextures:
-		SDL_DestroyTexture(FixedTexture)
-	for AnimatedTexture in AnimatedTextures:
-		for FrameTexture in AnimatedTexture:
-			SDL_DestroyTexture(FrameTexture)
-	for LabelTexture in LabelTextures:
-		SDL_DestroyTexture(LabelTexture)
-
-	# Recharge les textures à partir des valeurs initiales sauvegardées dans
-	# TexturesData
-	LoadFixedTextures(TexturesData[TD_FIXED][TD_INIT])
-	LoadAnimatedTextures(TexturesData[TD_ANIMATED][TD_INIT])
-	LoadLabelTextures(TexturesData[TD_LABEL][TD_INIT])
-
-
-
 # > LoadFixedTextures(texturesPaths):
 # Charge les fichiers de textures fixes dont le chemin d'accès se trouve dans
-# le tableau en paramètre et les mets dans FixedTextures
+# le tableau en paramètre. Les textures ne sont utilisables qu'après l'appel
+# de PackTextures()
 # Paramètre:
 #   texturesPaths: tableau de chaines de caractères correspondant aux chemins
 #                  d'accès vers les fichiers de textures à charger
 def LoadFixedTextures(texturesPaths):
-	# Initialise le tableau avec le nombre de textures à stocker
-	global FixedTextures
-	FixedTextures = [None for n in range(len(texturesPaths))]
-
-	# Pour chaque texture à charger
-	for i in range(len(texturesPaths)):
-		# Charge le fichier image contenant la texture
-		Surface = LoadImage(texturesPaths[i])
-		# Convertit l'image en texture utilisable par la SDL
-		FixedTextures[i] = SDL_CreateTextureFromSurface(Renderer, Surface)
-		# Libère la mémoire utilisée par l'image
-		SDL_FreeSurface(Surface)
+	global FixedSurfaces
+
+	# Charge le fichier image contenant chaque texture
+	FixedSurfaces = [LoadImage(path) for path in texturesPaths]
 
 	# Sauvegarde le paramètre de cette fonction dans TexturesData
 	TexturesData[TD_FIXED][TD_INIT] = texturesPaths
@@ -304,30 +669,80 @@ def LoadFixedTextures(texturesPaths):
 #                   int:nombre d'images dans l'animation, float:durée
 #                   d'affichage de chaque image de l'animation en secondes]
 def LoadAnimatedTextures(animationsInfo):
-	# Initialise le tableau avec le nombre de textures à stocker
-	global AnimatedTextures
-	AnimatedTextures = [None for n in range(len(animationsInfo))]
-
-	# Pour chaque animation à charger
-	for i in range(len(animationsInfo)):
-		# Initialise le tableau avec le nombre d'images qu'elle contient
-		AnimatedTextures[i] = [None for n in
-			range(animationsInfo[i][TD_ANIM_FRAMECOUNT])]
-		# Pour chaque image la composant
-		for j in range(animationsInfo[i][TD_ANIM_FRAMECOUNT]):
-			# Charge la texture (même technique que pour les textures fixes
-			# mais en transformant le chemin d'accès)
-			Surface = LoadImage(animationsInfo[i][TD_ANIM_FOLDERNAME] + "/" +
-				str(j+1) + ".png")
-			AnimatedTextures[i][j] = \
-				SDL_CreateTextureFromSurface(Renderer, Surface)
-			SDL_FreeSurface(Surface)
+	global AnimatedSurfaces
+
+	# Pour chaque animation, charge chacune des images la composant (même
+	# technique que pour les textures fixes mais en transformant le chemin
+	# d'accès)
+	AnimatedSurfaces = [[LoadImage(info[TD_ANIM_FOLDERNAME] + "/" +
+		str(j+1) + ".png") for j in range(info[TD_ANIM_FRAMECOUNT])]
+		for info in animationsInfo]
 
 	# Sauvegarde le paramètre de cette fonction dans TexturesData
 	TexturesData[TD_ANIMATED][TD_INIT] = animationsInfo
-	# Initialise les informations d'animations
-	TexturesData[TD_ANIMATED][TD_DATA] = \
-		[[0.0, time.time()] for n in range(len(animationsInfo))]
+
+
+
+# > PackTextures():
+# Regroupe les textures fixes et les images des animations chargées par
+# LoadFixedTextures() et LoadAnimatedTextures() dans un petit nombre de
+# grandes textures (pages d'un atlas). Chaque texture est ensuite désignée par
+# sa page et la zone qu'elle occupe dans la page, ce qui limite le nombre de
+# textures envoyées à la carte graphique et de changements de texture pendant
+# le dessin d'une image
+def PackTextures():
+	global AtlasTextures, AtlasSurfaces, FixedRegions, AnimatedRegions
+	global FixedSurfaces, AnimatedSurfaces
+
+	# Liste de toutes les images à regrouper (textures fixes puis images des
+	# animations) et de leur taille
+	Surfaces = FixedSurfaces + [Surface for Frames in AnimatedSurfaces
+		for Surface in Frames]
+	sizes = [(Surface.contents.w, Surface.contents.h)
+		for Surface in Surfaces]
+
+	# Taille des pages limitée par la taille maximale des textures supportée
+	# par le contexte de rendu
+	Info = SDL_RendererInfo()
+	SDL_GetRendererInfo(Renderer, Info)
+	width = min(ATLAS_SIZE, Info.max_texture_width or ATLAS_SIZE)
+	height = min(ATLAS_SIZE, Info.max_texture_height or ATLAS_SIZE)
+
+	# Calcul de l'emplacement de chaque image puis de la taille réellement
+	# utilisée de chaque page
+	placements, count = atlas.Pack(sizes, width, height)
+	extents = [[0, 0] for n in range(count)]
+	for (page, x, y), (w, h) in zip(placements, sizes):
+		extents[page][0] = max(extents[page][0], x + w + ATLAS_PADDING)
+		extents[page][1] = max(extents[page][1], y + h + ATLAS_PADDING)
+
+	# Crée les pages (transparentes) et copie chaque image à son emplacement
+	# sans mélange pour conserver sa transparence
+	Pages = [SDL_CreateRGBSurface(0, w, h, 32, *RGBAMasks)
+		for w, h in extents]
+	for Surface, (page, x, y) in zip(Surfaces, placements):
+		SDL_SetSurfaceBlendMode(Surface, SDL_BLENDMODE_NONE)
+		SDL_BlitSurface(Surface, None, Pages[page], SDL_Rect(x, y, 0, 0))
+
+	# Convertit chaque page en texture et libère la mémoire utilisée par les
+	# images (les pages sont gardées pour RestoreTextures())
+	AtlasTextures = [SDL_CreateTextureFromSurface(Renderer, Page)
+		for Page in Pages]
+	AtlasSurfaces = Pages
+	for Surface in Surfaces:
+		SDL_FreeSurface(Surface)
+
+	# Associe à chaque texture fixe et à chaque image d'animation sa page et
+	# la zone qu'elle occupe dans la page
+	Regions = [(page, SDL_Rect(x, y, w, h))
+		for (page, x, y), (w, h) in zip(placements, sizes)]
+	FixedRegions = Regions[:len(FixedSurfaces)]
+	AnimatedRegions = []
+	first = len(FixedSurfaces)
+	for Frames in AnimatedSurfaces:
+		AnimatedRegions.append(Regions[first:first + len(Frames)])
+		first += len(Frames)
+	FixedSurfaces, AnimatedSurfaces = [], []
 
 
 
@@ -340,32 +755,20 @@ def LoadAnimatedTextures(animationsInfo):
 #               fichier contenant la police d'écriture à utiliser, int: taille
 #               de la police en points, SDL_Color: couleur du texte]
 def LoadLabelTextures(labelsInfo):
-	# Initialise les tableaux avec le nombre de textures à stocker
-	global LabelTextures
-	LabelTextures = [None for n in range(len(labelsInfo))]
-	TexturesData[TD_LABEL][TD_DATA] = [None for n in range(len(labelsInfo))]
-
-	# Pour chaque texte à afficher
-	for i in range(len(labelsInfo)):
-		# Ouvre le fichier contenant la police d'écriture à une taille donnée
-		rwops = SDL_RWFromFile(labelsInfo[i][TD_LABEL_FONT].encode(),
-			"r".encode())
-		Font = TTF_OpenFontRW(rwops, True, labelsInfo[i][TD_LABEL_SIZE])
-		# Génère une image avec le texte et la couleur spécifiée
-		Surface = TTF_RenderUTF8_Blended(Font,
-			labelsInfo[i][TD_LABEL_TEXT].encode(),
-			labelsInfo[i][TD_LABEL_COLOR])
-		# Sauvegarde la taille de l'image
-		TexturesData[TD_LABEL][TD_DATA][i] = \
-			[Surface.contents.w, Surface.contents.h]
-		# Convertit l'image en texture
-		LabelTextures[i] = SDL_CreateTextureFromSurface(Renderer, Surface)
-		# Libère la mémoire utilisée par l'image et la police d'écriture
-		SDL_FreeSurface(Surface)
-		TTF_CloseFont(Font)
+	global LabelTextures, LabelKeys, LabelExtents
+	# Attend la fin du dessin de l'image en cours: le cache des textures de
+	# texte est partagé avec le thread qui dessine
+	with RendererLock:
+		# Initialise les tableaux avec le nombre de textures à stocker
+		LabelTextures = [None for n in range(len(labelsInfo))]
+		LabelKeys = [None for n in range(len(labelsInfo))]
+		LabelExtents = [None for n in range(len(labelsInfo))]
 
-	# Sauvegarde le paramètre de cette fonction dans TexturesData
-	TexturesData[TD_LABEL][TD_INIT] = labelsInfo
+		# Sauvegarde le paramètre de cette fonction dans TexturesData puis
+		# génère la texture de chaque texte à afficher
+		TexturesData[TD_LABEL][TD_INIT] = labelsInfo
+		for i in range(len(labelsInfo)):
+			SetLabel(i)
 
 
 
@@ -378,30 +781,168 @@ def UpdateLabelTexture(id, text):
 	# Vérifie que le texte a bien été modifié (évite l'utilisation inutile de
 	# ressources si ce n'est pas le cas)
 	if TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_TEXT] != text:
-		# Met à jour le texte dans TexturesData
-		TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_TEXT] = text
+		# Attend la fin du dessin de l'image en cours (cette fonction peut
+		# être appelée depuis le thread des contrôles)
+		with RendererLock:
+			# Met à jour le texte dans TexturesData
+			TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_TEXT] = text
 
-		# Libère la mémoire utilisée par l'ancienne texture
-		SDL_DestroyTexture(LabelTextures[id])
+			# Génère la nouvelle texture (ou la retrouve dans le cache)
+			SetLabel(id)
 
-		# Génère la nouvelle texture de la même façon que LoadLabelTextures()
-		# mais en utilisant les variables sauvegardées dans TexturesData
-		rwops = SDL_RWFromFile(
-			TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_FONT].encode(),
-			"r".encode())
 
-		Font = TTF_OpenFontRW(rwops, True,
-			TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_SIZE])
 
-		Surface = TTF_RenderUTF8_Blended(Font,
-			TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_TEXT].encode(),
-			TexturesData[TD_LABEL][TD_INIT][id][TD_LABEL_COLOR])
+# > SetLabel(id):
+# Associe à une texture de texte l'image correspondant au texte, à la police,
+# à la taille et à la couleur sauvegardés dans TexturesData. L'image n'est
+# générée que si elle n'est pas déjà dans le cache des textures de texte
+# Doit être appelée en détenant RendererLock
+# Paramètre:
+#   id: identifiant numérique de la texture de texte
+def SetLabel(id):
+	global LabelCacheBytes
+	info = TexturesData[TD_LABEL][TD_INIT][id]
+	color = info[TD_LABEL_COLOR]
+	key = (info[TD_LABEL_TEXT], info[TD_LABEL_FONT], info[TD_LABEL_SIZE],
+		(color.r, color.g, color.b, color.a))
+
+	entry = LabelCache.get(key)
+	if entry is None:
+		# Génère une image avec le texte et la couleur spécifiée, la convertit
+		# en texture et garde l'image pour RestoreTextures()
+		Surface = TTF_RenderUTF8_Blended(
+			OpenFont(info[TD_LABEL_FONT], info[TD_LABEL_SIZE]),
+			info[TD_LABEL_TEXT].encode(), color)
+		entry = [SDL_CreateTextureFromSurface(Renderer, Surface), Surface]
+		perf.Count(CT_LABELS)
+		LabelCache[key] = entry
+		LabelCacheBytes += Surface.contents.w * Surface.contents.h * 4
+	else:
+		# Le texte devient le plus récemment utilisé du cache
+		LabelCache.move_to_end(key)
+
+	LabelKeys[id] = key
+	LabelTextures[id] = entry[LC_TEXTURE]
+	w, h = entry[LC_SURFACE].contents.w, entry[LC_SURFACE].contents.h
+	LabelExtents[id] = (w / 2, h / 2, w, h)
+
+	# Libère les textures les moins récemment utilisées tant que le cache est
+	# trop grand (sauf celles des textes actuellement affichés)
+	if LabelCacheBytes > LABEL_CACHE_SIZE:
+		used = set(LabelKeys)
+		for key in [key for key in LabelCache if key not in used]:
+			if LabelCacheBytes <= LABEL_CACHE_SIZE:
+				break
+			Texture, Surface = LabelCache.pop(key)
+			LabelCacheBytes -= Surface.contents.w * Surface.contents.h * 4
+			SDL_DestroyTexture(Texture)
+			SDL_FreeSurface(Surface)
+
 
-		TexturesData[TD_LABEL][TD_DATA][id] = \
-			[Surface.contents.w, Surface.contents.h]
 
-		LabelTextures[id] = SDL_CreateTextureFromSurface(Renderer, Surface)
+# > OpenFont(font, size):
+# Retourne une police d'écriture ouverte à une taille donnée. Chaque police
+# n'est ouverte qu'une fois puis gardée dans Fonts
+# Paramètres:
+#   font: nom du fichier contenant la police d'écriture
+#   size: taille de la police en points
+def OpenFont(font, size):
+	Font = Fonts.get((font, size))
+	if Font is None:
+		rwops = SDL_RWFromFile(font.encode(), "r".encode())
+		Font = TTF_OpenFontRW(rwops, True, size)
+		Fonts[(font, size)] = Font
+	return Font
+
+
+
+# > ClearLabels():
+# Libère les textures et images du cache des textures de texte et ferme les
+# polices d'écriture ouvertes
+def ClearLabels():
+	global LabelTextures, LabelKeys, LabelExtents, LabelCacheBytes
+	for Texture, Surface in LabelCache.values():
+		SDL_DestroyTexture(Texture)
 		SDL_FreeSurface(Surface)
+	for Font in Fonts.values():
 		TTF_CloseFont(Font)
+	LabelCache.clear()
+	Fonts.clear()
+	LabelTextures, LabelKeys, LabelExtents, LabelCacheBytes = [], [], [], 0
+
+
+
+# > LoadGlyphAtlases(atlasesInfo):
+# Crée pour chaque police, taille et couleur donnée un atlas de glyphes: une
+# texture regroupant l'image de chaque caractère d'une liste, la position et
+# l'avancée de chaque glyphe (TTF_GlyphMetrics()) et l'approche de chaque
+# paire de caractères. L'approche est mesurée avec TTF_SizeUTF8() car la
+# version de SDL_ttf utilisée ne permet pas de l'obtenir pour deux caractères
+# Paramètre:
+#   atlasesInfo: tableau de tableaux contenant des informations sur chaque
+#                atlas avec le format [str: caractères à inclure, str: nom du
+#                fichier contenant la police d'écriture à utiliser, int:
+#                taille de la police en points, SDL_Color: couleur du texte]
+def LoadGlyphAtlases(atlasesInfo):
+	global GlyphAtlases
+	GlyphAtlases = []
+
+	for chars, font, size, color in atlasesInfo:
+		Font = OpenFont(font, size)
+
+		# Génère l'image de chaque caractère et mesure son glyphe. L'image
+		# d'un caractère commence au plus à gauche entre la position du glyphe
+		# (0) et son bord gauche (minx), et a la hauteur d'une ligne de texte
+		Surfaces, metrics = [], {}
+		minx, maxx, miny, maxy = ctypes.c_int(), ctypes.c_int(), \
+			ctypes.c_int(), ctypes.c_int()
+		advance = ctypes.c_int()
+		for char in chars:
+			TTF_GlyphMetrics(Font, ord(char), ctypes.byref(minx),
+				ctypes.byref(maxx), ctypes.byref(miny), ctypes.byref(maxy),
+				ctypes.byref(advance))
+			metrics[char] = (minx.value, maxx.value, advance.value)
+			Surfaces.append(TTF_RenderUTF8_Blended(Font, char.encode(),
+				color))
+		sizes = [(Surface.contents.w, Surface.contents.h)
+			for Surface in Surfaces]
+
+		# Regroupe les images dans une page de la même manière que
+		# PackTextures()
+		placements, count = atlas.Pack(sizes, ATLAS_SIZE, ATLAS_SIZE)
+		if count > 1:
+			raise ValueError("Trop de glyphes pour un atlas de "
+				"{0}x{0} pixels".format(ATLAS_SIZE))
+		Page = SDL_CreateRGBSurface(0,
+			max(x + w for (page, x, y), (w, h) in zip(placements, sizes)),
+			max(y + h for (page, x, y), (w, h) in zip(placements, sizes)),
+			32, *RGBAMasks)
+		Glyphs = {}
+		for char, Surface, (page, x, y), (w, h) in zip(chars, Surfaces,
+			placements, sizes):
+			SDL_SetSurfaceBlendMode(Surface, SDL_BLENDMODE_NONE)
+			SDL_BlitSurface(Surface, None, Page, SDL_Rect(x, y, 0, 0))
+			SDL_FreeSurface(Surface)
+			Glyphs[char] = (SDL_Rect(x, y, w, h),
+				min(0, metrics[char][0]), metrics[char][2], w, h)
+
+		# Approche de chaque paire de caractères: différence entre la largeur
+		# de la paire mesurée par SDL_ttf et celle calculée sans approche
+		# à partir des mesures des deux glyphes
+		kerning = {}
+		width, height = ctypes.c_int(), ctypes.c_int()
+		for first in chars:
+			minA, maxA, advanceA = metrics[first]
+			for second in chars:
+				minB, maxB, advanceB = metrics[second]
+				TTF_SizeUTF8(Font, (first + second).encode(),
+					ctypes.byref(width), ctypes.byref(height))
+				plain = max(advanceA, maxA, advanceA + max(advanceB, maxB)) \
+					- min(0, minA, advanceA + minB)
+				if width.value != plain:
+					kerning[(first, second)] = width.value - plain
+
+		GlyphAtlases.append([SDL_CreateTextureFromSurface(Renderer, Page),
+			Page, Glyphs, kerning, TTF_FontHeight(Font)])
 
 ###############################################################################
@@ -0,0 +1,407 @@
+###############################################################################
+# ENGINE.PY: Module qui contient les règles d'une partie (déplacements,       #
+#            attaques, balle, buts) indépendamment de l'affichage et des      #
+#            contrôles. Il n'utilise pas la SDL et peut donc simuler des      #
+#            parties sans fenêtre, plus vite qu'en temps réel                 #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import math, random
+# Locales
+from constants import *
+import entities, physics
+
+###############################################################################
+
+# GLOBALES
+# Composition par défaut d'une partie: équipe, coordonnées et orientation de
+# départ de chaque joueur. Les joueurs reçoivent les identifiants 0, 1, etc
+# dans cet ordre et la balle l'identifiant suivant, ce qui conserve les indices
+# PLAYER1, PLAYER2 et BALL
+DefaultLineup = [(PLAYER1, -2/3, 0.0, 0.0), (PLAYER2, 2/3, 0.0, math.pi)]
+# Coordonnées et orientation de départ de la balle
+BallSpawn = (0.0, 0.0, math.pi/2)
+# Limites horizontales des buts adverses de chaque équipe
+Goals = [(0.9, 1.0), (-1.0, -0.9)]
+
+###############################################################################
+
+# CLASSES
+
+# Classe MatchState: état complet d'une partie
+class MatchState:
+	# Initialise une nouvelle partie
+	# Paramètres:
+	#   seed: graine du générateur aléatoire de la partie (une même graine et
+	#         les mêmes contrôles donnent toujours la même partie)
+	#   lineup: composition de la partie (voir DefaultLineup)
+	#   timed: True si les phases de la partie (compte à rebours, but, remise
+	#          en jeu) durent PHASE_TIMES, False si elles sont enchaînées
+	#          immédiatement (parties simulées sans affichage)
+	def __init__(self, seed=None, lineup=DefaultLineup, timed=False):
+		# Graine du générateur aléatoire propre à la partie et nombre de
+		# valeurs aléatoires déjà tirées (voir RandomDraw())
+		if seed is None:
+			seed = random.getrandbits(64)
+		self.Seed = seed & RNG_MASK
+		self.Draws = 0
+		# Score de chaque équipe
+		self.Score = [0, 0]
+		# Temps restant de la partie en secondes (3 minutes de jeu)
+		self.GameTime = float(3 * 60)
+		# Booléen indiquant si la partie est terminée
+		self.Over = False
+		# Equipe ayant marqué un but dont la remise en jeu n'a pas encore eu
+		# lieu (None si aucune, voir Kickoff())
+		self.Scorer = None
+		# Nombre de balles récupérées par chaque équipe en attaquant
+		self.Tackles = [0, 0]
+		# Durée de chaque phase de la partie, phase actuelle (MP_...) et
+		# temps restant avant la fin de cette phase en secondes
+		self.PhaseTimes = PHASE_TIMES if timed else (0.0,) * len(PHASE_TIMES)
+		SetPhase(self, MP_KICKOFF)
+
+		# Entités de la partie (voir entities.ComponentStore): identifiants
+		# des joueurs et de la balle
+		self.Entities = entities.ComponentStore()
+		self.Players = [self.Entities.Spawn(KIND_PLAYER, team, x, y, angle)
+			for team, x, y, angle in lineup]
+		self.Ball = self.Entities.Spawn(KIND_BALL, -1, *BallSpawn)
+		# Identifiants des adversaires de chaque joueur (calculés une seule
+		# fois, la composition ne change pas pendant la partie)
+		self.Opponents = [[o for o in self.Players
+			if self.Entities.Team[o] != self.Entities.Team[id]]
+			for id in self.Players]
+		ResetPositions(self)
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > ResetPositions(state):
+# Replace les joueurs et la balle à leur position de départ et réinitialise
+# leur état et les décomptes de la partie
+# Paramètre:
+#   state: MatchState de la partie
+def ResetPositions(state):
+	# Positions, états et décomptes d'attaque et d'immobilisation des entités
+	state.Entities.Reset()
+	# BallCooldown: décompte permettant d'empêcher la balle d'être attrapée
+	# directement après avoir été relachée
+	state.BallCooldown = 0.0
+	# Coordonnées sur le terrain vers lesquelles la balle se déplace quand
+	# elle n'est pas tenue
+	state.BallTarget = [0.0, 0.0]
+
+
+# > Kickoff(state):
+# Effectue la remise en jeu qui suit un but: replace les joueurs et termine la
+# partie si l'équipe ayant marqué a 3 points
+# Paramètre:
+#   state: MatchState de la partie
+def Kickoff(state):
+	ResetPositions(state)
+	if state.Score[state.Scorer] == 3:
+		state.Over = True
+	state.Scorer = None
+
+
+# > SetPhase(state, phase):
+# Change la phase d'une partie et réinitialise le temps restant de la phase
+# Paramètres:
+#   state: MatchState de la partie
+#   phase: nouvelle phase de la partie (MP_...)
+def SetPhase(state, phase):
+	state.Phase = phase
+	state.PhaseTime = state.PhaseTimes[phase]
+
+
+# > SeededRandom(seed, counter):
+# Générateur aléatoire sans état (SplitMix64): retourne la valeur aléatoire
+# dans [0.0;1.0[ d'indice counter de la suite associée à seed. Contrairement au
+# module random, la valeur ne dépend que de ces deux entiers, ce qui permet à
+# batch de reproduire exactement les tirages d'une partie
+# Paramètres:
+#   seed: graine de la suite (entier sur 64 bits)
+#   counter: indice de la valeur dans la suite
+def SeededRandom(seed, counter):
+	z = (seed + (counter + 1) * 0x9E3779B97F4A7C15) & RNG_MASK
+	z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & RNG_MASK
+	z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & RNG_MASK
+	z ^= z >> 31
+	return (z >> 11) * 2.0**-53
+
+
+# > RandomDraw(state):
+# Tire la valeur aléatoire suivante dans [0.0;1.0[ de la suite d'une partie
+# Paramètre:
+#   state: MatchState de la partie
+def RandomDraw(state):
+	value = SeededRandom(state.Seed, state.Draws)
+	state.Draws += 1
+	return value
+
+
+# > SetPS_Mode(state, id, mode):
+# Change la valeur d'état d'une entité (hors PS_HOLD)
+# Paramètres:
+#   state: MatchState de la partie
+#   id: identifiant de l'entité concernée (PLAYER1, PLAYER2 ou BALL par
+#       défaut)
+#   mode: valeur d'état à attribuer à l'entité (PS_STOP, PS_WALK, PS_DASH ou
+#         PS_SPIT mais pas PS_HOLD)
+def SetPS_Mode(state, id, mode):
+	# Utilisation d'un ET binaire pour garder le 3eme bit de l'état
+	# correspondant à PS_HOLD et remettre à 0 les autres bits, puis d'un OU
+	# binaire pour ajouter la nouvelle valeur d'état
+	State = state.Entities.State
+	State[id] = (State[id] & PS_HOLD) | mode
+
+
+# > SetPS_Hold(state, id, hold):
+# Change la valeur d'état d'une entité (uniquement PS_HOLD)
+# Paramètres:
+#   state: MatchState de la partie
+#   id: identifiant de l'entité concernée (PLAYER1, PLAYER2 ou BALL par
+#       défaut)
+#   hold: nouvelle état de PS_HOLD à attribuer à l'entité
+def SetPS_Hold(state, id, hold):
+	# Utilise un ET et un OU binaire pour remplacer la valeur de PS_HOLD tout
+	# en gardant les autres bits de la variable dans le même état
+	State = state.Entities.State
+	State[id] = hold | (State[id] & 3)
+
+
+# > Step(state, inputs, dt):
+# Fait avancer une partie d'une durée donnée
+# Paramètres:
+#   state: MatchState de la partie (modifié par cette fonction)
+#   inputs: contrôles des joueurs indexés par leur identifiant, au format de
+#           game.PlayersInputs (vecteur vitesse + état de la touche action
+#           pour chaque joueur)
+#   dt: durée simulée en secondes
+# Retourne la liste des évènements survenus pendant cette mise à jour sous la
+# forme de tuples (EV_..., joueur concerné ou None)
+def Step(state, inputs, dt):
+	events = []
+	if state.Over:
+		return events
+
+	# Fait avancer les phases pendant lesquelles le jeu est suspendu (compte à
+	# rebours, but, remise en jeu) avec le temps simulé. Les phases terminées
+	# ou de durée nulle sont enchaînées immédiatement: la remise en jeu qui
+	# suit un but a lieu à la fin de la phase MP_GOAL, et le jeu n'est simulé
+	# qu'une fois la phase MP_PLAY atteinte
+	if state.Phase != MP_PLAY:
+		state.PhaseTime -= dt
+	while state.Phase != MP_PLAY and state.PhaseTime <= 0.0:
+		if state.Phase == MP_GOAL:
+			Kickoff(state)
+			events.append((EV_RESET, None))
+			if state.Over:
+				events.append((EV_END, None))
+				return events
+			SetPhase(state, MP_RESET)
+		else:
+			SetPhase(state, MP_PLAY)
+	if state.Phase != MP_PLAY:
+		return events
+
+	# Copie des composants des entités dans des variables plus faciles à
+	# utiliser (les tableaux sont modifiés sur place)
+	Entities = state.Entities
+	X, Y, Angle = Entities.X, Entities.Y, Entities.Angle
+	State, Team = Entities.State, Entities.Team
+	DashCooldown = Entities.DashCooldown
+	SpitCooldown = Entities.SpitCooldown
+	ball = state.Ball
+
+	# Décrémente les décomptes du jeu non associés à un joueur
+	state.BallCooldown -= dt
+	state.GameTime -= dt
+	# Si le temps restant est 0 ou moins, termine la partie
+	if state.GameTime <= 0.0:
+		state.Over = True
+		events.append((EV_END, None))
+
+	# Pour chacun des joueurs (ordre du tableau mélangé aléatoirement avec
+	# l'algorithme de Fisher-Yates pour éviter qu'un des joueurs est toujours
+	# la priorité sur ses actions)
+	players = list(state.Players)
+	for i in range(len(players) - 1, 0, -1):
+		j = int(RandomDraw(state) * (i + 1))
+		players[i], players[j] = players[j], players[i]
+	for player in players:
+		# Décrémente les décomptes du jeu associés à un joueur
+		DashCooldown[player] -= dt
+		SpitCooldown[player] -= dt
+
+		# Copie la position, l'équipe et le vecteur vitesse du joueur dans des
+		# variables plus faciles à utiliser
+		x, y = X[player], Y[player]
+		team = Team[player]
+		v_vec = inputs[player][PC_VELOCT]
+
+		# Si le joueur a sa touche Action enfoncée, qu'il a un état Marche, ne
+		# tient pas la balle et a son décompte pour utiliser l'attaque à 0 ou
+		# moins, fait attaquer le joueur
+		if inputs[player][PC_ACTION] \
+		and State[player] == PS_WALK \
+		and DashCooldown[player] <= 0.0:
+			# Réinitialise le décompte d'attaque du joueur. L'évènement permet
+			# à l'appelant de réinitialiser l'état de la touche action pour
+			# empêcher le joueur d'attaquer automatiquement en gardant la
+			# touche enfoncée
+			DashCooldown[player] = CDOWN_DASH
+			events.append((EV_DASH, player))
+
+		# Si le joueur a été attaqué (décompte non terminé)
+		if SpitCooldown[player] > 0.0:
+			# Si le joueur a été attaqué il y a plus de 0.5 s, le joueur prend
+			# un état Immobile
+			if SpitCooldown[player] < CDOWN_SPIT - 0.5:
+				SetPS_Mode(state, player, PS_STOP)
+			# Sinon le joueur a un état de Perte de la balle (permet
+			# d'afficher l'animation correspondante)
+			else:
+				SetPS_Mode(state, player, PS_SPIT)
+		# Sinon si le joueur a un vecteur vitesse nul
+		elif v_vec[VEC_NORM] == 0.0:
+			# Le joueur a un état Immobile
+			SetPS_Mode(state, player, PS_STOP)
+		# Sinon
+		else:
+			# Définit le coefficient normal de la vitesse du joueur
+			v_multiplier = 0.3
+			# Le joueur a un état Marche
+			SetPS_Mode(state, player, PS_WALK)
+
+			# Si le joueur a attaqué il y a moins de 0.5s et qu'il ne tient pas
+			# la balle
+			if DashCooldown[player] > CDOWN_DASH - 0.5 \
+			and not State[player] & PS_HOLD:
+				# Augmente le coeffiecient de vitesse du joueur (accélération)
+				v_multiplier = 0.5
+				# L'état du joueur devient Attaque
+				SetPS_Mode(state, player, PS_DASH)
+
+			# Si le joueur tient la balle
+			if State[player] & PS_HOLD:
+				# Diminue le coefficient de vitesse du joueur (Ralentissement)
+				v_multiplier = 0.25
+
+			# Calcule de la vitesse du joueur
+			v = v_vec[VEC_NORM] * v_multiplier
+			# Copie de l'angle du déplacement du joueur
+			angle = v_vec[VEC_ANGLE]
+			# Calcul des coordonnées du vecteur vitesse du joueur
+			vx, vy = v * math.cos(angle), v * math.sin(angle)
+			# Calcul de la nouvelle position du joueur
+			x, y = physics.ComputeMovements(x,y, vx,vy, dt)
+			# Sauvegarde de la position et de l'orientation du joueur
+			X[player], Y[player], Angle[player] = x, y, angle
+
+			# Pour chaque joueur de l'équipe adverse
+			for opponent in state.Opponents[player]:
+				# Si le joueur est en état Attaque, que son adversaire tient
+				# la balle et qu'ils sont assez proches
+				if State[player] & 3 == PS_DASH \
+				and State[opponent] & PS_HOLD \
+				and physics.ComputeDistance(x,y,
+					X[opponent],Y[opponent]) <= 0.2:
+					# L'adversaire perd la balle
+					SetPS_Hold(state, opponent, 0)
+					SetPS_Mode(state, opponent, PS_SPIT)
+					# Réinitialise le décompte d'immobilisation de
+					# l'adversaire
+					SpitCooldown[opponent] = CDOWN_SPIT
+					# Place la balle devant l'adversaire
+					o_angle = Angle[opponent]
+					X[ball] = X[opponent] + 0.25*math.cos(o_angle)
+					Y[ball] = Y[opponent] + 0.25*WIN_RATIO*math.sin(o_angle)
+					Angle[ball] = o_angle
+					# La balle n'est plus tenue
+					SetPS_Hold(state, ball, 0)
+					# Réinitialisation du décompte de la balle
+					state.BallCooldown = CDOWN_BALL
+					state.Tackles[team] += 1
+					events.append((EV_TACKLE, player))
+
+			# Si la balle n'est pas tenue
+			if not State[ball] & PS_HOLD:
+				# Si la balle est proche du joueur et que son décompte est à 0
+				# ou moins
+				if physics.ComputeDistance(x,y, X[ball],Y[ball]) < 0.2 \
+				and state.BallCooldown <= 0.0:
+					# Le joueur prend un état Marche
+					SetPS_Mode(state, player, PS_WALK)
+					# et tient la balle
+					SetPS_Hold(state, player, PS_HOLD)
+					# Et la balle est tenue
+					SetPS_Hold(state, ball, PS_HOLD)
+			# Sinon si le joueur tient la balle
+			elif State[player] & PS_HOLD:
+				# Si le joueur se trouve dans les limites des buts de l'équipe
+				# adverse, son équipe gagne un point. La mise à jour s'arrête
+				# ici et la remise en jeu a lieu à la fin de la phase MP_GOAL
+				if Goals[team][0] <= x <= Goals[team][1]:
+					state.Score[team] += 1
+					state.Scorer = team
+					SetPhase(state, MP_GOAL)
+					events.append((EV_GOAL, player))
+					return events
+
+	# Si la balle n'est pas tenue
+	if not State[ball] & PS_HOLD:
+		# Copie de la position de la balle
+		x, y = X[ball], Y[ball]
+		BallTarget = state.BallTarget
+		# Tant que la balle est proche de sa cible
+		while physics.ComputeDistance(x,y,
+			BallTarget[0],BallTarget[1]) <= 0.1:
+			# Génération aléatoire d'une nouvelle cible au milieu du terrain
+			# pour la balle
+			BallTarget[0] = 0.4*RandomDraw(state) - 0.2
+			BallTarget[1] = 2.0*RandomDraw(state) - 1.0
+
+		# Calcul de la distance entre la balle et sa cible
+		h = physics.ComputeDistance(x,y, BallTarget[0], BallTarget[1])
+		# Calcul de l'orientation que la balle doit avoir pour se diriger vers
+		# sa cible
+		angle = math.acos((BallTarget[0]-x)/h)
+		# Correction de la mesure de l'angle si la cible est en dessous de la
+		# balle
+		if y > BallTarget[1]:
+			angle = -angle
+
+		# Calcul des coordonnées du vecteur vitesse de la balle
+		vx, vy = 0.2 * math.cos(angle), 0.2 * math.sin(angle)
+		# Calcul et sauvegarde de la nouvelle position et orientation de la
+		# balle
+		x, y = physics.ComputeMovements(x,y, vx,vy, dt)
+		X[ball], Y[ball], Angle[ball] = x, y, angle
+		# L'état de la balle est Marche
+		SetPS_Mode(state, ball, PS_WALK)
+
+	return events
+
+
+# > RunMatch(controllers, seed, dt):
+# Simule une partie complète sans affichage, aussi vite que possible
+# Paramètres:
+#   controllers: tableau de fonctions (une par joueur) recevant l'état de la
+#                partie et le joueur contrôlé et retournant ses contrôles au
+#                format [vecteur vitesse, état de la touche action]
+#   seed: graine du générateur aléatoire de la partie
+#   dt: durée simulée par chaque mise à jour en secondes
+# Retourne le MatchState de la partie terminée
+def RunMatch(controllers, seed=None, dt=TICK_TIME):
+	state = MatchState(seed)
+	while not state.Over:
+		inputs = [controllers[player](state, player)
+			for player in state.Players]
+		Step(state, inputs, dt)
+	return state
+
+###############################################################################
@@ -0,0 +1,85 @@
+###############################################################################
+# ENTITIES.PY: Module qui définit le stockage des entités d'une partie        #
+#              (joueurs et balle). Chaque composant (position, état,          #
+#              décomptes, etc) est rangé dans un tableau indexé par           #
+#              l'identifiant de l'entité                                      #
+###############################################################################
+
+# IMPORTATIONS
+# Locales
+from constants import *
+
+###############################################################################
+
+# CLASSES
+
+# Classe ComponentStore: ensemble des composants de toutes les entités d'une
+# partie. L'identifiant d'une entité est l'indice retourné par Spawn(), il ne
+# change jamais pendant la partie. Les tableaux ne sont jamais recréés après
+# la création des entités: les mises à jour modifient leurs valeurs sur place.
+# Des listes sont utilisées plutôt que des array.array car la lecture d'un
+# élément d'array.array crée un nouvel objet float à chaque accès, ce qui rend
+# les mises à jour plus lentes
+class ComponentStore:
+	__slots__ = ["Count", "Kind", "Team", "X", "Y", "Angle", "State",
+		"DashCooldown", "SpitCooldown", "SpawnX", "SpawnY", "SpawnAngle"]
+
+	# Initialise un stockage vide
+	def __init__(self):
+		# Nombre d'entités
+		self.Count = 0
+		# Type d'entité (KIND_PLAYER ou KIND_BALL)
+		self.Kind = []
+		# Equipe d'un joueur (PLAYER1 ou PLAYER2, -1 pour la balle)
+		self.Team = []
+		# Coordonnées et orientation (voir POS_X, POS_Y et POS_ANGLE)
+		self.X = []
+		self.Y = []
+		self.Angle = []
+		# Etat (valeurs PS_...)
+		self.State = []
+		# Décomptes d'attaque et d'immobilisation (uniquement pour les joueurs)
+		self.DashCooldown = []
+		self.SpitCooldown = []
+		# Coordonnées et orientation de départ
+		self.SpawnX = []
+		self.SpawnY = []
+		self.SpawnAngle = []
+
+	# Ajoute une entité et retourne son identifiant
+	# Paramètres:
+	#   kind: type de l'entité (KIND_PLAYER ou KIND_BALL)
+	#   team: équipe du joueur (PLAYER1 ou PLAYER2, -1 pour la balle)
+	#   x, y, angle: coordonnées et orientation de départ
+	def Spawn(self, kind, team, x, y, angle):
+		self.Kind.append(kind)
+		self.Team.append(team)
+		for component in [self.X, self.SpawnX]:
+			component.append(x)
+		for component in [self.Y, self.SpawnY]:
+			component.append(y)
+		for component in [self.Angle, self.SpawnAngle]:
+			component.append(angle)
+		self.State.append(PS_STOP)
+		self.DashCooldown.append(0.0)
+		self.SpitCooldown.append(0.0)
+		self.Count += 1
+		return self.Count - 1
+
+	# Replace toutes les entités à leur position de départ et réinitialise
+	# leur état et leurs décomptes
+	def Reset(self):
+		for id in range(self.Count):
+			self.X[id] = self.SpawnX[id]
+			self.Y[id] = self.SpawnY[id]
+			self.Angle[id] = self.SpawnAngle[id]
+			self.State[id] = PS_STOP
+			self.DashCooldown[id] = 0.0
+			self.SpitCooldown[id] = 0.0
+
+	# Retourne les coordonnées et l'orientation d'une entité sous la forme
+	# d'un tuple indexé par POS_X, POS_Y et POS_ANGLE
+	def Position(self, id):
+		return (self.X[id], self.Y[id], self.Angle[id])
+
+###############################################################################
@@ -0,0 +1,159 @@
+###############################################################################
+# FARM.PY: Programme qui simule un grand nombre de parties sans affichage en  #
+#          les répartissant sur tous les processeurs de la machine et qui     #
+#          rassemble leurs résultats                                          #
+#                                                                             #
+# Utilisation: python farm.py [-n PARTIES] [-w PROCESSUS] [-s GRAINE]        #
+#                             [-b BOT1 BOT2] [-o FICHIER]                     #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import argparse, json, math, multiprocessing, os, sys, time
+# Locales
+from constants import *
+import engine, bots
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > PlayMatch(seed, botNames):
+# Simule une partie complète et retourne son résultat
+# Paramètres:
+#   seed: graine du générateur aléatoire de la partie
+#   botNames: noms des fonctions du module bots contrôlant chaque joueur
+# Retourne un dictionnaire contenant la graine, le score final, le temps
+# restant, la liste des buts (joueur, temps restant) et le nombre d'attaques
+# réussies de chaque joueur
+def PlayMatch(seed, botNames):
+	controllers = [getattr(bots, name) for name in botNames]
+	state = engine.MatchState(seed)
+	goals = []
+
+	while not state.Over:
+		inputs = [controllers[PLAYER1](state, PLAYER1),
+			controllers[PLAYER2](state, PLAYER2)]
+		for event, player in engine.Step(state, inputs, TICK_TIME):
+			if event == EV_GOAL:
+				goals.append((player, round(state.GameTime, 3)))
+
+	return {"seed": seed, "score": state.Score,
+		"time": round(max(state.GameTime, 0.0), 3), "goals": goals,
+		"tackles": state.Tackles}
+
+
+# > PlayShard(shard):
+# Fonction exécutée par les processus de travail: simule un lot de parties
+# Paramètre:
+#   shard: tuple (liste des graines des parties, noms des bots)
+# Retourne un tuple (nom du processus, durée de calcul en secondes, liste des
+# résultats des parties)
+def PlayShard(shard):
+	seeds, botNames = shard
+	start = time.perf_counter()
+	results = [PlayMatch(seed, botNames) for seed in seeds]
+	return multiprocessing.current_process().name, \
+		time.perf_counter() - start, results
+
+
+# > RunFarm(count, workers, seed, botNames, shardSize):
+# Générateur qui répartit des parties entre plusieurs processus et retourne
+# leurs résultats au fur et à mesure qu'ils arrivent
+# Paramètres:
+#   count: nombre de parties à simuler
+#   workers: nombre de processus de travail
+#   seed: graine de base, la partie d'indice i utilise la graine seed + i
+#   botNames: noms des fonctions du module bots contrôlant chaque joueur
+#   shardSize: nombre maximal de parties envoyées à un processus à la fois,
+#              réduit pour que chaque processus reçoive au moins un lot
+# Produit des tuples (nom du processus, durée de calcul, liste de résultats)
+def RunFarm(count, workers, seed, botNames, shardSize=8):
+	# Avec peu de parties, des lots de shardSize parties laisseraient des
+	# processus inoccupés: la taille est limitée à une part égale par
+	# processus
+	shardSize = min(shardSize, max(1, math.ceil(count / workers)))
+	shards = [([(seed + i) & RNG_MASK for i in
+		range(start, min(start + shardSize, count))], botNames)
+		for start in range(0, count, shardSize)]
+
+	with multiprocessing.Pool(workers) as pool:
+		for shard in pool.imap_unordered(PlayShard, shards):
+			yield shard
+
+
+# > Summarize(results):
+# Calcule des statistiques globales sur une liste de résultats de parties
+# Paramètre:
+#   results: liste de dictionnaires retournés par PlayMatch()
+def Summarize(results):
+	count = max(len(results), 1)
+	wins = [0, 0, 0]
+	for result in results:
+		score = result["score"]
+		if score[PLAYER1] > score[PLAYER2]:
+			wins[PLAYER1] += 1
+		elif score[PLAYER1] < score[PLAYER2]:
+			wins[PLAYER2] += 1
+		else:
+			wins[2] += 1
+
+	return {"matches": len(results),
+		"wins": wins[:2], "draws": wins[2],
+		"goals_per_match": sum(len(r["goals"]) for r in results) / count,
+		"tackles_per_match": sum(sum(r["tackles"]) for r in results) / count,
+		"time_left_per_match": sum(r["time"] for r in results) / count}
+
+###############################################################################
+
+# PROGRAMME PRINCIPAL
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description="Simule des parties de Raptor Ball sans affichage")
+	parser.add_argument("-n", "--matches", type=int, default=1000,
+		help="nombre de parties à simuler")
+	parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(),
+		help="nombre de processus de travail")
+	parser.add_argument("-s", "--seed", type=int, default=0,
+		help="graine de la première partie")
+	parser.add_argument("-b", "--bots", nargs=2, default=["ChaseBot"] * 2,
+		metavar=("BOT1", "BOT2"), help="bots contrôlant chaque joueur")
+	parser.add_argument("-o", "--output",
+		help="fichier où écrire le résultat de chaque partie (JSON lines)")
+	args = parser.parse_args()
+
+	output = open(args.output, "w") if args.output else None
+	results = []
+	busy = {}
+	start = lastReport = time.perf_counter()
+
+	for worker, duration, shardResults in RunFarm(args.matches, args.workers,
+		args.seed, args.bots):
+		busy[worker] = busy.get(worker, 0.0) + duration
+		results.extend(shardResults)
+		if output:
+			for result in shardResults:
+				output.write(json.dumps(result) + "\n")
+
+		# Rapport d'avancement au plus une fois par seconde
+		now = time.perf_counter()
+		if now - lastReport >= 1.0 or len(results) == args.matches:
+			lastReport = now
+			print("{0}/{1} parties, {2:.1f} parties/s".format(len(results),
+				args.matches, len(results) / (now - start)), file=sys.stderr)
+
+	if output:
+		output.close()
+
+	# Rapport final: statistiques des parties, débit et taux d'utilisation de
+	# chaque processus (durée de calcul / durée totale)
+	elapsed = time.perf_counter() - start
+	summary = Summarize(results)
+	summary["elapsed"] = round(elapsed, 3)
+	summary["matches_per_second"] = round(len(results) / elapsed, 2)
+	summary["utilisation"] = {worker: round(duration / elapsed, 3)
+		for worker, duration in sorted(busy.items())}
+	print(json.dumps(summary, indent=2))
+
+###############################################################################
@@ -6,11 +6,12 @@
 # IMPORTATIONS
 # Python
 from threading import Thread
-import math, random, time
+from collections import namedtuple
+import time
 # Locales
 from constants import *
 import controls, ui
-import physics
+import engine, perf, replay, signals
 
 ###############################################################################
 
@@ -22,14 +23,40 @@ GameThread = None
 Running = False
 # Etat du jeu (hors du jeu / en jeu / jeu en pause)
 GameState = GS_NPLAYING
-# Score des joueurs
-Score = [0,0]
-# Temps restant de la partie en secondes
-GameTime = 0.0
-# Tableau des positions et orientations des joueurs et de la balle
-Positions = [[0.0, 0.0, 0.0], [0.0, 0.0, 0.0], [0.0, 0.0, 0.0]]
-# Etat des joueurs et de la balle (figé / marche / attaque / etc.)
-PlayersState = [PS_STOP, PS_STOP, PS_STOP]
+# engine.MatchState de la partie en cours (utilisé uniquement par GameThread)
+Match = None
+# Contrôles des joueurs appliqués à la partie (vecteur vitesse + état de la
+# touche action, indexés par PC_...), mis à jour par les commandes de
+# controls.Commands, et booléens indiquant pour chaque joueur si sa touche
+# action a été relâchée pendant la mise à jour en cours
+PlayersInputs = [[(0.0, 0.0), False], [(0.0, 0.0), False]]
+ActionReleased = [False, False]
+# replay.Recorder enregistrant les contrôles de la partie en cours (None si
+# les parties ne sont pas enregistrées)
+Recording = None
+
+# Instantané de l'état de la partie publié par GameThread après chaque mise à
+# jour. Un instantané n'est jamais modifié: GameThread en crée un nouveau et
+# remplace la globale en une seule affectation, l'interface utilisateur lit
+# donc toujours un état cohérent
+# Champs:
+#   Sequence: numéro de l'instantané (augmente de 1 à chaque publication)
+#   TickDate: date (time.perf_counter()) de la mise à jour correspondante
+#   Score: score des joueurs
+#   GameTime: temps restant de la partie en secondes
+#   Positions: positions et orientations des joueurs et de la balle
+#              (indexées par l'identifiant de leur entité)
+#   PreviousPositions: positions à la mise à jour précédente (permet à
+#                      l'affichage d'interpoler entre les deux)
+#   PlayersState: état des joueurs et de la balle (figé / marche / etc.)
+#   Phase: phase de la partie (MP_...)
+#   PhaseTime: temps restant de la phase en secondes
+Snapshot = namedtuple("Snapshot", ["Sequence", "TickDate", "Score",
+	"GameTime", "Positions", "PreviousPositions", "PlayersState", "Phase",
+	"PhaseTime"])
+CurrentSnapshot = Snapshot(0, 0.0, (0, 0), 0.0,
+	((0.0, 0.0, 0.0),) * 3, ((0.0, 0.0, 0.0),) * 3, (PS_STOP,) * 3,
+	MP_KICKOFF, 0.0)
 
 ###############################################################################
 
@@ -48,286 +75,182 @@ def Init():
 # Libère les ressources employées par ce module et ses sous-modules
 def Quit():
 	pass
-	
 
-# > SetPS_Mode(player, mode):
-# Change la valeur PlayersState d'un joueur (hors PS_HOLD)
-# Paramètres:
-#   player: joueur concernée (PLAYER1, PLAYER2 ou BALL)
-#   mode: valeur d'état à attribuer au joueur (PS_STOP, PS_WALK, PS_DASH ou
-#         PS_SPIT mais pas PS_HOLD)
-def SetPS_Mode(player, mode):
-	global PlayersState
-	# Utilisation d'un ET binaire pour garder le 3eme bit de PlayersState 
-	# correspondant à PS_HOLD et remettre à 0 les autres bits
-	PlayersState[player] &= PS_HOLD
-	# Utilisation d'un OU binaire pour ajouter à PlayersState la nouvelle
-	# valeur d'état
-	PlayersState[player] |= mode
-
-	
-# > SetPS_Hold(player, hold):
-# Change la valeur PlayersState d'un joueur (uniquement PS_HOLD)
-# Paramètres:
-#   player: joueur concernée (PLAYER1, PLAYER2 ou BALL)
-#   hold: nouvelle état de PS_HOLD à attribuer au joueur
-def SetPS_Hold(player, hold):
-	global PlayersState
-	# Utilise un ET et un OU binaire pour remplacer la valeur de PS_HOLD tout
-	# en gardant les autres bits de la variable dans le même état
-	PlayersState[player] = hold | (PlayersState[player] & 3)
+
+# > Publish(teleport):
+# Publie un nouvel instantané de l'état de la partie en cours
+# Paramètre:
+#   teleport: True si les positions ne doivent pas être interpolées depuis
+#             celles de l'instantané précédent (début de partie, remise en jeu)
+def Publish(teleport=False):
+	global CurrentSnapshot
+	Entities = Match.Entities
+	positions = tuple(map(Entities.Position, range(Entities.Count)))
+	previous = positions if teleport else CurrentSnapshot.Positions
+	CurrentSnapshot = Snapshot(CurrentSnapshot.Sequence + 1,
+		time.perf_counter(), tuple(Match.Score), Match.GameTime, positions,
+		previous, tuple(Entities.State), Match.Phase, Match.PhaseTime)
+	signals.Notify()
+
+
+# > SetGameState(state):
+# Change l'état du jeu et réveille les threads qui attendent ce changement
+# Paramètre:
+#   state: nouvel état du jeu (GS_NPLAYING, GS_PLAYING ou GS_PAUSED)
+def SetGameState(state):
+	global GameState
+	GameState = state
+	signals.Notify()
+
+
+# > Stop():
+# Arrête le programme en réveillant tous les threads qui attendent
+def Stop():
+	global Running
+	Running = False
+	signals.Notify()
 
 
 # > Run():
 # Fonction exécutée par le thread de ce module lorsqu'il est démarré
+# La simulation avance par pas de temps fixes (TICK_TIME): le temps réel écoulé
+# est accumulé et consommé par autant de mises à jour que nécessaire, ce qui
+# rend le résultat de la partie indépendant de la charge de la machine
 def Run():
-	global Running, GameState, Score, GameTime, Positions, PlayersState
+	global Running, Match, Recording
 	Running = True
 
 	# Tant que le jeu est en cours d'exécution
 	while Running:
 		# Attente du démarrage d'une partie ou de la fermeture du jeu
-		while Running and GameState == GS_NPLAYING:
-			time.sleep(WAIT_TIME)
-
-		# Initialisation des globales pour une nouvelle partie
-		Score = [0,0] # Score nul
-		GameTime = float(3 * 60) # 3 minutes de jeu
-		Positions = [[-2/3,0.0,0.0], [2/3,0.0,math.pi], [0.0, 0.0, math.pi/2]]
-		PlayersState = [PS_STOP, PS_STOP, PS_STOP]
-		
-		# Initialisation de variable locales
-		# DashCooldowns: tableau contenant un décompte pour chaque joueur qui
-		# permet de limiter leur usage de l'attaque
-		DashCooldowns = [0.0, 0.0]
-		# SpitCooldowns: tableau contenant une décompte pour chaque joueur qui
-		# permet de les immobiliser temporairement après qu'ils aient été 
-		# attaqués
-		SpitCooldowns = [0.0, 0.0]
-		# BallCooldowns: décompte permettant d'empêcher la balle d'être
-		# attrapée directement après avoir été relachée
-		BallCooldown = 0.0
-		# Coordonnées sur le terrain vers lesquelles la balle se déplace quand
-		# elle n'est pas tenue
-		BallTarget = [0.0, 0.0]
-
-		# Attends 3 secondes pour démarrer la partie si le jeu n'est pas fermé
-		# (sauf si le jeu a été fermé)
-		if Running:
-			time.sleep(3)
-
-		LastTick = time.time()
+		signals.WaitFor(lambda: not Running or GameState != GS_NPLAYING)
+
+		# Initialisation d'une nouvelle partie, qui commence par un compte à
+		# rebours de 3 secondes (phase MP_KICKOFF) simulé comme le reste de
+		# la partie: il est donc suspendu par la pause
+		Match = engine.MatchState(timed=True)
+		Publish(True)
+		if REPLAY_FOLDER:
+			Recording = replay.Recorder(Match.Seed, timed=True)
+
+		# Horloge monotone haute résolution utilisée pour mesurer le temps réel
+		# écoulé, et temps réel accumulé pas encore simulé
+		LastTick = time.perf_counter()
+		Accumulator = 0.0
+		# Date du début de la dernière mise à jour (mesure des performances)
+		LastTickStart = None
 		# Tant que le jeu n'est pas fermé et qu'une partie est en cours
 		# (ou en pause)
 		while Running and GameState != GS_NPLAYING:
-			# Si le jeu n'est pas en pause
+			Now = time.perf_counter()
+			# Si le jeu n'est pas en pause, ajoute le temps écoulé depuis la
+			# dernière exécution de cette boucle au temps à simuler
 			if GameState == GS_PLAYING:
-				# Calcule la différence de temps qui s'est écoulée depuis la
-				# dernière exécution de cette boucle
-				DeltaTime = time.time() - LastTick
-
-				# Décrémente les décomptes du jeu non associés à un joueur
-				BallCooldown -= DeltaTime
-				GameTime -= DeltaTime
-				# Si le temps restant est 0 ou moins, termine la partie et
-				# affiche l'écran de fin de partie
-				if GameTime <= 0.0:
-					GameState = GS_NPLAYING
-					ui.CurrentUi = ui.UiGameOverScreen()
-
-				# Pour chacun des joueurs (ordre du tableau aléatoire pour
-				# éviter qu'un des joueurs est toujours la priorité sur ses
-				# actions)
-				players = [PLAYER1, PLAYER2]
-				random.shuffle(players)
-				for player in players:
-					# Décrémente les décomptes du jeu associés à un joueur
-					DashCooldowns[player] -= DeltaTime
-					SpitCooldowns[player] -= DeltaTime
-
-					# Copie la position, l'orientation et le vecteur vitesse du
-					# joueur dans des variables plus faciles à utiliser
-					x, y = Positions[player][POS_X], Positions[player][POS_Y]
-					angle = Positions[player][POS_ANGLE]
-					v_vec = controls.PlayersControls[player][PC_VELOCT]
-
-					# Si le joueur a sa touche Action enfoncée, qu'il a un état
-					# Marche, ne tient pas la balle et a son décompte pour
-					# utiliser l'attaque à 0 ou moins, fait attaquer le joueur
-					if controls.PlayersControls[player][PC_ACTION] \
-					and PlayersState[player] == PS_WALK \
-					and DashCooldowns[player] <= 0.0:
-						# Réinitialisation de l'état de la touche action pour
-						# empêcher le joueur d'attaquer automatiquement en
-						# gardant la touche enfoncée
-						controls.PlayersControls[player][PC_ACTION] = False
-						# Réinitialise le décompte d'attaque du joueur
-						DashCooldowns[player] = CDOWN_DASH
-
-					# Si le joueur a été attaqué (décompte non terminé)
-					if SpitCooldowns[player] > 0.0:
-						# Si le joueur a été attaqué il y a plus de 0.5 s,
-						# le joueur prend un état Immobile
-						if SpitCooldowns[player] < CDOWN_SPIT - 0.5:
-							SetPS_Mode(player, PS_STOP)
-						# Sinon le joueur a un état de Perte de la balle
-						# (permet d'afficher l'animation correspondante)
-						else:
-							SetPS_Mode(player, PS_SPIT)
-					# Sinon si le joueur a un vecteur vitesse nul
-					elif v_vec[VEC_NORM] == 0.0:
-						# Le joueur a un état Immobile
-						SetPS_Mode(player, PS_STOP)
-					# Sinon
-					else:
-						# Définit le coefficient normal de la vitesse du joueur
-						v_multiplier = 0.3
-						# Le joueur a un état Marche
-						SetPS_Mode(player, PS_WALK)
-
-						# Si le joueur a attaqué il y a moins de 0.5s et qu'il
-						# ne tient pas la balle
-						if DashCooldowns[player] > CDOWN_DASH - 0.5 \
-						and not PlayersState[player] & PS_HOLD:
-							# Augmente le coeffiecient de vitesse du joueur
-							# (accélération)
-							v_multiplier = 0.5
-							# L'état du joueur devient Attaque
-							SetPS_Mode(player, PS_DASH)
-						
-						# Si le joueur tient la balle
-						if PlayersState[player] & PS_HOLD:
-							# Diminue le coefficient de vitesse du joueur
-							# (Ralentissement)
-							v_multiplier = 0.25
-
-						# Calcule de la vitesse du joueur
-						v = v_vec[VEC_NORM] * v_multiplier
-						# Copie de l'angle du déplacement du joueur
-						angle = v_vec[VEC_ANGLE]
-						# Calcul des coordonnées du vecteur vitesse du joueur
-						vx, vy = v * math.cos(angle), v * math.sin(angle)
-						# Calcul de la nouvelle position du joueur
-						x, y = physics.ComputeMovements(x,y, vx,vy, DeltaTime)
-						# Sauvegarde de la position et de l'orientation du
-						# joueur dans Positions
-						Positions[player] = [x, y, angle]
-
-						# Tableau associant à chaque joueur son adversaire
-						opponent = [PLAYER2, PLAYER1]
-						# Copie de la position et de l'orientation du joueur
-						# adverse
-						o_x = Positions[opponent[player]][POS_X]
-						o_y = Positions[opponent[player]][POS_Y]
-						o_angle = Positions[opponent[player]][POS_ANGLE]
-						# Si le joueur est en état Attaque, que son adversaire
-						# tient la balle et qu'ils sont assez proches
-						if PlayersState[player] & 3 == PS_DASH \
-						and PlayersState[opponent[player]] & PS_HOLD \
-						and physics.ComputeDistance(x,y, o_x,o_y) <= 0.2:
-							# L'adversaire perd la balle
-							SetPS_Hold(opponent[player], 0)
-							SetPS_Mode(opponent[player], PS_SPIT)
-							# Réinitialise le décompte d'immobilisation de
-							# l'adversaire
-							SpitCooldowns[opponent[player]] = CDOWN_SPIT
-							# Calcul une position pour la balle en la plaçant
-							# devant l'adversaire
-							b_x = o_x + 0.25*math.cos(o_angle)
-							b_y = o_y + 0.25*WIN_RATIO*math.sin(o_angle)
-							# Sauvegarde la nouvelle position de la balle dans
-							# Positions
-							Positions[BALL] = [b_x, b_y, o_angle]
-							# La balle n'est plus tenue
-							SetPS_Hold(BALL, 0)
-							# Réinitialisation du décompte de la balle
-							BallCooldown = CDOWN_BALL
-
-						# Si la balle n'est pas tenue
-						if not PlayersState[BALL] & PS_HOLD:
-							# Copie de la position de la balle
-							b_x = Positions[BALL][POS_X]
-							b_y = Positions[BALL][POS_Y]
-							# Si la balle est proche du joueur et que son
-							# décompte est à 0 ou moins
-							if physics.ComputeDistance(x,y, b_x,b_y) < 0.2 \
-							and BallCooldown <= 0.0:
-								# Le joueur prend un état Marche
-								SetPS_Mode(player, PS_WALK)
-								# et tient la balle
-								SetPS_Hold(player, PS_HOLD)
-								# Et la balle est tenue
-								SetPS_Hold(BALL, PS_HOLD)
-						# Sinon si le joueur tient la balle
-						elif PlayersState[player] & PS_HOLD:
-							# Tableau qui contient les limites horizontales des
-							# buts adverses de chaque joueur
-							Goal = [[0.9, 1.0], [-1.0, -0.9]]
-							# Si le joueur se trouve dans les limites des buts
-							# du joueur adverse
-							if Goal[player][0] <= x <= Goal[player][1]:
-								# Le joueur gagne un point
-								Score[player] += 1
-								# Attente d'1 seconde pour indiquer la prise en
-								# compte du but aux joueurs
-								time.sleep(1)
-								
-								# Réinitialise les positions des joueurs, leur
-								# état, les décomptes et la cible de la balle
-								Positions = [[-2/3,0.0,0.0], [2/3,0.0,math.pi],
-									[0.0, 0.0, math.pi/2]]
-								PlayersState = [PS_STOP, PS_STOP, PS_STOP]
-								DashCooldowns = [0.0, 0.0]
-								SpitCooldowns = [0.0, 0.0]
-								BallCooldown = 0.0
-								BallTarget = [0.0, 0.0]
-
-								# Si le joueur a 3 points, termine la partie et
-								# affiche l'écran de fin de partie
-								if Score[player] == 3:
-									GameState = GS_NPLAYING
-									ui.CurrentUi = ui.UiGameOverScreen()
-								# Sinon, attente d'1 seconde avant la reprise
-								# du jeu
-								else:
-									time.sleep(1)
-				
-				# Si la balle n'est pas tenue
-				if not PlayersState[BALL] & PS_HOLD:
-					# Copie de la position de la balle
-					x, y = Positions[BALL][POS_X], Positions[BALL][POS_Y]
-					# Tant que la balle est proche de sa cible
-					while physics.ComputeDistance(x,y,
-						BallTarget[0],BallTarget[1]) <= 0.1:
-						# Génération aléatoire d'une nouvelle cible au milieu
-						# du terrain pour la balle
-						BallTarget[0] = 0.4*random.random() - 0.2
-						BallTarget[1] = 2.0*random.random() - 1.0
-					
-					# Calcul de la distance entre la balle et sa cible
-					h = physics.ComputeDistance(x,y,
-						BallTarget[0], BallTarget[1])
-					# Calcul de l'orientation que la balle doit avoir pour se
-					# diriger vers sa cible
-					angle = math.acos((BallTarget[0]-x)/h)
-					# Correction de la mesure de l'angle si la cible est en
-					# dessous de la balle
-					if y > BallTarget[1]:
-						angle = -angle
-
-					# Calcul des coordonnées du vecteur vitesse de la balle
-					vx, vy = 0.2 * math.cos(angle), 0.2 * math.sin(angle)
-					# Calcul de la nouvelle position de la balle
-					x, y = physics.ComputeMovements(x,y, vx,vy, DeltaTime)
-					# Sauvegarde de la nouvelle position et orientation dans
-					# Positions
-					Positions[BALL] = [x, y, angle]
-					# L'état de la balle est Marche
-					SetPS_Mode(BALL, PS_WALK)
-
-			# Enregistrement de la date de la dernière exécution de la boucle
-			LastTick = time.time()
-			# Attente permettant de réduire l'utilisation du processeur
-			time.sleep(WAIT_TIME)
+				Accumulator += Now - LastTick
+			LastTick = Now
+
+			# Limite le retard à rattraper à MAX_SUBSTEPS mises à jour pour
+			# éviter que la simulation ne prenne de plus en plus de retard
+			# quand une mise à jour dure plus longtemps que TICK_TIME
+			if Accumulator > MAX_SUBSTEPS * TICK_TIME:
+				Accumulator = MAX_SUBSTEPS * TICK_TIME
+
+			# Effectue autant de mises à jour de durée fixe que le temps
+			# accumulé le permet
+			while Accumulator >= TICK_TIME and GameState == GS_PLAYING:
+				Accumulator -= TICK_TIME
+				start = time.perf_counter()
+				# La mise à jour simule le temps réel qui se termine à la
+				# date Now - Accumulator
+				Tick(TICK_TIME, Now - Accumulator)
+				# Mesure de la durée de la mise à jour et de l'intervalle avec
+				# le début de la précédente
+				perf.Record(PF_TICK, time.perf_counter() - start)
+				if LastTickStart is not None:
+					perf.Record(PF_TICKGAP, start - LastTickStart)
+				LastTickStart = start
+
+			# Attente jusqu'à la prochaine mise à jour permettant de réduire
+			# l'utilisation du processeur, ou jusqu'à la reprise du jeu s'il
+			# est en pause (l'attente est interrompue si l'état du jeu change)
+			if GameState == GS_PLAYING:
+				signals.WaitFor(lambda: not Running or
+					GameState != GS_PLAYING, TICK_TIME - Accumulator)
+			else:
+				signals.WaitFor(lambda: not Running or
+					GameState != GS_PAUSED)
+				# La durée de la pause ne doit pas être simulée à la reprise,
+				# ni comptée dans l'intervalle entre deux mises à jour
+				LastTick = time.perf_counter()
+				LastTickStart = None
+
+		# Sauvegarde de l'enregistrement de la partie terminée, abandonnée ou
+		# interrompue par la fermeture du jeu
+		if Recording is not None and Recording.Ticks:
+			Recording.Save(Match)
+		Recording = None
+
+
+# > Tick(dt, until):
+# Effectue une mise à jour de la partie en cours avec les contrôles des joueurs
+# à la fin de la période simulée et réagit aux évènements de la partie
+# Paramètres:
+#   dt: durée simulée par cette mise à jour en secondes (TICK_TIME)
+#   until: date (time.perf_counter()) de la fin de la période de temps réel
+#          simulée par cette mise à jour
+# Publie ensuite un nouvel instantané de la partie
+def Tick(dt, until):
+	teleport = False
+
+	ApplyCommands(until)
+	if Recording is not None:
+		Recording.Add(PlayersInputs)
+	for event, player in engine.Step(Match, PlayersInputs, dt):
+		# Réinitialisation de l'état de la touche action pour empêcher le
+		# joueur d'attaquer automatiquement en gardant la touche enfoncée
+		if event == EV_DASH:
+			PlayersInputs[player][PC_ACTION] = False
+		# Après une remise en jeu, l'affichage ne doit pas interpoler entre
+		# les anciennes et nouvelles positions
+		elif event == EV_RESET:
+			teleport = True
+
+	# Les touches action relâchées pendant cette mise à jour ne sont plus
+	# enfoncées pour les suivantes
+	for player in (PLAYER1, PLAYER2):
+		if ActionReleased[player]:
+			PlayersInputs[player][PC_ACTION] = False
+			ActionReleased[player] = False
+
+	Publish(teleport)
+
+	# Si la partie est terminée (temps écoulé ou 3 points), affiche l'écran de
+	# fin de partie
+	if Match.Over:
+		SetGameState(GS_NPLAYING)
+		ui.SetCurrentUi(ui.UiGameOverScreen())
+
+
+
+# > ApplyCommands(until):
+# Applique aux contrôles des joueurs, dans l'ordre, les commandes de
+# controls.Commands datées au plus tard de la fin de la mise à jour (les
+# suivantes restent dans la file pour les mises à jour suivantes). Le
+# relâchement de la touche action n'est appliqué qu'après la mise à jour: une
+# touche enfoncée puis relâchée entre deux mises à jour déclenche quand même
+# une attaque
+# Paramètre:
+#   until: date (time.perf_counter()) de la fin de la mise à jour
+def ApplyCommands(until):
+	Commands = controls.Commands
+	while Commands and Commands[0][IC_DATE] <= until:
+		date, player, type, value = Commands.popleft()
+		if type == IN_VELOCITY:
+			PlayersInputs[player][PC_VELOCT] = value
+		elif value:
+			PlayersInputs[player][PC_ACTION] = True
+			ActionReleased[player] = False
+		else:
+			ActionReleased[player] = True
 
 ###############################################################################
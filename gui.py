@@ -4,10 +4,30 @@
 ###############################################################################
 
 # IMPORTATIONS
+# Python
+import math, time
+# PySDL2
 from sdl2 import SDL_Color
 # Locales
 from constants import *
-import display
+import display, pacer, perf
+
+###############################################################################
+
+# GLOBALES
+# Date (time.perf_counter()) de la dernière mise à jour des lignes de texte
+# de l'affichage des performances et lignes affichées
+PerfRefreshDate = 0.0
+PerfLines = []
+# Texte du menu de texte (règles ou à propos) actuellement généré
+TextScreenText = None
+# Horloges des animations des entités de la partie: identifiant de l'entité ->
+# tuple (animation affichée, date (time.perf_counter()) du début de
+# l'animation). Une horloge est remise à zéro quand l'animation de l'entité
+# change et supprimée quand l'entité est immobile
+AnimationClocks = {}
+# Verrou à détenir pendant le dessin d'une image (voir display.RendererLock)
+RenderLock = display.RendererLock
 
 ###############################################################################
 
@@ -44,6 +64,9 @@ def Init():
 		["raptor_red_dash", 5, 0.1],
 		["raptor_red_spit", 6, 0.1]])
 
+	# Regroupement des textures fixes et des animations dans un atlas
+	display.PackTextures()
+
 	# Création des textures de texte avec leur paramètres de rendu (police,
 	# taille de police, couleur)
 	display.LoadLabelTextures([
@@ -56,9 +79,6 @@ def Init():
 		["Rejouer", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(20,20,20)],
 		["Pause","MiddleSchoolCrushNBP.ttf", 96, SDL_Color(50,50,50)],
 		["Partie terminée", "MiddleSchoolCrushNBP.ttf", 96, SDL_Color(50,50,50)],
-		[" ", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(20,20,200)],
-		[" ", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(200,20,20)],
-		[" ", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(50,50,50)],
 		[" ", "MiddleSchoolCrushNBP.ttf", 48, SDL_Color(50,50,50)],
 		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)],
 		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)],
@@ -71,22 +91,39 @@ def Init():
 		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)],
 		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)],
 		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)],
-		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)]])
+		[" ", "MiddleSchoolCrushNBP.ttf", 32, SDL_Color(50,50,50)],
+		[" ", "MiddleSchoolCrushNBP.ttf", 96, SDL_Color(50,50,50)]])
+
+	# Création des atlas de glyphes des textes modifiés à chaque image (score,
+	# temps restant et affichage des performances)
+	display.LoadGlyphAtlases([
+		["0123456789", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(20,20,200)],
+		["0123456789", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(200,20,20)],
+		["0123456789:", "MiddleSchoolCrushNBP.ttf", 64, SDL_Color(50,50,50)],
+		["".join(chr(n) for n in range(32, 127)),
+			"MiddleSchoolCrushNBP.ttf", 24, SDL_Color(20,20,20)]])
 
 	print("Terminé")
 
 
 
-# > DrawGame(score, gameTime, paused, positions, playersState):
+# > DrawGame(score, gameTime, paused, positions, playersState, phase,
+#            phaseTime, now):
 # Affiche la partie en cours avec les textures du terrain, des joueurs et de la
-# balle, ainsi que le menu pause si le jeu est en pause
+# balle, le compte à rebours ou le message de la phase actuelle de la partie
+# ainsi que le menu pause si le jeu est en pause
 # Paramètres:
 #   score: liste de deux entiers correspondant au score de chaque joueur
 #   gameTime: temps en secondes restant dans la partie
 #   paused: booléen indiquant si le jeu est en pause
 #   positions: tableau contenant les coordonnées et orientation des joueurs
 #   playersState: tableau contenant l'état de chaque joueur
-def DrawGame(score, gameTime, paused, positions, playersState):
+#   phase: phase de la partie (MP_...)
+#   phaseTime: temps restant de la phase en secondes
+#   now: date (time.perf_counter()) de l'image, utilisée par toutes les
+#        animations
+def DrawGame(score, gameTime, paused, positions, playersState, phase,
+	phaseTime, now):
 	# Affiche le fond (terrain de jeu)
 	display.DrawFixedTexture(TFX_FIELD, 0, 0, WIN_WIDTH, WIN_HEIGHT, 0.0)
 
@@ -106,6 +143,8 @@ def DrawGame(score, gameTime, paused, positions, playersState):
 		# Si le joueur est la balle et qu'elle est tenu, ne l'affiche pas
 		if player == BALL and playersState[player] & 4 == PS_HOLD:
 			continue
+		# La balle est dessinée sous les joueurs
+		display.SetLayer(LY_BALL if player == BALL else LY_PLAYERS)
 
 		# Si le joueur est immobile, affiche la texture figée correspondant à
 		# son id (player) et son état (playersState). On traduit par ailleurs
@@ -117,48 +156,80 @@ def DrawGame(score, gameTime, paused, positions, playersState):
 			int(((1.0+positions[player][POS_X])*WIN_WIDTH-sz_map[player])/2),
 			int(((1.0-positions[player][POS_Y])*WIN_HEIGHT-sz_map[player])/2),
 			sz_map[player], sz_map[player], positions[player][POS_ANGLE])
+			AnimationClocks.pop(player, None)
 		# Si le joueur marche, affiche l'animation correspondante de la même
-		# manière que pour le cas précédent
+		# manière que pour le cas précédent, depuis le début de l'animation si
+		# elle vient de changer
 		else:
-			display.DrawAnimatedTexture(ani_map[player] + \
-			var_map[playersState[player]],
+			animation = ani_map[player] + var_map[playersState[player]]
+			clock = AnimationClocks.get(player)
+			if clock is None or clock[0] != animation:
+				clock = AnimationClocks[player] = (animation, now)
+			display.DrawAnimatedTexture(animation,
 			int(((1.0+positions[player][POS_X])*WIN_WIDTH-sz_map[player])/2),
 			int(((1.0-positions[player][POS_Y])*WIN_HEIGHT-sz_map[player])/2),
-			sz_map[player], sz_map[player], positions[player][POS_ANGLE])
-
-	# Met à jour les textures de texte de score et de temps avec les valeurs
-	# actuelles
-	display.UpdateLabelTexture(LBL_SCOREP1, str(score[PLAYER1]))
-	display.UpdateLabelTexture(LBL_TIMER, "{0}:{1:0>2}".format(
-		int(gameTime/60), int(gameTime%60)))
-	display.UpdateLabelTexture(LBL_SCOREP2, str(score[PLAYER2]))
+			sz_map[player], sz_map[player], positions[player][POS_ANGLE],
+			now - clock[1])
 
 	# Affiche le score et le temps restant
+	display.SetLayer(LY_PANEL)
 	display.DrawFixedTexture(TFX_BCKGDS,
 		int((WIN_WIDTH-512)/2), -16, 512, 96, 0.0)
-	display.DrawLabelTexture(LBL_SCOREP1, int(WIN_WIDTH/2)-200, 40, 0.0)
-	display.DrawLabelTexture(LBL_TIMER, int(WIN_WIDTH/2), 40, 0.0)
-	display.DrawLabelTexture(LBL_SCOREP2, int(WIN_WIDTH/2)+200, 40, 0.0)
-
-	# Si le jeu est en pause, affiche le menu de pause
-	if paused:
-		# Fond du menu et des boutons
-		display.DrawFixedTexture(TFX_BCKGDM,
-			int((WIN_WIDTH-640)/2), int((WIN_HEIGHT-384)/2), 640, 384, 0.0)
+	display.SetLayer(LY_TEXT)
+	display.DrawText(GL_SCOREP1, str(score[PLAYER1]),
+		int(WIN_WIDTH/2)-200, 40)
+	display.DrawText(GL_TIMER, "{0}:{1:0>2}".format(
+		int(gameTime/60), int(gameTime%60)), int(WIN_WIDTH/2), 40)
+	display.DrawText(GL_SCOREP2, str(score[PLAYER2]),
+		int(WIN_WIDTH/2)+200, 40)
+
+	# Si le jeu est suspendu par l'une des phases de la partie, affiche le
+	# message d'un but ou le nombre de secondes restant avant la reprise du
+	# jeu
+	if phase != MP_PLAY and not paused:
+		if phase == MP_GOAL:
+			display.UpdateLabelTexture(LBL_PHASE, "But !")
+		else:
+			display.UpdateLabelTexture(LBL_PHASE, str(math.ceil(phaseTime)))
+		display.SetLayer(LY_PANEL)
 		display.DrawFixedTexture(TFX_BCKGDS,
 			int((WIN_WIDTH-512)/2), int(WIN_HEIGHT/2-48), 512, 96, 0.0)
-		display.DrawFixedTexture(TFX_BCKGDS,
-			int((WIN_WIDTH-512)/2), int(WIN_HEIGHT/2+72), 512, 96, 0.0)
-
-		# Titre du menu et textes des boutons
-		display.DrawLabelTexture(LBL_PAUSE, int(WIN_WIDTH/2),
-			int(WIN_HEIGHT/2-120), 0.0)
-		display.DrawLabelTexture(LBL_RESUME, int(WIN_WIDTH/2),
+		display.SetLayer(LY_TEXT)
+		display.DrawLabelTexture(LBL_PHASE, int(WIN_WIDTH/2),
 			int(WIN_HEIGHT/2), 0.0)
-		display.DrawLabelTexture(LBL_TITLESCR, int(WIN_WIDTH/2),
-			int(WIN_HEIGHT/2+120), 0.0)
 
-	display.DrawWindow()
+	# Si le jeu est en pause, affiche le menu de pause (dessiné une seule
+	# fois dans une texture)
+	if paused:
+		display.DrawCached(SCR_PAUSE, None, LY_PANEL, ComposePauseMenu)
+
+	DrawWindow()
+
+
+
+# > ComposePauseMenu():
+# Dessine le menu pause affiché par-dessus la partie (voir
+# display.DrawCached())
+def ComposePauseMenu():
+	# Fond du menu et des boutons
+	display.SetLayer(LY_PANEL)
+	display.DrawFixedTexture(TFX_BCKGDM,
+		int((WIN_WIDTH-640)/2), int((WIN_HEIGHT-384)/2), 640, 384, 0.0)
+	display.SetLayer(LY_BUTTON)
+	display.DrawFixedTexture(TFX_BCKGDS,
+		int((WIN_WIDTH-512)/2), int(WIN_HEIGHT/2-48), 512, 96, 0.0)
+	display.DrawFixedTexture(TFX_BCKGDS,
+		int((WIN_WIDTH-512)/2), int(WIN_HEIGHT/2+72), 512, 96, 0.0)
+
+	# Titre du menu et textes des boutons
+	display.SetLayer(LY_TEXT)
+	display.DrawLabelTexture(LBL_PAUSE, int(WIN_WIDTH/2),
+		int(WIN_HEIGHT/2-120), 0.0)
+	display.DrawLabelTexture(LBL_RESUME, int(WIN_WIDTH/2),
+		int(WIN_HEIGHT/2), 0.0)
+	display.DrawLabelTexture(LBL_TITLESCR, int(WIN_WIDTH/2),
+		int(WIN_HEIGHT/2+120), 0.0)
+
 
 
 # > DrawGameOverScreen(score, gameTime):
@@ -169,6 +240,20 @@ def DrawGame(score, gameTime, paused, positions, playersState):
 #   gameTime: décompte du temps restant de la partie avant qu'elle ne soit
 # terminée
 def DrawGameOverScreen(score, gameTime):
+	# L'écran n'est redessiné que si le score ou le message change
+	display.DrawCached(SCR_GAMEOVER, (tuple(score), gameTime <= 0.0),
+		LY_BACKGROUND, lambda: ComposeGameOverScreen(score, gameTime))
+	DrawWindow()
+
+
+
+# > ComposeGameOverScreen(score, gameTime):
+# Dessine l'écran de fin de partie (voir DrawGameOverScreen() et
+# display.DrawCached())
+# Paramètres:
+#   score: tableau contenant le score de chaque joueur
+#   gameTime: décompte du temps restant de la partie
+def ComposeGameOverScreen(score, gameTime):
 	# Affiche le fond de terrain
 	display.DrawFixedTexture(TFX_FIELD, 0, 0, WIN_WIDTH, WIN_HEIGHT, 0.0)
 
@@ -191,8 +276,10 @@ def DrawGameOverScreen(score, gameTime):
 	display.UpdateLabelTexture(LBL_GOVERMSG, gameover_msg)
 
 	# Fond du menu et des boutons
+	display.SetLayer(LY_PANEL)
 	display.DrawFixedTexture(TFX_BCKGDL, int((WIN_WIDTH-1024)/2),
 		int((WIN_HEIGHT-512)/2), 1024, 512, 0.0)
+	display.SetLayer(LY_BUTTON)
 	display.DrawFixedTexture(TFX_BCKGDS, int((WIN_WIDTH-512)/2),
 		int((WIN_HEIGHT-512)/2)+272, 512, 96, 0.0)
 	display.DrawFixedTexture(TFX_BCKGDS, int((WIN_WIDTH-512)/2),
@@ -200,12 +287,13 @@ def DrawGameOverScreen(score, gameTime):
 
 	# Titre du menu, scores des joueurs, message de fin de partie et texte
 	# des boutons
+	display.SetLayer(LY_TEXT)
 	display.DrawLabelTexture(LBL_GAMEOVER, int(WIN_WIDTH/2),
 		int((WIN_HEIGHT-512)/2)+64, 0.0)
-	display.DrawLabelTexture(LBL_SCOREP1, int(WIN_WIDTH/2)-48,
-		int((WIN_HEIGHT-512)/2)+160, 0.0)
-	display.DrawLabelTexture(LBL_SCOREP2, int(WIN_WIDTH/2)+48,
-		int((WIN_HEIGHT-512)/2)+160, 0.0)
+	display.DrawText(GL_SCOREP1, str(score[PLAYER1]), int(WIN_WIDTH/2)-48,
+		int((WIN_HEIGHT-512)/2)+160)
+	display.DrawText(GL_SCOREP2, str(score[PLAYER2]), int(WIN_WIDTH/2)+48,
+		int((WIN_HEIGHT-512)/2)+160)
 	display.DrawLabelTexture(LBL_GOVERMSG, int(WIN_WIDTH/2),
 		int((WIN_HEIGHT-512)/2)+224, 0.0)
 	display.DrawLabelTexture(LBL_NEWGAME, int(WIN_WIDTH/2),
@@ -213,8 +301,6 @@ def DrawGameOverScreen(score, gameTime):
 	display.DrawLabelTexture(LBL_TITLESCR, int(WIN_WIDTH/2),
 		int((WIN_HEIGHT-512)/2)+432, 0.0)
 
-	display.DrawWindow()
-
 
 
 # > DrawTitleScreen(button_x_pos, button_y_pos):
@@ -224,6 +310,20 @@ def DrawGameOverScreen(score, gameTime):
 #   button_x_pos: position horizontale des boutons du menu
 #   button_y_pos: tableau des positions verticales des 4 boutons
 def DrawTitleScreen(button_x_pos, button_y_pos):
+	# L'écran est dessiné une seule fois dans une texture
+	display.DrawCached(SCR_TITLE, (button_x_pos, tuple(button_y_pos)),
+		LY_BACKGROUND,
+		lambda: ComposeTitleScreen(button_x_pos, button_y_pos))
+	DrawWindow()
+
+
+
+# > ComposeTitleScreen(button_x_pos, button_y_pos):
+# Dessine l'écran titre (voir DrawTitleScreen() et display.DrawCached())
+# Paramètres:
+#   button_x_pos: position horizontale des boutons du menu
+#   button_y_pos: tableau des positions verticales des 4 boutons
+def ComposeTitleScreen(button_x_pos, button_y_pos):
 	# Fond de l'écran titre
 	display.DrawFixedTexture(TFX_TTLSCR, 0, 0, WIN_WIDTH, WIN_HEIGHT, 0.0)
 
@@ -233,19 +333,29 @@ def DrawTitleScreen(button_x_pos, button_y_pos):
 
 	# Pour chaque bouton, affiche son fond et son texte
 	for i in range(4):
+		display.SetLayer(LY_BUTTON)
 		display.DrawFixedTexture(TFX_BCKGDS, button_x_pos, button_y_pos[i],
 			512, 96, 0.0)
+		display.SetLayer(LY_TEXT)
 		display.DrawLabelTexture(lbl_map[i],
 			button_x_pos + 256, button_y_pos[i] + 48, 0.0)
 
-	display.DrawWindow()
-
 
 
 # > DrawTextScreen():
 # Affiche un menu de texte (règles ou à propos). Il faut d'abord générer les
 # textures de texte avec UpdateTextScreenLabel().
 def DrawTextScreen():
+	# L'écran n'est redessiné que si son texte change
+	display.DrawCached(SCR_TEXT, TextScreenText, LY_BACKGROUND,
+		ComposeTextScreen)
+	DrawWindow()
+
+
+
+# > ComposeTextScreen():
+# Dessine un menu de texte (voir DrawTextScreen() et display.DrawCached())
+def ComposeTextScreen():
 	# Affiche le fond du menu principal
 	display.DrawFixedTexture(TFX_TTLSCR, 0, 0, WIN_WIDTH, WIN_HEIGHT, 0.0)
 
@@ -253,13 +363,16 @@ def DrawTextScreen():
 	y_pos = int(WIN_HEIGHT*456/720-256)
 
 	# Affiche un fond pour le texte
+	display.SetLayer(LY_PANEL)
 	display.DrawFixedTexture(TFX_BCKGDL, int((WIN_WIDTH-1024)/2),
 		y_pos, 1024, 512, 0.0)
 	# Affiche le fond du bouton de retour au menu principal
+	display.SetLayer(LY_BUTTON)
 	display.DrawFixedTexture(TFX_BCKGDS, int((WIN_WIDTH-512)/2),
 		y_pos+400, 512, 96, 0.0)
 
 	# Affiche chaque ligne du texte
+	display.SetLayer(LY_TEXT)
 	for i in range(12):
 		display.DrawLabelTexture(LBL_TEXTSCR + i, int(WIN_WIDTH/2),
 			y_pos+32*(i+1), 0.0)
@@ -268,6 +381,33 @@ def DrawTextScreen():
 	display.DrawLabelTexture(LBL_TITLESCR, int(WIN_WIDTH/2), y_pos+448,
 		0.0)
 
+
+
+# > DrawPerfOverlay():
+# Affiche les mesures du module perf dans le coin supérieur gauche de l'écran.
+# Les lignes de texte ne sont mises à jour que toutes les PERF_REFRESH
+# secondes pour rester lisibles
+def DrawPerfOverlay():
+	global PerfRefreshDate, PerfLines
+
+	now = time.perf_counter()
+	if now - PerfRefreshDate >= PERF_REFRESH:
+		PerfRefreshDate = now
+		PerfLines = perf.OverlayLines() + [pacer.OverlayLine()]
+
+	display.SetLayer(LY_OVERLAY)
+	display.DrawFixedTexture(TFX_BCKGDM, 0, 0, 640, 156, 0.0)
+	display.SetLayer(LY_OVERLAYTXT)
+	for i, line in enumerate(PerfLines):
+		display.DrawText(GL_PERF, line, 320, 22 + i * 28)
+
+
+# > DrawWindow():
+# Affiche les mesures de performances si leur affichage est activé puis
+# rafraîchit le contenu de la fenêtre
+def DrawWindow():
+	if perf.Overlay:
+		DrawPerfOverlay()
 	display.DrawWindow()
 
 
@@ -277,15 +417,20 @@ def DrawTextScreen():
 # Paramètre:
 #   text: texte du menu à afficher
 def UpdateTextScreenLabels(text):
+	global TextScreenText
+	TextScreenText = text
+
 	# Sépare les lignes du texte (les textures de textes ne peuvent faire
 	# qu'une ligne chacune)
 	lines = text.splitlines()
 	# Complète la liste lines avec des lignes vides pour qu'il y en ait 12
 	for i in range(12 - len(lines)):
 		lines.append(" ")
-	# Génère les textures de textes en remplaçant
-	for i in range(12):
-		display.UpdateLabelTexture(LBL_TEXTSCR + i, lines[i])
+	# Génère les textures de textes en remplaçant les précédentes (toutes
+	# les lignes changent avant le dessin de l'image suivante)
+	with RenderLock:
+		for i in range(12):
+			display.UpdateLabelTexture(LBL_TEXTSCR + i, lines[i])
 
 ###############################################################################
 
@@ -302,15 +447,32 @@ def OpenWindow():
 def CloseWindow():
 	display.CloseWindow()
 
-# > WindowIsOpen():
-# Détermine si la fenêtre du jeu est ouverte ou non en comparant la globale
-# Window avec None (valeur initiale)
-def WindowIsOpen():
-	return display.Window != None and display.RendererReady
+# > WaitWindowOpen():
+# Bloque le thread appelant jusqu'à ce que la fenêtre du jeu soit ouverte et
+# que son contexte de rendu soit prêt
+def WaitWindowOpen():
+	display.RendererReady.wait()
 
 # > ToggleFullscreen():
 # Active ou désactive le mode plein-écran du jeu
 def ToggleFullscreen():
 	display.ToggleFullscreen()
 
+# > RestoreTextures():
+# Demande à display de recréer les textures du jeu perdues par le pilote
+# d'affichage
+def RestoreTextures():
+	display.RestoreTextures()
+
+# > Invalidate():
+# Indique que le contenu de la fenêtre a été perdu et doit être redessiné
+def Invalidate():
+	display.Generation += 1
+
+# > DisplayGeneration():
+# Retourne le numéro qui change chaque fois que le contenu de la fenêtre doit
+# être entièrement redessiné
+def DisplayGeneration():
+	return display.Generation
+
 ###############################################################################
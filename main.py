@@ -28,7 +28,7 @@ TTF_Init()
 
 
 # Import des modules principaux du programme
-import game, controls, ui
+import game, controls, ui, perf
 
 # Initialisation des modules principaux et sauvegarde des threads qui sont
 # associés à chacun
@@ -49,6 +49,9 @@ game.GameThread.join()
 for submodule in [game, ui, controls]:
 	submodule.Quit()
 
+# Sauvegarde des mesures de performances dans un fichier
+perf.Dump()
+
 # Dé-initialise la SDL2 et ses extensions (dans l'ordre inverse de leur
 # initialisation)
 TTF_Quit()
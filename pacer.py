@@ -0,0 +1,106 @@
+###############################################################################
+# PACER.PY: Module qui limite le nombre d'images dessinées par seconde par le #
+#           thread de ui lorsque SDL_RenderPresent() n'attend pas la          #
+#           synchronisation verticale de l'écran (rendu logiciel, pilote      #
+#           vidéo sans écran, pilote qui ignore la synchronisation, etc).     #
+#           Sans limite, la boucle de dessin utiliserait un coeur du          #
+#           processeur à 100%                                                 #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import time
+# Locales
+from constants import *
+import perf
+
+###############################################################################
+
+# GLOBALES
+# Durée d'une image en secondes pour le nombre d'images par seconde visé (0:
+# pas de limite)
+FrameTime = 1.0 / FRAME_RATE if FRAME_RATE else 0.0
+# Date (time.perf_counter()) à laquelle l'image en cours doit être terminée
+# (None: pas d'image en cours)
+Deadline = None
+# Moyenne glissante de la durée de SDL_RenderPresent() en secondes
+PresentAverage = 0.0
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > SetFrameRate(rate):
+# Change le nombre d'images par seconde visé
+# Paramètre:
+#   rate: nombre d'images par seconde (0: pas de limite)
+def SetFrameRate(rate):
+	global FrameTime
+	FrameTime = 1.0 / rate if rate else 0.0
+	Reset()
+
+
+# > PresentBlocks():
+# Retourne True si SDL_RenderPresent() attend la synchronisation verticale:
+# sa durée moyenne est alors une part importante de la durée d'une image
+def PresentBlocks():
+	return PresentAverage > FrameTime * PACER_BLOCKING
+
+
+# > Pace(presentTime):
+# Termine une image. Si SDL_RenderPresent() attend la synchronisation
+# verticale, elle donne la cadence des images et la fonction retourne
+# immédiatement. Sinon, attend la date de fin de l'image en dormant puis en
+# bouclant activement pendant les PACER_SPIN dernières secondes (time.sleep()
+# n'est pas assez précis). Une image terminée plus de PACER_TOLERANCE image
+# après cette date est comptée comme ratée dans la série PF_LATE de perf (avec
+# son retard en secondes)
+# Paramètre:
+#   presentTime: durée de SDL_RenderPresent() pour cette image en secondes (0
+#                si l'image n'a pas été affichée car identique à la
+#                précédente)
+def Pace(presentTime):
+	global Deadline, PresentAverage
+
+	# Les images qui n'ont pas été affichées ne renseignent pas sur le
+	# comportement de SDL_RenderPresent()
+	if presentTime > 0.0:
+		PresentAverage += (presentTime - PresentAverage) * PACER_SMOOTHING
+	if not FrameTime:
+		return
+
+	now = time.perf_counter()
+	if Deadline is not None and now - Deadline > FrameTime * PACER_TOLERANCE:
+		# Image ratée: la cadence repart de cette image sans rattraper le
+		# retard
+		perf.Record(PF_LATE, now - Deadline)
+		Deadline = None
+
+	if Deadline is None or (presentTime > 0.0 and PresentBlocks()):
+		Deadline = now
+	elif now < Deadline:
+		remaining = Deadline - now
+		if remaining > PACER_SPIN:
+			time.sleep(remaining - PACER_SPIN)
+		while time.perf_counter() < Deadline:
+			pass
+	Deadline += FrameTime
+
+
+# > Reset():
+# Indique qu'aucune image n'est en cours (le thread de ui attend un
+# changement): la prochaine image ne peut pas être en retard
+def Reset():
+	global Deadline
+	Deadline = None
+
+
+# > OverlayLine():
+# Retourne la ligne de texte sur la cadence des images affichée par
+# gui.DrawPerfOverlay()
+def OverlayLine():
+	return "Cadence: {0}, vsync {1}, {2} images ratees".format(
+		"{0:.0f} img/s".format(1.0 / FrameTime) if FrameTime else "libre",
+		"oui" if PresentBlocks() else "non", perf.Buffers[PF_LATE].Count)
+
+###############################################################################
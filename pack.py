@@ -0,0 +1,107 @@
+###############################################################################
+# PACK.PY: Programme qui crée le paquet de textures du jeu: toutes les images #
+#          PNG du dossier "textures" sont décodées une fois pour toutes et    #
+#          leurs pixels sont rangés dans un seul fichier (voir assets) que le #
+#          jeu projette en mémoire au démarrage au lieu de décoder les PNG    #
+#                                                                             #
+# Utilisation: python pack.py [-o FICHIER]                                    #
+#              (à relancer après chaque modification des textures, les images #
+#              modifiées depuis la création du paquet sont sinon chargées     #
+#              depuis leur fichier PNG)                                       #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import argparse, ctypes, os, platform
+
+# Pour les systèmes utilisant Windows, configuration du chemin d'accès vers les
+# fichiers DLL de la bibliothèque SDL2 (voir main.py)
+if platform.system() == "Windows":
+	os.environ["PYSDL2_DLL_PATH"] = \
+		os.getcwd() + "/sdl2-dll-" + platform.architecture()[0]
+
+# PySDL2
+from sdl2 import *
+from sdl2.sdlimage import *
+# Locales
+from constants import *
+import assets
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > DecodeImage(name):
+# Décode une image PNG et retourne ses pixels au format RGBA (octets dans
+# l'ordre R, G, B, A quelle que soit la machine)
+# Paramètre:
+#   name: chemin d'accès de l'image depuis le dossier "textures"
+# Retourne un tuple (largeur, hauteur, pixels)
+def DecodeImage(name):
+	Surface = IMG_Load(("textures/" + name).encode())
+	if not Surface:
+		raise OSError("{0}: {1}".format(name, IMG_GetError().decode()))
+
+	# Conversion vers le format de pixel dont les octets sont dans l'ordre
+	# R, G, B, A en mémoire
+	if SDL_BYTEORDER == SDL_LIL_ENDIAN:
+		pixelFormat = SDL_PIXELFORMAT_ABGR8888
+	else:
+		pixelFormat = SDL_PIXELFORMAT_RGBA8888
+	Converted = SDL_ConvertSurfaceFormat(Surface, pixelFormat, 0)
+	SDL_FreeSurface(Surface)
+
+	# Copie des lignes de pixels (une ligne peut être suivie d'octets
+	# inutilisés, Converted.contents.pitch est sa taille réelle)
+	width, height = Converted.contents.w, Converted.contents.h
+	pitch = Converted.contents.pitch
+	address = ctypes.cast(Converted.contents.pixels, ctypes.c_void_p).value
+	pixels = b"".join(ctypes.string_at(address + y * pitch, width * 4)
+		for y in range(height))
+	SDL_FreeSurface(Converted)
+
+	return width, height, pixels
+
+
+# > FindImages():
+# Retourne la liste triée des chemins d'accès de toutes les images PNG du
+# dossier "textures" (depuis ce dossier, séparés par des "/")
+def FindImages():
+	names = []
+	for folder, subfolders, files in os.walk("textures"):
+		for file in files:
+			if file.endswith(".png"):
+				path = os.path.relpath(os.path.join(folder, file), "textures")
+				names.append(path.replace(os.sep, "/"))
+	return sorted(names)
+
+###############################################################################
+
+# PROGRAMME PRINCIPAL
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description="Crée le paquet de textures de Raptor Ball")
+	parser.add_argument("-o", "--output", default=ASSET_PACK,
+		help="fichier du paquet à créer")
+	args = parser.parse_args()
+
+	SDL_Init(0)
+	IMG_Init(IMG_INIT_PNG)
+
+	images = []
+	for name in FindImages():
+		width, height, pixels = DecodeImage(name)
+		stat = os.stat("textures/" + name)
+		images.append((name, width, height, pixels, stat.st_size,
+			stat.st_mtime_ns))
+		print("{0}: {1}x{2}".format(name, width, height))
+
+	assets.WritePack(args.output, images)
+	print("{0} images, {1} octets -> {2}".format(len(images),
+		os.path.getsize(args.output), args.output))
+
+	IMG_Quit()
+	SDL_Quit()
+
+###############################################################################
@@ -0,0 +1,175 @@
+###############################################################################
+# PERF.PY: Module qui mesure les performances des threads du jeu (durée des   #
+#          mises à jour, des images, du traitement des évènements, nombre     #
+#          d'appels de rendu, etc). Les dernières mesures sont conservées     #
+#          dans des tampons circulaires de taille fixe pour être affichées à  #
+#          l'écran ou sauvegardées dans un fichier à la fermeture du jeu      #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+import json, time
+# Locales
+from constants import *
+
+###############################################################################
+
+# CLASSES
+
+# Classe RingBuffer: tampon circulaire contenant les size dernières valeurs
+# d'une série de mesures. La liste est allouée une seule fois: chaque nouvelle
+# valeur remplace la plus ancienne. Chaque tampon n'est rempli que par un seul
+# thread, les autres threads peuvent le lire à tout moment
+class RingBuffer:
+	__slots__ = ["Values", "Index", "Count"]
+
+	# Initialise un tampon vide
+	# Paramètre:
+	#   size: nombre de valeurs conservées
+	def __init__(self, size=PERF_SAMPLES):
+		self.Values = [0.0] * size
+		# Indice où sera écrite la prochaine valeur et nombre total de valeurs
+		# ajoutées depuis la création du tampon
+		self.Index = 0
+		self.Count = 0
+
+	# Ajoute une valeur au tampon
+	def Add(self, value):
+		self.Values[self.Index] = value
+		self.Index = (self.Index + 1) % len(self.Values)
+		self.Count += 1
+
+	# Retourne la liste des valeurs conservées, de la plus ancienne à la plus
+	# récente
+	def Samples(self):
+		if self.Count < len(self.Values):
+			return self.Values[:self.Count]
+		return self.Values[self.Index:] + self.Values[:self.Index]
+
+	# Retourne un dictionnaire de statistiques sur les valeurs conservées
+	# (moyenne, maximum et 99ème centile)
+	def Stats(self):
+		samples = sorted(self.Samples())
+		if not samples:
+			return {"mean": 0.0, "max": 0.0, "p99": 0.0}
+		return {"mean": sum(samples) / len(samples), "max": samples[-1],
+			"p99": samples[min(int(len(samples) * 0.99), len(samples) - 1)]}
+
+###############################################################################
+
+# GLOBALES
+# Noms des séries de mesures (indexés par PF_...) utilisés dans le fichier de
+# sauvegarde
+SeriesNames = ["tick", "tick_interval", "draw", "present", "frame_interval",
+	"events", "queue_depth", "render_copies", "label_renders", "frame_late",
+	"rect_allocs"]
+# Tampons circulaires de chaque série de mesures (indexés par PF_...)
+Buffers = [RingBuffer() for name in SeriesNames]
+# Compteurs de l'image en cours de dessin (indexés par CT_...) et séries dans
+# lesquelles ils sont enregistrés à la fin de chaque image
+Counters = [0, 0, 0]
+CounterSeries = [PF_COPIES, PF_LABELS, PF_RECTS]
+# Durée de SDL_RenderPresent() pendant l'image en cours de dessin et date de
+# la fin de l'image précédente
+PresentTime = 0.0
+LastFrame = None
+# Booléen indiquant si les performances sont affichées à l'écran
+Overlay = False
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > Record(series, value):
+# Ajoute une mesure à une série
+# Paramètres:
+#   series: série de mesures concernée (PF_...)
+#   value: valeur mesurée
+def Record(series, value):
+	Buffers[series].Add(value)
+
+
+# > Count(counter):
+# Incrémente un compteur de l'image en cours de dessin
+# Paramètre:
+#   counter: compteur concerné (CT_...)
+def Count(counter):
+	Counters[counter] += 1
+
+
+# > Present(duration):
+# Ajoute la durée d'un appel à SDL_RenderPresent() à l'image en cours
+# Paramètre:
+#   duration: durée de l'appel en secondes
+def Present(duration):
+	global PresentTime
+	PresentTime += duration
+
+
+# > EndFrame(duration):
+# Termine les mesures d'une image: sépare sa durée entre les appels de dessin
+# et l'attente de SDL_RenderPresent(), enregistre l'intervalle avec l'image
+# précédente ainsi que les compteurs de l'image puis les remet à 0
+# Paramètre:
+#   duration: durée totale du dessin de l'image en secondes
+# Retourne la durée de SDL_RenderPresent() pour cette image en secondes
+def EndFrame(duration):
+	global PresentTime, LastFrame
+	now = time.perf_counter()
+	presentTime = PresentTime
+	Record(PF_DRAW, duration - presentTime)
+	Record(PF_PRESENT, presentTime)
+	if LastFrame is not None:
+		Record(PF_FRAME, now - LastFrame)
+	for counter, series in enumerate(CounterSeries):
+		Record(series, Counters[counter])
+		Counters[counter] = 0
+	PresentTime = 0.0
+	LastFrame = now
+	return presentTime
+
+
+# > ToggleOverlay():
+# Active ou désactive l'affichage des performances à l'écran
+def ToggleOverlay():
+	global Overlay
+	Overlay = not Overlay
+
+
+# > OverlayLines():
+# Retourne les lignes de texte affichées à l'écran par gui.DrawPerfOverlay()
+def OverlayLines():
+	tick, tickGap = Buffers[PF_TICK].Stats(), Buffers[PF_TICKGAP].Stats()
+	draw, present = Buffers[PF_DRAW].Stats(), Buffers[PF_PRESENT].Stats()
+	frame = Buffers[PF_FRAME].Stats()
+	events, queue = Buffers[PF_EVENTS].Stats(), Buffers[PF_QUEUE].Stats()
+	copies, labels = Buffers[PF_COPIES].Stats(), Buffers[PF_LABELS].Stats()
+	rects = Buffers[PF_RECTS].Stats()
+	rate = lambda stats: 1.0 / stats["mean"] if stats["mean"] else 0.0
+
+	return [
+		"Jeu: {0:.2f} ms/maj (max {1:.2f}), {2:.0f} maj/s".format(
+			tick["mean"] * 1000, tick["max"] * 1000, rate(tickGap)),
+		"Image: dessin {0:.2f} ms, present {1:.2f} ms, {2:.0f} img/s".format(
+			draw["mean"] * 1000, present["mean"] * 1000, rate(frame)),
+		"Controles: {0:.3f} ms, file {1:.1f} (max {2:.0f})".format(
+			events["mean"] * 1000, queue["mean"], queue["max"]),
+		"Copies: {0:.1f}/img, textes: {1:.2f}/img, rects: {2:.2f}/img".format(
+			copies["mean"], labels["mean"], rects["mean"])]
+
+
+# > Dump(path):
+# Sauvegarde les statistiques et les mesures conservées de chaque série dans
+# un fichier JSON
+# Paramètre:
+#   path: chemin d'accès du fichier
+def Dump(path=PERF_FILE):
+	data = {}
+	for name, buffer in zip(SeriesNames, Buffers):
+		data[name] = buffer.Stats()
+		data[name]["count"] = buffer.Count
+		data[name]["samples"] = buffer.Samples()
+	with open(path, "w") as file:
+		json.dump(data, file, indent=1)
+
+###############################################################################
@@ -50,4 +50,60 @@ def ComputeMovements(x, y, vx, vy, dt):
 def ComputeDistance(x1, y1, x2, y2):
 	return math.sqrt((x1-x2)**2 + WIN_RATIO*(y1-y2)**2)
 
+# > InterpolatePositions(previous, current, alpha):
+# Calcule les positions et orientations intermédiaires entre deux mises à jour
+# de la simulation (les angles sont interpolés par le plus court chemin)
+# Paramètres:
+#   previous, current: tableaux de positions [x, y, angle] des entités aux deux
+#                      dernières mises à jour
+#   alpha: avancement entre les deux mises à jour dans [0.0;1.0]
+def InterpolatePositions(previous, current, alpha):
+	positions = []
+	for prev, cur in zip(previous, current):
+		# Différence d'angle ramenée dans [-pi;pi]
+		d_angle = (cur[POS_ANGLE] - prev[POS_ANGLE] + math.pi) \
+			% (2*math.pi) - math.pi
+		positions.append([prev[POS_X] + (cur[POS_X]-prev[POS_X]) * alpha,
+			prev[POS_Y] + (cur[POS_Y]-prev[POS_Y]) * alpha,
+			prev[POS_ANGLE] + d_angle * alpha])
+	return positions
+
+# > TranslateKbInput(keys):
+# Traduit un tableau de 4 booléens correspondants aux touches de déplacement
+# d'un joueur en un vecteur vitesse
+# Paramètre:
+#   keys: tableau de 4 booléens correspondant à l'état des touches
+#         directionnelles d'un joueur dans l'ordre Haut, Bas, Gauche, Droite
+def TranslateKbInput(keys):
+	# Si aucune touche n'est pressée ou que les directions pressées s'annulent,
+	# retourne un vecteur vitesse nul
+	if keys[KEY_UP] == keys[KEY_DOWN] and keys[KEY_LEFT] == keys[KEY_RIGHT]:
+		return (0.0, 0.0)
+
+	# Traduit l'état de chaque touche appuyées ou non en coordonnées d'un point
+	# (x,y) dans un repère
+	x, y = 0, 0
+	if keys[KEY_UP]:
+		y += 1
+	if keys[KEY_DOWN]:
+		y -= 1
+	if keys[KEY_LEFT]:
+		x -= 1
+	if keys[KEY_RIGHT]:
+		x += 1
+
+	# Calcul l'angle formé entre l'axe horizontal et la demi-droite dont
+	# l'extrémité est l'origine# (0;0) du repère et qui passe par le point
+	# (x,y)
+	h = math.sqrt(x**2 + y**2)
+	angle = math.acos(x/h)
+
+	# Corrige la valeur calculée de l'angle s'il se trouve sous l'axe
+	# horizontal en le rendant négatif
+	if y < 0:
+		angle = -angle
+
+	# Retourne un vecteur vitesse avec l'angle calculé et une norme fixée à 1
+	return (angle, 1.0)
+
 ###############################################################################
@@ -0,0 +1,356 @@
+###############################################################################
+# REPLAY.PY: Module qui enregistre les contrôles des joueurs à chaque mise à  #
+#            jour d'une partie dans un fichier binaire compact (graine de la  #
+#            partie, puis suites de mises à jour aux contrôles identiques),   #
+#            et programme qui rejoue un enregistrement sans affichage (aussi  #
+#            vite que possible) ou dans la fenêtre du jeu. Le module          #
+#            n'utilise pas la SDL                                             #
+#                                                                             #
+# Utilisation: python replay.py FICHIER [-a] [-x VITESSE] [-d PILOTE]         #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+from collections import namedtuple
+import argparse, json, os, platform, struct, sys, time
+# Locales
+from constants import *
+import engine, physics
+
+###############################################################################
+
+# GLOBALES
+# Identifiant et version du format des enregistrements
+MAGIC = b"RBRP"
+VERSION = 1
+# Formats (module struct) de l'en-tête (identifiant, version, options, nombre
+# de joueurs, graine, durée d'une mise à jour en secondes et nombre de mises à
+# jour), de la fin de l'enregistrement (score de chaque joueur, temps restant
+# et nombre de valeurs aléatoires tirées, qui permettent de vérifier que la
+# partie rejouée est identique) et d'un vecteur vitesse quelconque (angle,
+# norme)
+HEADER = struct.Struct("<4sHBBQdI")
+FOOTER = struct.Struct("<IIdQ")
+RAW = struct.Struct("<dd")
+# Option de l'en-tête: phases de la partie chronométrées (voir
+# engine.MatchState)
+FLAG_TIMED = 0x01
+# Code des contrôles d'un joueur (un octet): les 4 bits de poids faible
+# désignent le vecteur vitesse (indice dans Directions, ou DIR_RAW si le
+# vecteur est écrit en entier après les codes), le bit ACTION_BIT l'état de la
+# touche action
+DIR_RAW = 0x0F
+ACTION_BIT = 0x10
+
+# Vecteurs vitesse pouvant être obtenus au clavier (voir
+# physics.TranslateKbInput()), le vecteur nul en premier, et dictionnaire
+# vecteur -> indice. Changer l'ordre ou les valeurs de ce tableau rend les
+# enregistrements existants illisibles (VERSION doit alors changer)
+Directions = []
+for mask in range(16):
+	velocity = physics.TranslateKbInput([bool(mask & 1 << key)
+		for key in range(4)])
+	if velocity not in Directions:
+		Directions.append(velocity)
+DirectionCodes = {velocity: code for code, velocity in enumerate(Directions)}
+
+# Enregistrement lu par ReadRecording()
+# Champs:
+#   Seed: graine du générateur aléatoire de la partie
+#   Timed: True si les phases de la partie sont chronométrées
+#   Players: nombre de joueurs
+#   TickTime: durée simulée par chaque mise à jour en secondes
+#   Ticks: nombre de mises à jour enregistrées
+#   Score: score final des joueurs
+#   GameTime: temps restant de la partie à la fin de l'enregistrement
+#   Draws: nombre de valeurs aléatoires tirées pendant la partie
+#   Data: contrôles encodés (voir DecodeInputs())
+Recording = namedtuple("Recording", ["Seed", "Timed", "Players", "TickTime",
+	"Ticks", "Score", "GameTime", "Draws", "Data"])
+
+###############################################################################
+
+# CLASSES
+
+# Classe Recorder: enregistrement en cours des contrôles d'une partie. Les
+# mises à jour consécutives aux contrôles identiques forment une suite écrite
+# une seule fois avec sa longueur (les contrôles au clavier ne changent que
+# quelques fois par seconde)
+class Recorder:
+	__slots__ = ["Seed", "Timed", "TickTime", "Ticks", "Data", "Last",
+		"Count"]
+
+	# Initialise un enregistrement vide
+	# Paramètres:
+	#   seed: graine du générateur aléatoire de la partie
+	#   timed: True si les phases de la partie sont chronométrées
+	#   tickTime: durée simulée par chaque mise à jour en secondes
+	def __init__(self, seed, timed=False, tickTime=TICK_TIME):
+		self.Seed, self.Timed, self.TickTime = seed, timed, tickTime
+		self.Ticks = 0
+		# Suites terminées déjà encodées, codes des contrôles de la suite en
+		# cours et nombre de mises à jour de cette suite
+		self.Data = bytearray()
+		self.Last = None
+		self.Count = 0
+
+	# Ajoute les contrôles des joueurs utilisés par une mise à jour
+	# Paramètre:
+	#   inputs: contrôles des joueurs au format de game.PlayersInputs
+	def Add(self, inputs):
+		codes = EncodeInputs(inputs)
+		if codes == self.Last:
+			self.Count += 1
+		else:
+			if self.Count:
+				self.Data += EncodeCount(self.Count) + self.Last
+			self.Last, self.Count = codes, 1
+		self.Ticks += 1
+
+	# Retourne le contenu du fichier de l'enregistrement
+	# Paramètre:
+	#   state: engine.MatchState de la partie enregistrée
+	def Bytes(self, state):
+		data = bytes(self.Data)
+		if self.Count:
+			data += EncodeCount(self.Count) + self.Last
+		return HEADER.pack(MAGIC, VERSION, FLAG_TIMED if self.Timed else 0,
+			len(state.Players), self.Seed, self.TickTime, self.Ticks) + data \
+			+ FOOTER.pack(state.Score[PLAYER1], state.Score[PLAYER2],
+			state.GameTime, state.Draws)
+
+	# Ecrit l'enregistrement dans un nouveau fichier dont le nom contient la
+	# date et la graine de la partie
+	# Paramètres:
+	#   state: engine.MatchState de la partie enregistrée
+	#   folder: dossier où le fichier est créé
+	# Retourne le chemin d'accès du fichier (None s'il n'a pas pu être écrit)
+	def Save(self, state, folder=REPLAY_FOLDER):
+		path = os.path.join(folder, "{0}-{1:016x}.rbr".format(
+			time.strftime("%Y%m%d-%H%M%S"), self.Seed))
+		try:
+			os.makedirs(folder, exist_ok=True)
+			with open(path, "wb") as file:
+				file.write(self.Bytes(state))
+		except OSError as error:
+			print("Enregistrement de la partie impossible ({0})".format(error))
+			return None
+		return path
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > EncodeInputs(inputs):
+# Encode les contrôles des joueurs d'une mise à jour: un code par joueur (voir
+# DIR_RAW et ACTION_BIT) suivi des vecteurs vitesse qui ne peuvent pas être
+# obtenus au clavier (bots)
+# Paramètre:
+#   inputs: contrôles des joueurs au format de game.PlayersInputs
+# Retourne un objet bytes
+def EncodeInputs(inputs):
+	codes, raw = bytearray(), b""
+	for velocity, action in inputs:
+		code = DirectionCodes.get(tuple(velocity), DIR_RAW)
+		if code == DIR_RAW:
+			raw += RAW.pack(*velocity)
+		codes.append(code | ACTION_BIT if action else code)
+	return bytes(codes) + raw
+
+
+# > EncodeCount(count):
+# Encode un entier positif sur un nombre variable d'octets (7 bits par octet,
+# le bit de poids fort indique qu'un autre octet suit)
+# Paramètre:
+#   count: entier à encoder
+def EncodeCount(count):
+	data = bytearray()
+	while count >= 0x80:
+		data.append(count & 0x7F | 0x80)
+		count >>= 7
+	data.append(count)
+	return bytes(data)
+
+
+# > ReadRecording(path):
+# Lit un fichier d'enregistrement
+# Paramètre:
+#   path: chemin d'accès du fichier
+# Retourne un Recording
+def ReadRecording(path):
+	with open(path, "rb") as file:
+		data = file.read()
+	if len(data) < HEADER.size + FOOTER.size:
+		raise ValueError("{0}: fichier trop court".format(path))
+	magic, version, flags, players, seed, tickTime, ticks = \
+		HEADER.unpack_from(data, 0)
+	if magic != MAGIC or version != VERSION:
+		raise ValueError("{0}: format d'enregistrement inconnu".format(path))
+	score1, score2, gameTime, draws = FOOTER.unpack_from(data,
+		len(data) - FOOTER.size)
+	return Recording(seed, bool(flags & FLAG_TIMED), players, tickTime, ticks,
+		[score1, score2], gameTime, draws,
+		data[HEADER.size:len(data) - FOOTER.size])
+
+
+# > DecodeInputs(recording):
+# Générateur qui décode les contrôles enregistrés
+# Paramètre:
+#   recording: Recording lu par ReadRecording()
+# Produit pour chaque mise à jour les contrôles des joueurs au format de
+# game.PlayersInputs (le même tableau est produit pour toutes les mises à jour
+# d'une suite: il ne doit pas être modifié)
+def DecodeInputs(recording):
+	data, position = recording.Data, 0
+	while position < len(data):
+		count, shift = 0, 0
+		while True:
+			byte = data[position]
+			position += 1
+			count |= (byte & 0x7F) << shift
+			shift += 7
+			if not byte & 0x80:
+				break
+
+		codes = data[position:position + recording.Players]
+		position += recording.Players
+		inputs = []
+		for code in codes:
+			if code & 0x0F == DIR_RAW:
+				velocity = RAW.unpack_from(data, position)
+				position += RAW.size
+			else:
+				velocity = Directions[code & 0x0F]
+			inputs.append([velocity, bool(code & ACTION_BIT)])
+
+		for tick in range(count):
+			yield inputs
+
+
+# > ReplayMatch(recording):
+# Rejoue une partie enregistrée sans affichage, aussi vite que possible
+# Paramètre:
+#   recording: Recording lu par ReadRecording()
+# Retourne le MatchState de la partie rejouée
+def ReplayMatch(recording):
+	state = engine.MatchState(recording.Seed, timed=recording.Timed)
+	for inputs in DecodeInputs(recording):
+		engine.Step(state, inputs, recording.TickTime)
+	return state
+
+
+# > Compare(recording, state):
+# Vérifie qu'une partie rejouée se termine comme la partie enregistrée
+# Paramètres:
+#   recording: Recording de la partie
+#   state: MatchState de la partie rejouée
+# Retourne True si le score, le temps restant et le nombre de valeurs
+# aléatoires tirées sont identiques
+def Compare(recording, state):
+	return list(state.Score) == recording.Score \
+		and state.GameTime == recording.GameTime \
+		and state.Draws == recording.Draws
+
+
+# > ShowMatch(recording, speed):
+# Rejoue une partie enregistrée dans la fenêtre du jeu (la fenêtre doit être
+# ouverte et gui initialisé). La touche Echap ou la fermeture de la fenêtre
+# arrête la lecture
+# Paramètres:
+#   recording: Recording lu par ReadRecording()
+#   speed: vitesse de lecture (1.0: temps réel)
+# Retourne le MatchState de la partie rejouée
+def ShowMatch(recording, speed=1.0):
+	from sdl2 import SDL_Event, SDL_PollEvent, SDL_QUIT, SDL_KEYDOWN, \
+		SDLK_ESCAPE
+	import game, gui, pacer, perf, ui
+
+	game.Match = engine.MatchState(recording.Seed, timed=recording.Timed)
+	game.GameState = GS_PLAYING
+	game.Publish(True)
+	screen = ui.UiGame()
+	inputs = DecodeInputs(recording)
+	Event = SDL_Event()
+
+	ticks, start = 0, time.perf_counter()
+	while ticks < recording.Ticks:
+		while SDL_PollEvent(Event) != 0:
+			if Event.type == SDL_QUIT or (Event.type == SDL_KEYDOWN
+				and Event.key.keysym.sym == SDLK_ESCAPE):
+				return game.Match
+
+		# Mises à jour correspondant au temps écoulé depuis le début
+		target = int((time.perf_counter() - start) * speed
+			/ recording.TickTime)
+		while ticks < min(target, recording.Ticks):
+			events = engine.Step(game.Match, next(inputs),
+				recording.TickTime)
+			game.Publish(any(event == EV_RESET for event, player in events))
+			ticks += 1
+
+		frameStart = time.perf_counter()
+		with gui.RenderLock:
+			screen.Draw()
+		pacer.Pace(perf.EndFrame(time.perf_counter() - frameStart))
+	return game.Match
+
+###############################################################################
+
+# PROGRAMME PRINCIPAL
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(
+		description="Rejoue une partie de Raptor Ball enregistrée")
+	parser.add_argument("file", help="fichier d'enregistrement (.rbr)")
+	parser.add_argument("-a", "--show", action="store_true",
+		help="affiche la partie dans la fenêtre du jeu")
+	parser.add_argument("-x", "--speed", type=float, default=1.0,
+		help="vitesse de lecture de la partie affichée (1: temps réel)")
+	parser.add_argument("-d", "--driver",
+		help="pilote vidéo de la SDL de la partie affichée")
+	args = parser.parse_args()
+
+	recording = ReadRecording(args.file)
+	result = {"seed": recording.Seed, "ticks": recording.Ticks,
+		"bytes": os.path.getsize(args.file)}
+
+	if args.show:
+		# Chargement et initialisation de la SDL2 et des extensions sdlimage
+		# et sdlttf (voir main.py)
+		if platform.system() == "Windows":
+			os.environ["PYSDL2_DLL_PATH"] = \
+				os.getcwd() + "/sdl2-dll-" + platform.architecture()[0]
+		if args.driver:
+			os.environ["SDL_VIDEODRIVER"] = args.driver
+		from sdl2 import *
+		from sdl2.sdlimage import *
+		from sdl2.sdlttf import *
+		if SDL_Init(SDL_INIT_VIDEO | SDL_INIT_EVENTS) != 0:
+			sys.exit("Initialisation de la SDL impossible: " +
+				SDL_GetError().decode())
+		IMG_Init(IMG_INIT_PNG)
+		TTF_Init()
+		import gui
+
+		gui.OpenWindow()
+		gui.Init()
+		start = time.perf_counter()
+		state = ShowMatch(recording, args.speed)
+		elapsed = time.perf_counter() - start
+		gui.CloseWindow()
+		TTF_Quit()
+		IMG_Quit()
+		SDL_Quit()
+	else:
+		start = time.perf_counter()
+		state = ReplayMatch(recording)
+		elapsed = time.perf_counter() - start
+
+	result.update({"score": state.Score, "identical": Compare(recording,
+		state), "elapsed_s": elapsed,
+		"speed": recording.Ticks * recording.TickTime / elapsed
+		if elapsed else 0.0})
+	json.dump(result, sys.stdout, indent=1)
+	sys.stdout.write("\n")
+
+###############################################################################
@@ -0,0 +1,43 @@
+###############################################################################
+# SIGNALS.PY: Module qui permet aux threads du programme d'attendre qu'un     #
+#             changement ait lieu (état du jeu, nouvel instantané de la       #
+#             partie, interface affichée, etc) au lieu de vérifier            #
+#             régulièrement s'il a eu lieu                                    #
+###############################################################################
+
+# IMPORTATIONS
+# Python
+from threading import Condition
+
+###############################################################################
+
+# GLOBALES
+# Condition signalée à chaque changement pouvant intéresser un autre thread
+Changed = Condition()
+
+###############################################################################
+
+# FONCTIONS DU MODULE
+
+# > Notify():
+# Réveille tous les threads qui attendent un changement dans WaitFor(). Doit
+# être appelée après chaque modification d'une variable utilisée par l'une des
+# conditions attendues
+def Notify():
+	with Changed:
+		Changed.notify_all()
+
+
+# > WaitFor(predicate, timeout):
+# Bloque le thread actuel jusqu'à ce qu'une condition soit vraie (elle est
+# vérifiée à chaque appel de Notify())
+# Paramètres:
+#   predicate: fonction sans paramètre qui retourne True quand l'attente doit
+#              se terminer
+#   timeout: durée maximale de l'attente en secondes (None: pas de limite)
+# Retourne la dernière valeur retournée par predicate
+def WaitFor(predicate, timeout=None):
+	with Changed:
+		return Changed.wait_for(predicate, timeout)
+
+###############################################################################
@@ -9,7 +9,7 @@ import time
 # Locales
 from constants import *
 import game, controls
-import gui
+import gui, pacer, perf, physics, signals
 
 ###############################################################################
 
@@ -36,23 +36,59 @@ def Quit():
 # > Run():
 # Fonction exécutée par le thread de ce module lorsqu'il est démarré
 def Run():
-	global CurrentUi
-
 	# Attend que ControlsThread crée la fenêtre avec InitSDLVideoSubSystem()
-	while not gui.WindowIsOpen():
-		time.sleep(WAIT_TIME)
+	gui.WaitWindowOpen()
 
 	# Initialise le module gui du jeu
 	gui.Init()
 
 	# Définit la première interface utilisateur à être affichée à l'écran comme
 	# étant le menu principal (écran titre)
-	CurrentUi = UiTitleScreen()
+	SetCurrentUi(UiTitleScreen())
 
 	# Dessine indéfiniment l'interface utilisateur décrite par la classe dont
 	# l'instance est définie dans CurrentUi, tant que le jeu est executé.
+	# Si l'image à afficher est identique à celle qui est déjà affichée, le
+	# thread est bloqué jusqu'à ce qu'un changement ait lieu (ou jusqu'à la
+	# prochaine mise à jour de l'affichage des performances s'il est activé).
+	# Le nombre d'images dessinées par seconde est limité par pacer
+	LastFrame = None
 	while game.Running:
-		CurrentUi.Draw()
+		frame = CurrentFrame()
+		if frame == LastFrame:
+			pacer.Reset()
+			signals.WaitFor(lambda: not game.Running or
+				CurrentFrame() != frame,
+				PERF_REFRESH if perf.Overlay else None)
+			continue
+		LastFrame = frame
+		start = time.perf_counter()
+		with gui.RenderLock:
+			frame[0].Draw()
+		pacer.Pace(perf.EndFrame(time.perf_counter() - start))
+
+
+# > CurrentFrame():
+# Retourne une clé décrivant l'image que l'interface utilisateur actuelle doit
+# afficher (deux clés égales correspondent à la même image)
+def CurrentFrame():
+	ui = CurrentUi
+	frame = (ui, ui.Frame(), gui.DisplayGeneration())
+	# L'affichage des performances est mis à jour toutes les PERF_REFRESH
+	# secondes, même si le contenu de l'interface ne change pas
+	if perf.Overlay:
+		frame += (int(time.perf_counter() / PERF_REFRESH),)
+	return frame
+
+
+# > SetCurrentUi(ui):
+# Change l'interface utilisateur affichée à l'écran
+# Paramètre:
+#   ui: instance d'une classe héritée de Ui
+def SetCurrentUi(ui):
+	global CurrentUi
+	CurrentUi = ui
+	signals.Notify()
 
 
 
@@ -78,6 +114,11 @@ class Ui:
 	# correspondante à la classe
 	def Draw(self):
 		pass
+	# Fonction qui retourne une clé décrivant le contenu de l'interface:
+	# l'interface n'est redessinée que lorsque cette clé change (par défaut,
+	# le contenu ne change pas et l'interface n'est dessinée qu'une fois)
+	def Frame(self):
+		return None
 	# Fonction appelée par controls quand l'utilisateur clique sur la fenêtre,
 	# traîte le clic sur l'interfacce selon la classe
 	def OnClick(self, x, y):
@@ -86,30 +127,51 @@ class Ui:
 
 # Classe UiGame: interface affichée lors d'une partie
 class UiGame(Ui):
+	# Le contenu change à chaque nouvel instantané de la partie, à chaque
+	# changement de l'état de pause et à chaque image tant que les positions
+	# sont interpolées (la date actuelle rend alors la clé unique)
+	def Frame(self):
+		snapshot = game.CurrentSnapshot
+		frame = (snapshot.Sequence, game.GameState == GS_PAUSED)
+		if time.perf_counter() - snapshot.TickDate < TICK_TIME:
+			frame += (time.perf_counter(),)
+		return frame
+
 	# Utilise gui.DrawGame pour afficher dans la fenêtre le terrain, les
-	# joueurs, la balle, le score et le temps restant ainsi que le menu pause
-	# lorsque le jeu est en pause.
+	# joueurs, la balle, le score, le temps restant, le compte à rebours des
+	# phases de la partie ainsi que le menu pause lorsque le jeu est en
+	# pause. Les positions affichées sont interpolées entre les deux dernières
+	# mises à jour de la simulation en fonction du temps écoulé depuis la
+	# dernière
 	def Draw(self):
-		gui.DrawGame(game.Score, game.GameTime, game.GameState == GS_PAUSED,
-			game.Positions, game.PlayersState)
+		# Lecture de l'instantané de la partie et de la date de l'image en une
+		# seule fois
+		snapshot = game.CurrentSnapshot
+		now = time.perf_counter()
+
+		alpha = (now - snapshot.TickDate) / TICK_TIME
+		alpha = min(max(alpha, 0.0), 1.0)
+		positions = physics.InterpolatePositions(snapshot.PreviousPositions,
+			snapshot.Positions, alpha)
+		gui.DrawGame(snapshot.Score, snapshot.GameTime,
+			game.GameState == GS_PAUSED, positions, snapshot.PlayersState,
+			snapshot.Phase, snapshot.PhaseTime, now)
 	
 	# Lorsque le jeu est en pause, réagit aux clics sur le menu pause
 	def OnClick(self, x, y):
-		global CurrentUi
-		
 		if game.GameState == GS_PAUSED:
 			if CheckMousePosition(x,y, (WIN_WIDTH-512)/2, WIN_HEIGHT/2-48,
 			(WIN_WIDTH-512)/2+512, WIN_HEIGHT/2+48):
 				# Bouton 'Reprendre' -> la variable d'état du jeu reprend la
 				# valeur indiquant que le jeu est en cours
-				game.GameState = GS_PLAYING
+				game.SetGameState(GS_PLAYING)
 			elif CheckMousePosition(x,y, (WIN_WIDTH-512)/2, WIN_HEIGHT/2+72,
 			(WIN_WIDTH-512)/2+512, WIN_HEIGHT/2+168):
 				# Bouton 'Menu principal' -> l'interface affichée à l'écran
 				# devient l'écran titre et la variable d'état de jeu prend la
 				# valeur indiquant qu'aucune partie n'est en cours
-				CurrentUi = UiTitleScreen()
-				game.GameState = GS_NPLAYING
+				SetCurrentUi(UiTitleScreen())
+				game.SetGameState(GS_NPLAYING)
 
 
 # Classe UiGameOverScreen: interface de fin de partie
@@ -117,24 +179,23 @@ class UiGameOverScreen(Ui):
 	# Utilise gui.DrawGameOverScreen pour afficher le menu de fin de partie en
 	# lui passant le score et le temps restant de la partie
 	def Draw(self):
-		gui.DrawGameOverScreen(game.Score, game.GameTime)
+		snapshot = game.CurrentSnapshot
+		gui.DrawGameOverScreen(snapshot.Score, snapshot.GameTime)
 
 	# Réagit à un clic sur l'un des boutons du menu
 	def OnClick(self, x, y):
-		global CurrentUi
-		
 		# Bouton 'Nouvelle partie' -> l'interface affichée devient celle du
 		# jeu, la variable d'état de jeu prend une valeur indiquant
 		# qu'une partie est en cours
 		if CheckMousePosition(x,y, (WIN_WIDTH-512)/2, (WIN_HEIGHT-512)/2+272,
 				(WIN_WIDTH-512)/2+512, (WIN_HEIGHT-512)/2+368):
-			CurrentUi = UiGame()
-			game.GameState = GS_PLAYING
+			SetCurrentUi(UiGame())
+			game.SetGameState(GS_PLAYING)
 		# Bouton 'Menu principal' -> l'interface affichée redevient l'écran
 		# titre
 		elif CheckMousePosition(x,y, (WIN_WIDTH-512)/2, (WIN_HEIGHT-512)/2+384,
 				(WIN_WIDTH-512)/2+512, (WIN_HEIGHT-512)/2+480):
-			CurrentUi = UiTitleScreen()
+			SetCurrentUi(UiTitleScreen())
 
 
 # Classe UiTitleScreen: interface de l'écran titre
@@ -158,8 +219,6 @@ class UiTitleScreen(Ui):
 	# Réagit à un clic sur l'un des boutons du menu principal de la façon
 	# appropriée
 	def OnClick(self, x, y):
-		global CurrentUi
-		
 		for i in range(4):
 			if CheckMousePosition(x,y, self.button_x_pos, self.button_y_pos[i],
 				self.button_x_pos+512, self.button_y_pos[i]+96):
@@ -168,21 +227,21 @@ class UiTitleScreen(Ui):
 					# Bouton 'Jouer' -> l'interface affichée devient celle du
 					# jeu, la variable d'état de jeu prend une valeur indiquant
 					# qu'une partie est en cours
-					CurrentUi = UiGame()
-					game.GameState = GS_PLAYING
+					SetCurrentUi(UiGame())
+					game.SetGameState(GS_PLAYING)
 				elif i == 1:
 					# Bouton 'Règles' -> l'interface affichée devient celle qui
 					# affiche les règles du jeu à l'écran
-					CurrentUi = UiRulesScreen()
+					SetCurrentUi(UiRulesScreen())
 				elif i == 2:
 					# Bouton 'A propos' -> l'interface affichée devient l'écran
 					# qui affiche des informations sur le jeu
-					CurrentUi = UiAboutScreen()
+					SetCurrentUi(UiAboutScreen())
 				else:
 					# Bouton 'Quitter' -> modifie la variable qui contrôle la
 					# plupart des boucles du jeu pour que celles-ci s'arrêtent
 					# et que le programme s'arrête
-					game.Running = False
+					game.Stop()
 
 
 # Classe UiTextScreen: classe modèle qui permet d'afficher un écran informatif
@@ -199,13 +258,11 @@ class UiTextScreen(Ui):
 
 	# Réagir aux clics sur le bouton qui permet de revenir au menu principal
 	def OnClick(self, x, y):
-		global CurrentUi
-
 		if CheckMousePosition(x,y, (WIN_WIDTH-512)/2, WIN_HEIGHT*456/720+144,
 			(WIN_WIDTH-512)/2+512, WIN_HEIGHT*456/720+240):
 			# Bouton 'Menu principal' -> l'interface affichée redevient l'écran
 			# titre
-			CurrentUi = UiTitleScreen()
+			SetCurrentUi(UiTitleScreen())
 
 
 # Classe UiRulesScreen: interface qui utilise le modèle UiTextScreen pour
@@ -264,5 +321,24 @@ def InitSDLVideoSubSystem():
 # Active ou désactive le mode plein-écran du jeu
 def ToggleFullscreen():
 	gui.ToggleFullscreen()
+	signals.Notify()
+
+# > TogglePerfOverlay():
+# Active ou désactive l'affichage des performances du jeu
+def TogglePerfOverlay():
+	perf.ToggleOverlay()
+	signals.Notify()
+
+# > RestoreTextures():
+# Recrée les textures du jeu perdues par le pilote d'affichage
+def RestoreTextures():
+	gui.RestoreTextures()
+	signals.Notify()
+
+# > Invalidate():
+# Indique que le contenu de la fenêtre doit être redessiné
+def Invalidate():
+	gui.Invalidate()
+	signals.Notify()
 
 ###############################################################################